@@ -1,9 +1,120 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from datetime import timedelta
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+from .utils.lru import LRUCache
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+# JTIs this process has seen blacklisted. Only ever used to reject early; a
+# miss still falls through to the database, which stays the source of truth
+# for tokens blacklisted by other workers.
+recently_blacklisted = LRUCache(
+    maxsize=getattr(settings, 'JWT_BLACKLIST_LRU_SIZE', 4096),
+    ttl=int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+)
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying the user's role and department.
+
+    Access tokens minted from it copy these claims, so consumers can read
+    them from ``request.auth`` without loading the user.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['department_id'] = user.department_id
+        return token
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in recently_blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+        try:
+            super().check_blacklist()
+        except TokenError:
+            recently_blacklisted.set(jti, True)
+            raise
+
+    def blacklist(self):
+        result = super().blacklist()
+        recently_blacklisted.set(self.payload[api_settings.JTI_CLAIM], True)
+        return result
+
+
+def prune_expired_tokens(batch_size=1000, now=None):
+    """
+    Delete expired outstanding tokens (and, by cascade, their blacklist
+    entries) in batches so the delete never holds long locks.
+
+    Returns the number of outstanding tokens removed.
+    """
+    now = now or timezone.now()
+    removed = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        removed += len(ids)
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     def get_user(self, validated_token):
-        user = super().get_user(validated_token)
-        # Add any custom validation here if needed
-        return user
\ No newline at end of file
+        if not getattr(settings, 'JWT_FAST_PATH', False):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = self._get_cached_user(user_id)
+
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # A role change must not be bypassed by an older token
+        if 'role' in validated_token and validated_token['role'] != user.role:
+            raise AuthenticationFailed(_("Token claims are out of date"), code="stale_claims")
+
+        return user
+
+    def _get_cached_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is not None:
+            return user
+
+        try:
+            user = User.objects.select_related('department').get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+        return user
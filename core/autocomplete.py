@@ -0,0 +1,230 @@
+# core/autocomplete.py
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import AutocompleteTerm, SubmissionData
+from .utils.lru import LRUCache
+
+# Column name patterns -> kind, used when a column doesn't declare
+# "autocomplete" itself. Checked in order; first match wins.
+DEFAULT_COLUMN_PATTERNS = {
+    'person': [
+        r'(faculty|student|teacher|author|person|coordinator|investigator|guide|awardee|'
+        r'recipient|staff|participant|member|speaker|principal|scholar|candidate)s?_?name',
+        r'name_of_(the_)?(faculty|student|teacher|author|person|coordinator|investigator|guide|'
+        r'awardee|recipient|staff|participant|member|speaker|scholar|candidate)',
+    ],
+    'title': [
+        r'title',
+        r'(project|programme|program|course|event|activity|scheme|book|paper)_?name',
+        r'name_of_(the_)?(project|programme|program|course|event|activity|scheme|book|paper)',
+    ],
+}
+
+MAX_LENGTH = AutocompleteTerm._meta.get_field('value').max_length
+# Terms per UPDATE ... WHERE (kind, normalized) OR ...; keeps statements well
+# under SQLite's expression depth limit
+UPDATE_CHUNK = 200
+
+_prefix_cache = LRUCache(
+    maxsize=getattr(settings, 'AUTOCOMPLETE_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'AUTOCOMPLETE_CACHE_TTL', 60)
+)
+_column_cache = LRUCache(maxsize=512)
+
+
+def normalize(value):
+    """Case- and accent-insensitive form used for prefix matching"""
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.casefold().split())[:MAX_LENGTH]
+
+
+def _compiled_patterns():
+    patterns = getattr(settings, 'AUTOCOMPLETE_COLUMN_PATTERNS', DEFAULT_COLUMN_PATTERNS)
+    return [
+        (kind, re.compile(pattern, re.IGNORECASE))
+        for kind, kind_patterns in patterns.items()
+        for pattern in kind_patterns
+    ]
+
+
+def column_kind(column):
+    """Autocomplete kind of a (flattened) column definition, or None"""
+    declared = column.get('autocomplete')
+    if declared is not None:
+        return declared or None
+    if column.get('data_type', 'string') not in ('string', 'text'):
+        return None
+
+    for kind, pattern in _compiled_patterns():
+        if pattern.search(column['name']):
+            return kind
+    return None
+
+
+def template_columns(template):
+    """{flattened column name: kind} for the template's autocomplete columns"""
+    key = (template.pk, template.updated_at)
+    columns = _column_cache.get(key)
+    if columns is None:
+        try:
+            flat_columns = template.get_flat_columns()
+        except (KeyError, TypeError):
+            flat_columns = []
+        columns = {}
+        for column in flat_columns:
+            kind = column_kind(column)
+            if kind:
+                columns[column['name']] = kind
+        _column_cache.set(key, columns)
+    return columns
+
+
+def extract_terms(data, columns):
+    """
+    Terms found in one row: a Counter of (kind, normalized) keys and a dict
+    mapping each key to the value as written
+    """
+    terms = Counter()
+    values = {}
+    if not isinstance(data, dict):
+        return terms, values
+
+    for name, kind in columns.items():
+        raw = data.get(name)
+        if not isinstance(raw, str):
+            continue
+        display = ' '.join(raw.split())[:MAX_LENGTH]
+        normalized = normalize(display)
+        if len(normalized) < 2:
+            continue
+        terms[(kind, normalized)] += 1
+        values.setdefault((kind, normalized), display)
+    return terms, values
+
+
+def apply_changes(added, removed, values):
+    """
+    Apply frequency deltas. ``added``/``removed`` are Counters keyed by
+    (kind, normalized); ``values`` gives the display value for new terms.
+    """
+    delta = Counter(added)
+    delta.subtract(removed)
+    delta = {key: count for key, count in delta.items() if count}
+    if not delta:
+        return
+
+    with transaction.atomic():
+        new_keys = [key for key, count in delta.items() if count > 0]
+        AutocompleteTerm.objects.bulk_create(
+            [
+                AutocompleteTerm(kind=kind, normalized=normalized,
+                                 value=values.get((kind, normalized), normalized))
+                for kind, normalized in new_keys
+            ],
+            batch_size=UPDATE_CHUNK,
+            ignore_conflicts=True
+        )
+
+        # One UPDATE per distinct delta (and chunk) rather than per term
+        by_delta = {}
+        for key, count in delta.items():
+            by_delta.setdefault(count, []).append(key)
+        for count, keys in by_delta.items():
+            for start in range(0, len(keys), UPDATE_CHUNK):
+                condition = Q()
+                for kind, normalized in keys[start:start + UPDATE_CHUNK]:
+                    condition |= Q(kind=kind, normalized=normalized)
+                AutocompleteTerm.objects.filter(condition).update(frequency=F('frequency') + count)
+
+        # Decrements can leave terms nobody uses any more; only the decremented
+        # terms are checked, through the (kind, normalized) index
+        decremented = {}
+        for (kind, normalized), count in delta.items():
+            if count < 0:
+                decremented.setdefault(kind, []).append(normalized)
+        for kind, normalized in decremented.items():
+            for start in range(0, len(normalized), UPDATE_CHUNK):
+                AutocompleteTerm.objects.filter(
+                    kind=kind, normalized__in=normalized[start:start + UPDATE_CHUNK], frequency__lte=0
+                ).delete()
+
+
+def update_row(template, old_data, new_data):
+    """Incrementally reflect one row changing from old_data to new_data"""
+    columns = template_columns(template)
+    if not columns:
+        return
+    removed, _ = extract_terms(old_data, columns)
+    added, values = extract_terms(new_data, columns)
+    apply_changes(added, removed, values)
+
+
+def _count_rows(rows, batch_size):
+    added = Counter()
+    values = {}
+    for row in rows.select_related('submission__template').iterator(chunk_size=batch_size):
+        terms, row_values = extract_terms(row.data, template_columns(row.submission.template))
+        added.update(terms)
+        for key, value in row_values.items():
+            values.setdefault(key, value)
+    return added, values
+
+
+def add_rows(rows, batch_size=1000):
+    """Count a queryset of SubmissionData rows written in bulk (e.g. by a transition)"""
+    added, values = _count_rows(rows, batch_size)
+    apply_changes(added, Counter(), values)
+
+
+def rebuild(batch_size=1000):
+    """Recount every term from scratch; returns the number of distinct terms"""
+    added, values = _count_rows(SubmissionData.objects.all(), batch_size)
+
+    with transaction.atomic():
+        AutocompleteTerm.objects.all().delete()
+        AutocompleteTerm.objects.bulk_create(
+            [
+                AutocompleteTerm(kind=kind, normalized=normalized, value=values[(kind, normalized)],
+                                 frequency=frequency)
+                for (kind, normalized), frequency in added.items()
+            ],
+            batch_size=batch_size
+        )
+    _prefix_cache.clear()
+    return len(added)
+
+
+def _prefix_filter(prefix):
+    if connection.vendor == 'postgresql':
+        # Served by the varchar_pattern_ops index
+        return Q(normalized__startswith=prefix)
+    # A range scan on the (kind, normalized) index; SQLite's LIKE can't use it
+    return Q(normalized__gte=prefix, normalized__lt=prefix + '\U0010ffff')
+
+
+def suggest(prefix, kind='person', limit=10):
+    """Top ``limit`` values of ``kind`` starting with ``prefix``, most frequent first"""
+    prefix = normalize(prefix)
+    min_length = getattr(settings, 'AUTOCOMPLETE_MIN_PREFIX', 2)
+    if len(prefix) < min_length:
+        return []
+
+    key = (kind, prefix, limit)
+    cached = _prefix_cache.get(key)
+    if cached is not None:
+        return cached
+
+    suggestions = list(
+        AutocompleteTerm.objects.filter(_prefix_filter(prefix), kind=kind)
+        .order_by('-frequency', 'normalized')
+        .values_list('value', flat=True)[:limit]
+    )
+    _prefix_cache.set(key, suggestions)
+    return suggestions
@@ -1,7 +1,7 @@
 from django_filters import rest_framework as filters
 from rest_framework.filters import OrderingFilter
-from .models import DataSubmission, Department, Template, AcademicYear
-from django.db import models
+from .models import DataSubmission, Department, Template, AcademicYear, Board
+from .search import matching_submission_ids
 
 class DataSubmissionFilter(filters.FilterSet):
     # Academic Year filters
@@ -35,16 +35,12 @@ class DataSubmissionFilter(filters.FilterSet):
     search = filters.CharFilter(method='filter_search')
 
     # Board filters
-    # board = filters.CharFilter(field_name='board')
+    board = filters.ModelChoiceFilter(queryset=Board.objects.all())
+    board_code = filters.CharFilter(field_name='board__code')
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            models.Q(template__name__icontains=value) |
-            models.Q(department__name__icontains=value) |
-            models.Q(submitted_by__username__icontains=value) |
-            models.Q(template__code__icontains=value) 
-            # models.Q(board__icontains=value) 
-        )
+        # Full-text index over submission details and row data (core/search.py)
+        return queryset.filter(id__in=matching_submission_ids(value))
 
     class Meta:
         model = DataSubmission
@@ -53,7 +49,7 @@ class DataSubmissionFilter(filters.FilterSet):
             'department': ['exact'],
             'template': ['exact'],
             'status': ['exact'],
-            # 'board': ['exact'],
+            'board': ['exact'],
             'created_at': ['exact', 'lt', 'gt', 'lte', 'gte'],
             'submitted_at': ['exact', 'lt', 'gt', 'lte', 'gte'],
             'verified_at': ['exact', 'lt', 'gt', 'lte', 'gte'],
@@ -0,0 +1,158 @@
+# core/frameworks.py
+"""
+Idempotent loading of accreditation framework definitions: a board, its
+criteria and optionally templates.
+
+FrameworkLoader reads what already exists with one query per model, diffs
+it against the definition and writes only the differences with
+bulk_create / bulk_update in a single transaction, so re-running the
+populate_*_criteria commands on every deploy costs a handful of queries.
+"""
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .layouts import sync_versions
+from .models import Board, Criteria, Template
+
+CRITERIA_FIELDS = ('name', 'description', 'order')
+TEMPLATE_FIELDS = ('name', 'metadata')
+
+
+@dataclass
+class ModelChanges:
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def total(self):
+        return len(self.created) + len(self.updated) + self.unchanged
+
+
+@dataclass
+class LoadReport:
+    board: Board
+    board_created: bool
+    criteria: ModelChanges = field(default_factory=ModelChanges)
+    templates: ModelChanges = field(default_factory=ModelChanges)
+
+    @property
+    def changed(self):
+        return self.board_created or any(
+            changes.created or changes.updated for changes in (self.criteria, self.templates)
+        )
+
+
+def _conflict_options(unique_fields, update_fields):
+    # Rows inserted by a concurrent run since the diff are updated, not duplicated
+    if connection.features.supports_update_conflicts_with_target:
+        return {'update_conflicts': True, 'unique_fields': unique_fields, 'update_fields': update_fields}
+    return {}
+
+
+def _diff(existing, definitions, changes, label=None):
+    """
+    Split ``definitions`` ({key: field values}) into new keys and existing
+    objects whose values differ (updated in place); ``label`` turns a key
+    into what the report lists
+    """
+    new, changed = [], []
+    for key, values in definitions.items():
+        obj = existing.get(key)
+        if obj is None:
+            new.append(key)
+            changes.created.append(label(key) if label else key)
+        elif any(getattr(obj, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(obj, name, value)
+            changed.append(obj)
+            changes.updated.append(label(key) if label else key)
+        else:
+            changes.unchanged += 1
+    return new, changed
+
+
+class FrameworkLoader:
+    """
+    ``criteria``: dicts with number, name, description and order.
+    ``templates``: dicts with code, name, criterion (its number) and metadata.
+    """
+
+    def __init__(self, board_code, board_name, criteria, templates=()):
+        self.board_code = board_code
+        self.board_name = board_name
+        self.criteria = list(criteria)
+        self.templates = list(templates)
+
+    def load(self, dry_run=False):
+        """Apply the definition and return a LoadReport; ``dry_run`` rolls it back"""
+        with transaction.atomic():
+            board, created = Board.objects.get_or_create(
+                code=self.board_code, defaults={'name': self.board_name}
+            )
+            report = LoadReport(board=board, board_created=created)
+            criteria = self._load_criteria(board, report.criteria)
+            if self.templates:
+                self._load_templates(board, criteria, report.templates)
+            if dry_run:
+                transaction.set_rollback(True)
+        return report
+
+    def _load_criteria(self, board, changes):
+        existing = {criterion.number: criterion for criterion in Criteria.objects.filter(board=board)}
+        definitions = {
+            data['number']: {name: data.get(name) for name in CRITERIA_FIELDS}
+            for data in self.criteria
+        }
+        new, changed = _diff(existing, definitions, changes)
+
+        # Bulk writes skip Criteria.save(); its board sync isn't needed as
+        # criteria are matched within the board
+        if changed:
+            Criteria.objects.bulk_update(changed, CRITERIA_FIELDS)
+        if new:
+            Criteria.objects.bulk_create(
+                [Criteria(board=board, number=number, **definitions[number]) for number in new],
+                **_conflict_options(['board', 'number'], list(CRITERIA_FIELDS))
+            )
+            # Conflict-handling inserts don't return primary keys everywhere
+            return {criterion.number: criterion for criterion in Criteria.objects.filter(board=board)}
+        return existing
+
+    def _load_templates(self, board, criteria, changes):
+        existing = {
+            (template.criteria_id, template.code): template
+            for template in Template.objects.filter(criteria__board=board)
+        }
+        definitions = {}
+        for data in self.templates:
+            criterion = criteria[data['criterion']]
+            definitions[(criterion.id, data['code'])] = {name: data[name] for name in TEMPLATE_FIELDS}
+        new, changed = _diff(existing, definitions, changes, label=lambda key: key[1])
+
+        # Template.save() derives these; bulk writes have to do it here
+        now = timezone.now()
+        derived = ('board', 'continuous', 'carry_forward', 'updated_at')
+        templates = [
+            Template(criteria_id=criteria_id, code=code, **definitions[(criteria_id, code)])
+            for criteria_id, code in new
+        ]
+        for template in templates + changed:
+            template.board = board
+            template.continuous = template.metadata_flag('continuous')
+            template.carry_forward = template.metadata_flag('carry_forward')
+            template.updated_at = now
+
+        if templates:
+            Template.objects.bulk_create(
+                templates,
+                **_conflict_options(['criteria', 'code'], [*TEMPLATE_FIELDS, *derived])
+            )
+        if changed:
+            Template.objects.bulk_update(changed, [*TEMPLATE_FIELDS, *derived])
+        if templates or changed:
+            # Conflict-handling inserts may not have set primary keys
+            written = [code for _, code in new] + [template.code for template in changed]
+            sync_versions(Template.objects.filter(criteria__board=board, code__in=written))
@@ -0,0 +1,38 @@
+# core/hashers.py
+"""
+Password hashers whose cost comes from settings.
+
+The algorithm names are unchanged, so existing hashes keep verifying. When the
+configured cost (or the preferred algorithm in PASSWORD_HASHER) differs from
+a stored hash, Django re-hashes the password on the next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return getattr(settings, 'PASSWORD_BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,358 @@
+# core/history.py
+"""
+Row-level submission history.
+
+Each data edit stores a delta of the one row that changed instead of the
+whole submission before and after. Every HISTORY_SNAPSHOT_INTERVAL deltas
+an entry also carries a full snapshot, so the state at any point in time is
+the nearest earlier snapshot plus a bounded number of replayed deltas.
+
+Edits don't write history themselves: they queue an AuditEvent in their own
+transaction and ``flush_events`` turns queued events into history entries in
+bulk, computing snapshots by replay instead of reading the submission. With
+AUDIT_ASYNC that happens in a Celery worker after commit (and in a periodic
+sweep), so edit latency doesn't depend on submission size.
+
+State format (also used by snapshots)::
+
+    {"<row_id>": {"section_index": 0, "row_number": 1, "data": {...}}, ...}
+"""
+import copy
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import AuditEvent, DataSubmission, SubmissionData, SubmissionHistory
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def submission_state(submission):
+    """Current data state of a submission (or submission id) in the snapshot format"""
+    rows = SubmissionData.objects.filter(submission=submission).values_list(
+        'id', 'section_index', 'row_number', 'data'
+    )
+    return {
+        str(row_id): {'section_index': section_index, 'row_number': row_number, 'data': data}
+        for row_id, section_index, row_number, data in rows
+    }
+
+
+def row_delta(old_data, new_data):
+    """Field-level difference between two versions of one row's data"""
+    old_data = old_data or {}
+    new_data = new_data or {}
+    changed = {
+        key: value for key, value in new_data.items()
+        if old_data.get(key, _MISSING) != value
+    }
+    unset = [key for key in old_data if key not in new_data]
+    return {
+        'set': changed,
+        'unset': unset,
+        'old': {key: old_data[key] for key in [*changed, *unset] if key in old_data}
+    }
+
+
+def describe_changes(row_id, delta):
+    """Human-readable change list kept in ``details`` for the history UI"""
+    old = delta.get('old', {})
+    changes = []
+    for key, value in delta.get('set', {}).items():
+        if key in old:
+            changes.append({'type': 'changed', 'path': f'rows[{row_id}].{key}',
+                            'old_value': old[key], 'new_value': value})
+        else:
+            changes.append({'type': 'added', 'path': f'rows[{row_id}].{key}', 'new_value': value})
+    for key in delta.get('unset', []):
+        changes.append({'type': 'removed', 'path': f'rows[{row_id}].{key}', 'old_value': old.get(key)})
+    return changes
+
+
+def _emit(submission, action, user, row_id, delta, details):
+    """
+    Queue one change as an AuditEvent in the caller's transaction. With
+    AUDIT_ASYNC the history entry is written by a worker after commit;
+    otherwise it is written right away.
+    """
+    event = AuditEvent.objects.create(
+        submission=submission,
+        action=action,
+        performed_by=user,
+        row_id=row_id,
+        delta=delta,
+        details=details
+    )
+    if getattr(settings, 'AUDIT_ASYNC', False):
+        transaction.on_commit(_enqueue_flush)
+    else:
+        flush_events(submission_ids=[submission.pk])
+    return event
+
+
+def _enqueue_flush():
+    from .tasks import flush_audit_events_task
+    try:
+        flush_audit_events_task.delay()
+    except Exception as e:
+        # The events are committed; the periodic sweep will write them
+        logger.warning("Could not enqueue audit flush: %s", e)
+
+
+def record_row_added(submission, row, user):
+    delta = {
+        'op': 'add',
+        'section_index': row.section_index,
+        'row_number': row.row_number,
+        'data': row.data
+    }
+    details = {'changes': describe_changes(row.pk, {'set': row.data or {}}), 'additional_info': None}
+    return _emit(submission, 'row_added', user, row.pk, delta, details)
+
+
+def record_row_updated(submission, row, old_data, user, additional_details=None):
+    delta = {'op': 'update', **row_delta(old_data, row.data)}
+    details = {'changes': describe_changes(row.pk, delta), 'additional_info': additional_details}
+    return _emit(submission, 'row_updated', user, row.pk, delta, details)
+
+
+def record_row_deleted(submission, row_id, section_index, row_number, old_data, user,
+                       renumber='section'):
+    """
+    ``renumber`` says which later rows moved up one row_number after the
+    delete: those in the same 'section', the whole 'submission', or 'none'.
+    """
+    delta = {
+        'op': 'delete',
+        'section_index': section_index,
+        'row_number': row_number,
+        'data': old_data,
+        'renumber': renumber
+    }
+    details = {'changes': [{'type': 'removed', 'path': f'rows[{row_id}]', 'old_value': old_data}],
+               'additional_info': None}
+    return _emit(submission, 'row_deleted', user, row_id, delta, details)
+
+
+def _locked_submission_ids(submission_ids, limit):
+    """
+    Submissions with pending events that this worker gets to flush. Each
+    submission's events must be written in order by one worker at a time, so
+    concurrent flushers skip submissions another one holds.
+    """
+    pending = AuditEvent.objects.values('submission_id')
+    if submission_ids is not None:
+        pending = pending.filter(submission_id__in=submission_ids)
+    submissions = DataSubmission.objects.filter(id__in=pending).order_by('id')
+    if submission_ids is not None:
+        # Flushing specific submissions (inline writes, history reads) waits its turn
+        submissions = submissions.select_for_update(of=('self',))
+    elif connection.features.has_select_for_update_skip_locked:
+        submissions = submissions.select_for_update(skip_locked=True, of=('self',))
+    return list(submissions.values_list('id', flat=True)[:limit])
+
+
+def _baseline(submission_id):
+    """
+    State before the oldest pending event of a submission that has no
+    snapshot yet: the live rows with every pending event reverted.
+    """
+    state = submission_state(submission_id)
+    pending = AuditEvent.objects.filter(submission_id=submission_id).order_by('-id')
+    for row_id, delta in pending.values_list('row_id', 'delta'):
+        revert_delta(state, row_id, delta)
+    return state
+
+
+def _history_entries(submission_id, events):
+    interval = getattr(settings, 'HISTORY_SNAPSHOT_INTERVAL', 50)
+    entries = []
+    if SubmissionHistory.objects.filter(submission_id=submission_id, snapshot__isnull=False).exists():
+        state, since_snapshot = state_at(submission_id)
+    else:
+        state, since_snapshot = _baseline(submission_id), 0
+        entries.append(SubmissionHistory(
+            submission_id=submission_id,
+            action='snapshot',
+            performed_by_id=events[0].performed_by_id,
+            performed_at=events[0].performed_at,
+            snapshot=copy.deepcopy(state)
+        ))
+
+    for event in events:
+        apply_delta(state, event.row_id, event.delta)
+        since_snapshot += 1
+        snapshot = None
+        if since_snapshot >= interval:
+            snapshot, since_snapshot = copy.deepcopy(state), 0
+        entries.append(SubmissionHistory(
+            submission_id=submission_id,
+            action=event.action,
+            performed_by_id=event.performed_by_id,
+            performed_at=event.performed_at,
+            row_id=event.row_id,
+            delta=event.delta,
+            snapshot=snapshot,
+            details=event.details
+        ))
+    return entries
+
+
+def flush_events(batch_size=500, submission_ids=None):
+    """
+    Write pending AuditEvents to SubmissionHistory, oldest first. Events are
+    deleted in the same transaction that writes their entries, so nothing is
+    lost or written twice if a worker dies. Returns the number flushed.
+    """
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            locked = _locked_submission_ids(submission_ids, limit=batch_size)
+            if not locked:
+                return flushed
+            events = list(
+                AuditEvent.objects.filter(submission_id__in=locked).order_by('id')[:batch_size]
+            )
+            by_submission = {}
+            for event in events:
+                by_submission.setdefault(event.submission_id, []).append(event)
+
+            entries = []
+            for submission_id, submission_events in by_submission.items():
+                entries.extend(_history_entries(submission_id, submission_events))
+            SubmissionHistory.objects.bulk_create(entries, batch_size=batch_size)
+            AuditEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        flushed += len(events)
+
+
+def _shifted(row, section_index, row_number, renumber):
+    if renumber == 'none' or row['row_number'] <= row_number:
+        return False
+    return renumber == 'submission' or row['section_index'] == section_index
+
+
+def _unshift(state, section_index, row_number, renumber):
+    for row in state.values():
+        if _shifted(row, section_index, row_number - 1, renumber):
+            row['row_number'] += 1
+
+
+def apply_delta(state, row_id, delta):
+    """Apply one delta to a state dict in place"""
+    key = str(row_id)
+    op = delta.get('op')
+    if op == 'add':
+        state[key] = {
+            'section_index': delta['section_index'],
+            'row_number': delta['row_number'],
+            'data': delta.get('data') or {}
+        }
+    elif op == 'update':
+        row = state.setdefault(key, {'section_index': None, 'row_number': None, 'data': {}})
+        data = dict(row['data'] or {})
+        for field in delta.get('unset', []):
+            data.pop(field, None)
+        data.update(delta.get('set', {}))
+        row['data'] = data
+    elif op == 'delete':
+        state.pop(key, None)
+        renumber = delta.get('renumber', 'section')
+        for row in state.values():
+            if _shifted(row, delta['section_index'], delta['row_number'], renumber):
+                row['row_number'] -= 1
+    return state
+
+
+def revert_delta(state, row_id, delta):
+    """Undo one delta on a state dict in place (the inverse of apply_delta)"""
+    key = str(row_id)
+    op = delta.get('op')
+    if op == 'add':
+        state.pop(key, None)
+    elif op == 'update':
+        row = state.get(key)
+        if row is not None:
+            data = dict(row['data'] or {})
+            old = delta.get('old', {})
+            for field in delta.get('set', {}):
+                if field in old:
+                    data[field] = old[field]
+                else:
+                    data.pop(field, None)
+            for field in delta.get('unset', []):
+                if field in old:
+                    data[field] = old[field]
+            row['data'] = data
+    elif op == 'delete':
+        _unshift(state, delta['section_index'], delta['row_number'], delta.get('renumber', 'section'))
+        state[key] = {
+            'section_index': delta['section_index'],
+            'row_number': delta['row_number'],
+            'data': delta.get('data') or {}
+        }
+    return state
+
+
+def compose_updates(deltas):
+    """Combine consecutive 'update' deltas of one row into a single delta"""
+    before = {}
+    for delta in deltas:
+        old = delta.get('old', {})
+        for field in [*delta.get('set', {}), *delta.get('unset', [])]:
+            if field not in before:
+                before[field] = old.get(field, _MISSING)
+
+    before = {field: value for field, value in before.items() if value is not _MISSING}
+    after = dict(before)
+    for delta in deltas:
+        for field in delta.get('unset', []):
+            after.pop(field, None)
+        after.update(delta.get('set', {}))
+    return {'op': 'update', **row_delta(before, after)}
+
+
+def _is_legacy_snapshot(entry):
+    # Before deltas, entries stored the full new state in new_data
+    return entry.delta is None and entry.snapshot is None and isinstance(entry.new_data, dict)
+
+
+def state_at(submission, at=None, upto_id=None):
+    """
+    Reconstruct the data state of ``submission`` as of time ``at`` (or right
+    after history entry ``upto_id``). Returns ``(state, replayed_deltas)``.
+    """
+    entries = SubmissionHistory.objects.filter(submission=submission)
+    if at is not None:
+        entries = entries.filter(performed_at__lte=at)
+    if upto_id is not None:
+        entries = entries.filter(id__lte=upto_id)
+
+    base = entries.filter(snapshot__isnull=False).order_by('-id').only('id', 'snapshot').first()
+    legacy = entries.filter(
+        delta__isnull=True, snapshot__isnull=True, new_data__isnull=False
+    ).order_by('-id').only('id', 'new_data', 'delta', 'snapshot').first()
+    if legacy is not None and _is_legacy_snapshot(legacy) and (base is None or legacy.id > base.id):
+        state, base_id = dict(legacy.new_data), legacy.id
+    elif base is not None:
+        state, base_id = dict(base.snapshot), base.id
+    else:
+        state, base_id = {}, 0
+
+    # Snapshot rows are shared with the JSON decoder's output; copy before mutating
+    state = {key: {**row, 'data': dict(row.get('data') or {})} for key, row in state.items()}
+
+    deltas = entries.filter(id__gt=base_id, delta__isnull=False).order_by('id').values_list('row_id', 'delta')
+    replayed = 0
+    for row_id, delta in deltas:
+        apply_delta(state, row_id, delta)
+        replayed += 1
+    return state, replayed
+
+
+def state_rows(state):
+    """State dict as a list of rows ordered like SubmissionData"""
+    rows = [{'id': int(row_id), **row} for row_id, row in state.items()]
+    return sorted(rows, key=lambda row: (row['section_index'] or 0, row['row_number'] or 0, row['id']))
@@ -0,0 +1,63 @@
+# core/indexing.py
+"""
+Search and autocomplete upkeep for row edits.
+
+Row saves and deletes only record what changed (see core.signals); the
+row's search document and the autocomplete counts are updated once the
+editing transaction has committed, by a Celery worker with INDEX_ASYNC or
+straight after commit otherwise, so none of it runs inside the request's
+transaction. A change carries the row's old and new data, so autocomplete
+deltas come out right whatever order workers apply them in.
+"""
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from . import autocomplete
+from .models import DataSubmission, SubmissionData, Template
+from .search import index_row
+
+logger = logging.getLogger(__name__)
+
+
+def row_changed(submission_id, template_id, row_id, old_data, new_data):
+    """
+    Queue the indexing of one row change for after commit. ``new_data`` is
+    None for a delete; ``template_id`` may be None if not at hand.
+    """
+    transaction.on_commit(partial(_dispatch, submission_id, template_id, row_id, old_data, new_data))
+
+
+def _dispatch(*change):
+    if getattr(settings, 'INDEX_ASYNC', False):
+        from .tasks import index_row_change_task
+        try:
+            index_row_change_task.delay(*change)
+            return
+        except Exception as e:
+            # Nothing else would pick the change up later
+            logger.warning("Could not enqueue row indexing, indexing now: %s", e)
+    apply_row_change(*change)
+
+
+def apply_row_change(submission_id, template_id, row_id, old_data, new_data):
+    """Update the row's search document and the autocomplete counts"""
+    submission = DataSubmission.objects.select_related(
+        'template', 'department', 'academic_year', 'submitted_by'
+    ).filter(pk=submission_id).first()
+
+    if new_data is not None and submission is not None:
+        # Indexes the row as it is now, so a late worker can't index stale data
+        row = SubmissionData.objects.filter(pk=row_id).only('id', 'submission_id', 'data').first()
+        if row is not None:
+            index_row(row, submission)
+
+    # Rows deleted with their submission still need their terms removed
+    if submission is not None:
+        template = submission.template
+    else:
+        template = Template.objects.filter(pk=template_id).first() if template_id else None
+    if template is not None:
+        autocomplete.update_row(template, old_data, new_data)
@@ -0,0 +1,148 @@
+# core/layouts.py
+"""
+Template versions and their precompiled layouts.
+
+Template.metadata is the editable definition; every distinct metadata a
+template has had is kept as an immutable TemplateVersion, and submissions
+pin the version they were entered against. A version stores the layout
+compiled from its metadata, one entry per section::
+
+    {
+        'headers': [...],              # section title rows
+        'title': ...,                  # section['title'], if any
+        'required': False,             # section must have rows to submit
+        'columns': [                   # flattened, in sheet order
+            {'name': 'funding_agency', 'label': 'Agency', 'display_name': 'Funding - Agency',
+             'data_type': 'string', 'required': True, 'options': [...], 'validation': {...},
+             'group': 0},              # index into 'groups', or None
+        ],
+        'groups': [{'name': 'funding', 'label': 'Funding', 'start': 3, 'span': 2}],
+        'required_fields': ['name_of_the_faculty', ...],
+        'width': 5,                    # number of sheet columns
+    }
+
+so validation, exports and entry forms read it instead of re-walking the
+metadata on every request.
+"""
+import copy
+import hashlib
+import json
+
+from django.db.models import Max
+
+from .models import Template, TemplateVersion
+
+# Column keys copied into the layout besides the computed ones
+COLUMN_KEYS = ('data_type', 'required', 'options', 'validation')
+
+
+def metadata_checksum(metadata):
+    """Stable hash of a metadata structure (key order doesn't matter)"""
+    encoded = json.dumps(metadata, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _leaves(column, prefix='', display_prefix=''):
+    """(flat name, display name, label, definition) of every single column under ``column``"""
+    name = f"{prefix}{column['name']}"
+    label = column.get('display_name', column['name'])
+    display_name = f'{display_prefix}{label}'
+    if column.get('type') == 'group':
+        for nested in column.get('columns', []):
+            yield from _leaves(nested, f'{name}_', f'{display_name} - ')
+    else:
+        yield name, display_name, label, column
+
+
+def compile_section(section):
+    columns, groups = [], []
+    for column in section.get('columns', []):
+        group = None
+        if column.get('type') == 'group':
+            group = len(groups)
+            groups.append({
+                'name': column['name'],
+                'label': column.get('display_name', column['name']),
+                'start': len(columns),
+                'span': 0
+            })
+        for name, display_name, label, definition in _leaves(column):
+            compiled = {'name': name, 'label': label, 'display_name': display_name, 'group': group}
+            compiled.update({key: definition[key] for key in COLUMN_KEYS if key in definition})
+            compiled.setdefault('data_type', 'string')
+            compiled.setdefault('required', False)
+            columns.append(compiled)
+        if group is not None:
+            groups[group]['span'] = len(columns) - groups[group]['start']
+
+    return {
+        'headers': list(section.get('headers', [])),
+        'title': section.get('title'),
+        'required': bool(section.get('required', False)),
+        'columns': columns,
+        'groups': groups,
+        'required_fields': [column['name'] for column in columns if column['required']],
+        'width': len(columns),
+    }
+
+
+def compile_layout(metadata):
+    """Layout of every section of ``metadata`` (legacy dict metadata is one section)"""
+    if isinstance(metadata, dict):
+        metadata = [metadata]
+    return [compile_section(section) for section in metadata or [] if isinstance(section, dict)]
+
+
+def sync_versions(templates):
+    """
+    Make each template's current version match its metadata, creating new
+    versions where it changed. Returns the number of versions created.
+    """
+    templates = [template for template in templates if template.pk]
+    if not templates:
+        return 0
+
+    checksums = {template.pk: metadata_checksum(template.metadata) for template in templates}
+    current = dict(
+        TemplateVersion.objects.filter(
+            id__in=[template.current_version_id for template in templates if template.current_version_id]
+        ).values_list('template_id', 'checksum')
+    )
+    stale = [template for template in templates if current.get(template.pk) != checksums[template.pk]]
+    if not stale:
+        return 0
+
+    # A template may have gone back to an earlier structure
+    existing = {
+        (version.template_id, version.checksum): version
+        for version in TemplateVersion.objects.filter(
+            template__in=stale, checksum__in=[checksums[template.pk] for template in stale]
+        ).only('id', 'template_id', 'checksum')
+    }
+    numbers = dict(
+        TemplateVersion.objects.filter(template__in=stale)
+        .values_list('template')
+        .annotate(last=Max('number'))
+    )
+    versions = {}
+    new_versions = []
+    for template in stale:
+        version = existing.get((template.pk, checksums[template.pk]))
+        if version is None:
+            version = TemplateVersion(
+                template=template,
+                number=numbers.get(template.pk, 0) + 1,
+                # Copied so later in-place edits of the template can't reach it
+                metadata=copy.deepcopy(template.metadata),
+                layout=compile_layout(template.metadata),
+                checksum=checksums[template.pk]
+            )
+            new_versions.append(version)
+        versions[template.pk] = version
+    TemplateVersion.objects.bulk_create(new_versions)
+    for template in stale:
+        template.current_version = versions[template.pk]
+
+    # bulk_update skips Template.save(), which is what calls this
+    Template.objects.bulk_update(stale, ['current_version'])
+    return len(new_versions)
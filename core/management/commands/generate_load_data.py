@@ -0,0 +1,110 @@
+# core/management/commands/generate_load_data.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import autocomplete
+from core.models import DataSubmission, Template, User
+from core.search import rebuild_index
+from core.utils.synthetic import SyntheticDataGenerator
+
+# code: (name, number of criteria created when the board has none)
+BOARDS = {
+    'naac': ('NAAC', 7),
+    'nba': ('NBA', 7),
+    'nirf': ('NIRF', 5),
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate large, deterministic synthetic institution data for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=40, help='Number of departments')
+        parser.add_argument('--users-per-department', type=int, default=3,
+                            help='Faculty users created in each department')
+        parser.add_argument(
+            '--templates',
+            type=int,
+            default=100,
+            help='Synthetic templates per board; existing templates of the board are used as well'
+        )
+        parser.add_argument('--rows-per-section', type=int, default=10,
+                            help='Rows written in every section of every submission')
+        parser.add_argument('--boards', default='naac,nba,nirf',
+                            help=f"Comma separated boards: {', '.join(BOARDS)}")
+        parser.add_argument('--academic-year', default='2023-2024',
+                            help='Academic year (by name) the submissions belong to')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; same seed, same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Objects per bulk insert')
+        parser.add_argument('--password', default='faculty123', help='Password of the generated users')
+        parser.add_argument(
+            '--rebuild-indexes',
+            action='store_true',
+            help='Rebuild the search index and autocomplete terms afterwards '
+                 '(bulk inserts skip the signals that maintain them)'
+        )
+
+    def handle(self, *args, **options):
+        boards = [code.strip() for code in options['boards'].split(',') if code.strip()]
+        unknown = set(boards) - set(BOARDS)
+        if unknown:
+            raise CommandError(f"Unknown boards: {', '.join(sorted(unknown))}")
+
+        started = time.monotonic()
+        generator = SyntheticDataGenerator(seed=options['seed'], batch_size=options['batch_size'])
+
+        with transaction.atomic():
+            academic_year = generator.academic_year(name=options['academic_year'])
+            departments = generator.departments(options['departments'])
+            faculty = generator.users(departments, options['users_per_department'], options['password'])
+            director, created = User.objects.get_or_create(
+                username='load_iqac',
+                defaults={'email': 'load_iqac@example.edu', 'role': 'iqac_director'}
+            )
+            if created:
+                director.set_password(options['password'])
+                director.save()
+        self.stdout.write(
+            f'{len(departments)} departments, {sum(map(len, faculty.values()))} faculty users, '
+            f'academic year {academic_year.name}'
+        )
+
+        def submitter(department):
+            users = faculty[department.id]
+            return generator.rng.choice(users) if users else director
+
+        total_submissions = total_rows = 0
+        for code in boards:
+            name, criteria_count = BOARDS[code]
+            with transaction.atomic():
+                board, criteria = generator.board(code=code, name=name, criteria=criteria_count)
+                generator.templates(criteria, options['templates'])
+                templates = list(Template.objects.filter(board=board).order_by('id'))
+                submissions = generator.submissions(
+                    templates, departments, academic_year, submitted_by=submitter, verified_by=director
+                )
+            # Rows are committed batch by batch, so an interrupted run resumes
+            # with the submissions that have none yet
+            rows = generator.rows(
+                DataSubmission.objects.filter(academic_year=academic_year, template__in=templates),
+                options['rows_per_section']
+            )
+            total_submissions += submissions
+            total_rows += rows
+            self.stdout.write(
+                f'{name}: {len(templates)} templates, {submissions} submissions, {rows} rows'
+            )
+
+        if options['rebuild_indexes']:
+            documents = rebuild_index()
+            terms = autocomplete.rebuild()
+            self.stdout.write(f'Indexed {documents} search documents and {terms} autocomplete terms')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Created {total_submissions} submissions and {total_rows} rows '
+                f'in {time.monotonic() - started:.1f}s'
+            )
+        )
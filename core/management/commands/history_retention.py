@@ -0,0 +1,87 @@
+# core/management/commands/history_retention.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core import retention
+from core.models import AcademicYear
+
+
+class Command(BaseCommand):
+    help = 'Expire, compact and archive submission history according to the retention settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--steps',
+            default='expire,compact,archive',
+            help='Comma separated steps to run: expire, compact, archive'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of submissions handled per transaction'
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Resume after this submission id (printed as progress)'
+        )
+        parser.add_argument(
+            '--year',
+            action='append',
+            help='Only archive this academic year (by name); may be repeated. '
+                 'Defaults to every closed year'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            help='Directory for archive files (defaults to HISTORY_ARCHIVE_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        steps = {step.strip() for step in options['steps'].split(',') if step.strip()}
+        unknown = steps - {'expire', 'compact', 'archive'}
+        if unknown:
+            raise CommandError(f"Unknown steps: {', '.join(sorted(unknown))}")
+
+        batch_size = options['batch_size']
+        start_after = options['start_after']
+
+        if steps & {'expire', 'compact'}:
+            expired = compacted = 0
+            for submission_ids in retention.submission_batches(
+                batch_size=batch_size, start_after=start_after
+            ):
+                for submission_id in submission_ids:
+                    if 'expire' in steps:
+                        expired += retention.expire_history(submission_id)
+                    if 'compact' in steps:
+                        compacted += retention.compact_history(submission_id)
+                self.stdout.write(f'Processed submissions up to {submission_ids[-1]}')
+            self.stdout.write(
+                self.style.SUCCESS(f'Expired {expired} and compacted {compacted} history entries')
+            )
+
+        if 'archive' in steps:
+            if options['year']:
+                years = AcademicYear.objects.filter(name__in=options['year'])
+                if len(years) != len(set(options['year'])):
+                    raise CommandError('Unknown academic year in --year')
+                open_years = [year.name for year in years if year not in retention.closed_years()]
+                if open_years:
+                    raise CommandError(f"Academic years not closed yet: {', '.join(open_years)}")
+            else:
+                years = retention.closed_years()
+
+            for year in years:
+                total = 0
+                for last_id, path, archived in retention.archive_year(
+                    year,
+                    directory=options['archive_dir'],
+                    batch_size=batch_size,
+                    start_after=start_after
+                ):
+                    total += archived
+                    self.stdout.write(f'{year.name}: archived {archived} entries up to submission {last_id} to {path}')
+                self.stdout.write(
+                    self.style.SUCCESS(f'Archived {total} history entries of {year.name}')
+                )
@@ -0,0 +1,77 @@
+# core/management/commands/import_templates.py
+import os
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import AcademicYear, Board
+from core.services import TemplateImportService
+from core.utils.excel_import import parse_batch, workbook_sources
+
+
+class Command(BaseCommand):
+    help = 'Import every template workbook in a directory or zip archive into a board'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory or .zip archive of .xlsx template workbooks')
+        parser.add_argument('--board', required=True, help='Code of the board, e.g. naac')
+        parser.add_argument(
+            '--academic-year',
+            help='Name of the academic year whose submissions lock templates (defaults to the current year)'
+        )
+        parser.add_argument(
+            '--all-sheets',
+            action='store_true',
+            help='Import every sheet of each workbook, coded by sheet title or first header'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Worker processes parsing workbooks (0 = one per CPU)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be imported without writing it'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            board = Board.objects.get(code=options['board'])
+            if options['academic_year']:
+                academic_year = AcademicYear.objects.get(name=options['academic_year'])
+            else:
+                academic_year = AcademicYear.objects.get(is_current=True)
+        except (Board.DoesNotExist, AcademicYear.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        if not os.path.exists(options['source']):
+            raise CommandError(f"{options['source']} does not exist")
+        try:
+            parsed = parse_batch(
+                workbook_sources(options['source']),
+                all_sheets=options['all_sheets'],
+                workers=options['workers'] or None
+            )
+        except zipfile.BadZipFile:
+            raise CommandError(f"{options['source']} is neither a directory nor a .zip archive")
+        if not parsed:
+            raise CommandError(f"No .xlsx workbooks found in {options['source']}")
+
+        results = TemplateImportService(board, academic_year).import_batch(parsed, dry_run=options['dry_run'])
+
+        for result in results:
+            if result['status'] == 'success':
+                codes = ', '.join(
+                    f"{template['code']} (v{template['version']})" for template in result['templates']
+                )
+                self.stdout.write(f"  {result['file']}: {codes}")
+            else:
+                self.stdout.write(self.style.ERROR(f"  {result['file']}: {result['message']}"))
+
+        imported = sum(result['status'] == 'success' for result in results)
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} of {len(results)} files into {board.name}'
+        ))
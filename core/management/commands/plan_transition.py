@@ -0,0 +1,54 @@
+# core/management/commands/plan_transition.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import AcademicYear, User
+from core.services import AcademicYearTransitionService
+
+
+class Command(BaseCommand):
+    help = 'Dry run an academic year transition and estimate how long it will take'
+
+    def add_arguments(self, parser):
+        parser.add_argument('to_year', help='Name of the academic year to transition to, e.g. 2024-2025')
+        parser.add_argument(
+            '--from-year',
+            help='Name of the academic year to transition from (defaults to the current year)'
+        )
+        parser.add_argument('--json', action='store_true', help='Print the plan as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            to_year = AcademicYear.objects.get(name=options['to_year'])
+            if options['from_year']:
+                from_year = AcademicYear.objects.get(name=options['from_year'])
+            else:
+                from_year = AcademicYear.objects.get(is_current=True)
+        except AcademicYear.DoesNotExist as e:
+            raise CommandError(str(e))
+
+        # plan() never writes, so the user is only needed to satisfy the service
+        user = User.objects.filter(role='iqac_director').first()
+        plan = AcademicYearTransitionService(from_year, to_year, user).plan()
+
+        if options['json']:
+            self.stdout.write(json.dumps(plan, indent=2))
+            return
+
+        templates = plan['templates']
+        self.stdout.write(
+            f"{plan['from_year']} -> {plan['to_year']}: {templates['total']} templates "
+            f"({templates['continuous']} continuous, {templates['carry_forward']} carry forward)"
+        )
+        for department in plan['departments']:
+            self.stdout.write(
+                f"  {department['department']}: {department['submissions']} submissions, "
+                f"{department['rows']} rows"
+            )
+
+        estimate = plan['estimate']
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {plan['totals']['submissions']} submissions, {plan['totals']['rows']} rows, "
+            f"~{estimate['seconds']}s at {estimate['rows_per_second']} rows/s ({estimate['rate_source']} rate)"
+        ))
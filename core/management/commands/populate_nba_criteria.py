@@ -1,26 +1,18 @@
 # core/management/commands/populate_nba_criteria.py
 from django.core.management.base import BaseCommand
-from core.models import Criteria, Board
+from core.frameworks import FrameworkLoader
 
 class Command(BaseCommand):
     help = 'Populate the database with NBA criteria'
 
-    def handle(self, *args, **kwargs):
-        # First ensure NBA board exists
-        nba_board, created = Board.objects.get_or_create(
-            code='nba',
-            defaults={'name': 'NBA'}
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing it'
         )
-        
-        if created:
-            self.stdout.write(
-                self.style.SUCCESS('Created NBA board')
-            )
-        else:
-            self.stdout.write(
-                self.style.SUCCESS('Using existing NBA board')
-            )
 
+    def handle(self, *args, **options):
         criteria_data = [
             {
                 'number': 1,
@@ -106,37 +98,24 @@ class Command(BaseCommand):
             },
         ]
 
-        created_count = 0
-        updated_count = 0
+        report = FrameworkLoader('nba', 'NBA', criteria_data).load(dry_run=options['dry_run'])
+        board = report.board
+        criteria = report.criteria
 
-        for data in criteria_data:
-            criteria, created = Criteria.objects.update_or_create(
-                board=nba_board,
-                number=data['number'],
-                defaults={
-                    'name': data['name'],
-                    'description': data['description'],
-                    'order': data['order']
-                }
-            )
-
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully {"created" if created else "updated"} NBA criterion {criteria.number}'
-                )
-            )
+        self.stdout.write(
+            self.style.SUCCESS(f'{"Created" if report.board_created else "Using existing"} NBA board')
+        )
+        for action, numbers in (('created', criteria.created), ('updated', criteria.updated)):
+            for number in numbers:
+                self.stdout.write(self.style.SUCCESS(f'Successfully {action} NBA criterion {number}'))
 
         summary = f'''
-        NBA Criteria population completed:
-        - Created: {created_count}
-        - Updated: {updated_count}
-        - Total: {created_count + updated_count}
-        - Board: {nba_board.name} ({nba_board.code})
+        NBA Criteria population {"checked (dry run)" if options['dry_run'] else "completed"}:
+        - Created: {len(criteria.created)}
+        - Updated: {len(criteria.updated)}
+        - Unchanged: {criteria.unchanged}
+        - Total: {criteria.total}
+        - Board: {board.name} ({board.code})
         '''.strip()
 
         self.stdout.write(self.style.SUCCESS(summary))
\ No newline at end of file
@@ -1,26 +1,18 @@
 # core/management/commands/populate_nirf_criteria.py
 from django.core.management.base import BaseCommand
-from core.models import Criteria, Board
+from core.frameworks import FrameworkLoader
 
 class Command(BaseCommand):
     help = 'Populate the database with NIRF criteria'
 
-    def handle(self, *args, **kwargs):
-        # First ensure NIRF board exists
-        nirf_board, created = Board.objects.get_or_create(
-            code='nirf',
-            defaults={'name': 'NIRF'}
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing it'
         )
-        
-        if created:
-            self.stdout.write(
-                self.style.SUCCESS('Created NIRF board')
-            )
-        else:
-            self.stdout.write(
-                self.style.SUCCESS('Using existing NIRF board')
-            )
 
+    def handle(self, *args, **options):
         criteria_data = [
             {
                 'number': 1,
@@ -79,37 +71,24 @@ class Command(BaseCommand):
             }
         ]
 
-        created_count = 0
-        updated_count = 0
+        report = FrameworkLoader('nirf', 'NIRF', criteria_data).load(dry_run=options['dry_run'])
+        board = report.board
+        criteria = report.criteria
 
-        for data in criteria_data:
-            criteria, created = Criteria.objects.update_or_create(
-                board=nirf_board,
-                number=data['number'],
-                defaults={
-                    'name': data['name'],
-                    'description': data['description'],
-                    'order': data['order']
-                }
-            )
-
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
-
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully {"created" if created else "updated"} NIRF criterion {criteria.number}'
-                )
-            )
+        self.stdout.write(
+            self.style.SUCCESS(f'{"Created" if report.board_created else "Using existing"} NIRF board')
+        )
+        for action, numbers in (('created', criteria.created), ('updated', criteria.updated)):
+            for number in numbers:
+                self.stdout.write(self.style.SUCCESS(f'Successfully {action} NIRF criterion {number}'))
 
         summary = f'''
-        NIRF Criteria population completed:
-        - Created: {created_count}
-        - Updated: {updated_count}
-        - Total: {created_count + updated_count}
-        - Board: {nirf_board.name} ({nirf_board.code})
+        NIRF Criteria population {"checked (dry run)" if options['dry_run'] else "completed"}:
+        - Created: {len(criteria.created)}
+        - Updated: {len(criteria.updated)}
+        - Unchanged: {criteria.unchanged}
+        - Total: {criteria.total}
+        - Board: {board.name} ({board.code})
         '''.strip()
 
         self.stdout.write(self.style.SUCCESS(summary))
\ No newline at end of file
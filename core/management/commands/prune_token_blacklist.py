@@ -0,0 +1,22 @@
+# core/management/commands/prune_token_blacklist.py
+from django.core.management.base import BaseCommand
+
+from core.authentication import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of tokens deleted per statement'
+        )
+
+    def handle(self, *args, **options):
+        removed = prune_expired_tokens(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Removed {removed} expired tokens')
+        )
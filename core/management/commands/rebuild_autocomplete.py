@@ -0,0 +1,22 @@
+# core/management/commands/rebuild_autocomplete.py
+from django.core.management.base import BaseCommand
+
+from core import autocomplete
+
+
+class Command(BaseCommand):
+    help = 'Recount autocomplete terms (names, titles) from all submission rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows read per query'
+        )
+
+    def handle(self, *args, **options):
+        terms = autocomplete.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {terms} distinct autocomplete terms')
+        )
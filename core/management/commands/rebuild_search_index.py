@@ -0,0 +1,22 @@
+# core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for all submissions and rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of submissions re-indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {written} documents ({search_backend()} backend)')
+        )
@@ -0,0 +1,126 @@
+# core/metrics.py
+"""
+In-process request metrics, rendered in the Prometheus text format.
+
+Each worker process keeps its own registry; Prometheus scrapes every
+process (or pod) separately and sums them, so nothing is shared or sent to
+an external service.
+"""
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'naac'
+
+
+class _ViewStats:
+    __slots__ = ('requests', 'statuses', 'buckets', 'duration', 'queries', 'db_time',
+                 'response_bytes', 'render_time')
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.response_bytes = 0
+        self.render_time = 0.0
+
+
+class MetricsRegistry:
+    """Per view/action request statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, action, method, status, duration, queries=0, db_time=0.0,
+                response_bytes=0, render_time=0.0):
+        key = (view, action, method)
+        with self._lock:
+            stats = self._views.get(key)
+            if stats is None:
+                stats = self._views[key] = _ViewStats()
+            stats.requests += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            bucket = bisect_left(DURATION_BUCKETS, duration)
+            if bucket < len(DURATION_BUCKETS):
+                stats.buckets[bucket] += 1
+            stats.duration += duration
+            stats.queries += queries
+            stats.db_time += db_time
+            stats.response_bytes += response_bytes
+            stats.render_time += render_time
+
+    def snapshot(self):
+        """{(view, action, method): dict of totals}, for tests and debugging"""
+        with self._lock:
+            return {
+                key: {name: getattr(stats, name) for name in _ViewStats.__slots__}
+                for key, stats in self._views.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+                lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+
+            family('http_requests_total', 'counter', 'Requests handled, by view, action and status')
+            for key, stats in views:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'{PREFIX}_http_requests_total{{{_labels(key, status=status)}}} {count}')
+
+            family('http_request_duration_seconds', 'histogram', 'Wall time spent handling requests')
+            for key, stats in views:
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'{PREFIX}_http_request_duration_seconds_bucket'
+                        f'{{{_labels(key, le=_number(bound))}}} {cumulative}'
+                    )
+                lines.append(
+                    f'{PREFIX}_http_request_duration_seconds_bucket'
+                    f'{{{_labels(key, le="+Inf")}}} {stats.requests}'
+                )
+                lines.append(f'{PREFIX}_http_request_duration_seconds_sum{{{_labels(key)}}} {_number(stats.duration)}')
+                lines.append(f'{PREFIX}_http_request_duration_seconds_count{{{_labels(key)}}} {stats.requests}')
+
+            totals = (
+                ('db_queries_total', 'queries', 'Database queries executed'),
+                ('db_duration_seconds_total', 'db_time', 'Time spent in database queries'),
+                ('response_bytes_total', 'response_bytes', 'Response body bytes sent'),
+                ('render_duration_seconds_total', 'render_time', 'Time spent rendering (serializing) responses'),
+            )
+            for name, attribute, help_text in totals:
+                family(name, 'counter', help_text)
+                for key, stats in views:
+                    lines.append(f'{PREFIX}_{name}{{{_labels(key)}}} {_number(getattr(stats, attribute))}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, **extra):
+    view, action, method = key
+    pairs = [('view', view), ('action', action), ('method', method), *extra.items()]
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
@@ -1,7 +1,17 @@
 # core/middleware.py
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
 from django.http import JsonResponse
 from rest_framework import status
 
+from .metrics import registry
+from .queries import QueryBudgetExceeded, QueryPatternDetector, budget_for
+
+logger = logging.getLogger(__name__)
+
 class APIErrorHandlerMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -16,4 +26,130 @@ class APIErrorHandlerMiddleware:
                 'error': str(exception),
                 'detail': getattr(exception, 'detail', str(exception))
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return None
\ No newline at end of file
+        return None
+
+
+class _QueryTimer:
+    """connection.execute_wrapper hook counting queries and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def resolved_view(request):
+    """
+    (view, action) that handled the request: the view class and its ViewSet
+    action (or lowercased method), or (view function, None)
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    func = match.func
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if cls is None:
+        return func, None
+    actions = getattr(func, 'actions', None) or {}
+    method = request.method.lower()
+    return cls, actions.get(method, method)
+
+
+def view_labels(request):
+    """(view, action) names for metrics; ViewSets report their action"""
+    view, action = resolved_view(request)
+    if view is None:
+        return 'unmatched', ''
+    if action is None:
+        return request.resolver_match.view_name or view.__name__, ''
+    return view.__name__, action
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, DB queries and time, response size and render time per
+    view/action in core.metrics, and reports them in a Server-Timing header
+    when SERVER_TIMING_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        request._render_time = 0.0
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        size = 0 if response.streaming else len(response.content)
+        render_time = request._render_time
+        view, action = view_labels(request)
+        registry.observe(
+            view, action, request.method, response.status_code, duration,
+            queries=timer.count, db_time=timer.duration,
+            response_bytes=size, render_time=render_time
+        )
+
+        if getattr(settings, 'SERVER_TIMING_ENABLED', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+                f'render;dur={render_time * 1000:.1f}',
+                f'total;dur={duration * 1000:.1f}',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._render_time = time.perf_counter() - start
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class QueryPatternMiddleware:
+    """
+    Development/test aid enabled by QUERY_DETECTOR_ENABLED (defaults to DEBUG).
+    Logs structurally identical queries repeated QUERY_REPEAT_THRESHOLD times
+    in one request and checks the view's declared query budget, raising
+    QueryBudgetExceeded when QUERY_BUDGET_STRICT is set (as in the tests).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_DETECTOR_ENABLED', settings.DEBUG):
+            return self.get_response(request)
+
+        with QueryPatternDetector() as detector:
+            response = self.get_response(request)
+
+        view, action = resolved_view(request)
+        repeated = detector.repeated()
+        if repeated:
+            logger.warning("Repeated queries in %s %s (%s.%s):\n%s", request.method, request.path,
+                           getattr(view, '__name__', view), action, detector.report())
+        response['X-Query-Count'] = str(detector.count)
+
+        budget = budget_for(view, action)
+        if budget is not None and detector.count > budget:
+            message = (f"{request.method} {request.path} ran {detector.count} queries, "
+                       f"budget is {budget}:\n{detector.report(2)}")
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 09:12
+
+from django.db import migrations
+
+# jsonb_path_ops GIN indexes only serve containment (@>) lookups such as
+# metadata__contains / data__contains, which is all we query these columns with.
+GIN_INDEXES = [
+    ('core_template_metadata_gin', 'core_template', 'metadata'),
+    ('core_submissiondata_data_gin', 'core_submissiondata', 'data'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ("{column}" jsonb_path_ops)'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_alter_template_code"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
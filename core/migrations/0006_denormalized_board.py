@@ -0,0 +1,48 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_board(apps, schema_editor):
+    Criteria = apps.get_model('core', 'Criteria')
+    Template = apps.get_model('core', 'Template')
+    DataSubmission = apps.get_model('core', 'DataSubmission')
+
+    # Two set-based UPDATEs instead of saving every row
+    Template.objects.update(board_id=Subquery(
+        Criteria.objects.filter(pk=OuterRef('criteria_id')).values('board_id')[:1]
+    ))
+    DataSubmission.objects.update(board_id=Subquery(
+        Template.objects.filter(pk=OuterRef('template_id')).values('board_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_jsonb_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasubmission',
+            name='board',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='core.board'),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='board',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='templates', to='core.board'),
+        ),
+        migrations.AddIndex(
+            model_name='datasubmission',
+            index=models.Index(fields=['board', 'academic_year', 'status'], name='core_datasu_board_i_de6127_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['board', 'code'], name='core_templa_board_i_56ec87_idx'),
+        ),
+        migrations.RunPython(backfill_board, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_denormalized_board"),
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+    ]
+
+    # simplejwt does not index expires_at; token pruning filters on it
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS "token_blacklist_outstandingtoken_expires_at_idx" '
+            'ON "token_blacklist_outstandingtoken" ("expires_at")',
+            'DROP INDEX IF EXISTS "token_blacklist_outstandingtoken_expires_at_idx"',
+        ),
+    ]
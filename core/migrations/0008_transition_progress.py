@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='completed_templates',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='last_progress_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='rows_copied',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='submissions_created',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='templates_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='academicyeartransition',
+            name='templates_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+def extract_flags(apps, schema_editor):
+    Template = apps.get_model('core', 'Template')
+
+    def flag(metadata, name):
+        sections = metadata if isinstance(metadata, list) else [metadata]
+        return any(isinstance(section, dict) and bool(section.get(name)) for section in sections)
+
+    # Historical models don't have Template.save(), so extract here
+    templates = list(Template.objects.only('id', 'metadata'))
+    for template in templates:
+        template.continuous = flag(template.metadata, 'continuous')
+        template.carry_forward = flag(template.metadata, 'carry_forward')
+    Template.objects.bulk_update(templates, ['continuous', 'carry_forward'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_transition_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='carry_forward',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='continuous',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(extract_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The full-text index is vendor specific and invisible to the ORM; core/search.py
+# knows how to query each variant.
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS core_searchdocument_fts USING fts5(
+        title, body,
+        content='core_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_au',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ai',
+    'DROP TABLE IF EXISTS core_searchdocument_fts',
+]
+
+# 'simple' keeps names and codes intact instead of stemming them as English
+POSTGRES_INDEX = [
+    """ALTER TABLE core_searchdocument ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS core_searchdocument_vector_gin ON core_searchdocument USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS core_searchdocument_vector_gin',
+    'ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_template_transition_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('kind', models.CharField(choices=[('submission', 'Submission'), ('row', 'Row')], max_length=20)),
+                ('title', models.CharField(max_length=600)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('row', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='core.submissiondata')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='core.datasubmission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'submission'], name='core_search_kind_2dacc7_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
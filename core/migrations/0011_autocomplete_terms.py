@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+def create_pattern_index(apps, schema_editor):
+    # LIKE 'prefix%' can only use a btree index with pattern ops under a
+    # non-C collation
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_autocompleteterm_prefix_idx '
+        'ON core_autocompleteterm (kind, normalized varchar_pattern_ops)'
+    )
+
+
+def drop_pattern_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_autocompleteterm_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_search_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=255)),
+                ('normalized', models.CharField(max_length=255)),
+                ('frequency', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('kind', 'normalized')},
+            },
+        ),
+        migrations.RunPython(create_pattern_index, drop_pattern_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_autocomplete_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='row_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='snapshot',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='submissionhistory',
+            index=models.Index(fields=['submission', 'performed_at'], name='core_submis_submiss_0cda79_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_history_deltas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submissionhistory',
+            name='performed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=50)),
+                ('performed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('row_id', models.BigIntegerField(blank=True, null=True)),
+                ('delta', models.JSONField()),
+                ('details', models.JSONField(blank=True, null=True)),
+                ('performed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_events', to='core.datasubmission')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
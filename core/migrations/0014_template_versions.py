@@ -0,0 +1,142 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:43
+
+import hashlib
+import json
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Copies of core.layouts as of this migration, so later changes there don't
+# change what it writes
+
+
+def metadata_checksum(metadata):
+    encoded = json.dumps(metadata, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _leaves(column, prefix='', display_prefix=''):
+    name = f"{prefix}{column['name']}"
+    label = column.get('display_name', column['name'])
+    display_name = f'{display_prefix}{label}'
+    if column.get('type') == 'group':
+        for nested in column.get('columns', []):
+            yield from _leaves(nested, f'{name}_', f'{display_name} - ')
+    else:
+        yield name, display_name, label, column
+
+
+def compile_section(section):
+    columns, groups = [], []
+    for column in section.get('columns', []):
+        group = None
+        if column.get('type') == 'group':
+            group = len(groups)
+            groups.append({
+                'name': column['name'],
+                'label': column.get('display_name', column['name']),
+                'start': len(columns),
+                'span': 0
+            })
+        for name, display_name, label, definition in _leaves(column):
+            compiled = {'name': name, 'label': label, 'display_name': display_name, 'group': group}
+            compiled.update({
+                key: definition[key] for key in ('data_type', 'required', 'options', 'validation')
+                if key in definition
+            })
+            compiled.setdefault('data_type', 'string')
+            compiled.setdefault('required', False)
+            columns.append(compiled)
+        if group is not None:
+            groups[group]['span'] = len(columns) - groups[group]['start']
+
+    return {
+        'headers': list(section.get('headers', [])),
+        'title': section.get('title'),
+        'required': bool(section.get('required', False)),
+        'columns': columns,
+        'groups': groups,
+        'required_fields': [column['name'] for column in columns if column['required']],
+        'width': len(columns),
+    }
+
+
+def compile_layout(metadata):
+    if isinstance(metadata, dict):
+        metadata = [metadata]
+    return [compile_section(section) for section in metadata or [] if isinstance(section, dict)]
+
+
+def create_versions(apps, schema_editor):
+    Template = apps.get_model('core', 'Template')
+    TemplateVersion = apps.get_model('core', 'TemplateVersion')
+    DataSubmission = apps.get_model('core', 'DataSubmission')
+
+    # Earlier structures weren't kept, so existing submissions are pinned to
+    # version 1: the metadata as it is now
+    batch = []
+    for template in Template.objects.only('id', 'metadata').iterator(chunk_size=500):
+        batch.append(TemplateVersion(
+            template_id=template.id,
+            number=1,
+            metadata=template.metadata,
+            layout=compile_layout(template.metadata),
+            checksum=metadata_checksum(template.metadata)
+        ))
+        if len(batch) == 500:
+            TemplateVersion.objects.bulk_create(batch)
+            batch = []
+    TemplateVersion.objects.bulk_create(batch)
+
+    def first_version(template_field):
+        return models.Subquery(
+            TemplateVersion.objects.filter(template_id=models.OuterRef(template_field), number=1).values('id')[:1]
+        )
+
+    Template.objects.update(current_version=first_version('pk'))
+    DataSubmission.objects.update(template_version=first_version('template_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_audit_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TemplateVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('metadata', models.JSONField()),
+                ('layout', models.JSONField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='core.template')),
+            ],
+            options={
+                'ordering': ['template', '-number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='datasubmission',
+            name='template_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='core.templateversion'),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='current_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.templateversion'),
+        ),
+        migrations.AddIndex(
+            model_name='templateversion',
+            index=models.Index(fields=['template', 'checksum'], name='core_templa_templat_0b8da7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='templateversion',
+            unique_together={('template', 'number')},
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
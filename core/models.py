@@ -2,6 +2,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.dateparse import parse_date
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email, URLValidator
 # from django.contrib.postgres.fields import JSONField
@@ -49,6 +50,12 @@ class Criteria(models.Model):
     def __str__(self):
         return f"{self.board.name} Criterion {self.number}: {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Keep the denormalized board on templates and submissions in sync
+        Template.objects.filter(criteria=self).exclude(board_id=self.board_id).update(board_id=self.board_id)
+        DataSubmission.objects.filter(template__criteria=self).exclude(board_id=self.board_id).update(board_id=self.board_id)
+
 class Department(models.Model):
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=20, unique=True)
@@ -109,9 +116,51 @@ class AcademicYearTransition(models.Model):
     error_log = models.TextField(null=True, blank=True)
     processed_by = models.ForeignKey(User, on_delete=models.PROTECT)
 
+    # Progress and checkpoint: ids of templates whose rollover has committed
+    templates_total = models.PositiveIntegerField(default=0)
+    templates_done = models.PositiveIntegerField(default=0)
+    submissions_created = models.PositiveIntegerField(default=0)
+    rows_copied = models.PositiveBigIntegerField(default=0)
+    completed_templates = models.JSONField(default=list, blank=True)
+    last_progress_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-started_at']
         unique_together = ['from_year', 'to_year']
+
+    @property
+    def progress_percent(self):
+        if not self.templates_total:
+            return 100.0 if self.status == 'completed' else 0.0
+        return round(100.0 * self.templates_done / self.templates_total, 1)
+
+    @property
+    def rows_per_second(self):
+        if not self.last_progress_at or not self.rows_copied:
+            return 0.0
+        elapsed = (self.last_progress_at - self.started_at).total_seconds()
+        return round(self.rows_copied / elapsed, 1) if elapsed > 0 else 0.0
+
+    def record_template_done(self, template_id, submissions_created, rows_copied):
+        """Checkpoint a template; call inside the transaction that did its work"""
+        locked = AcademicYearTransition.objects.select_for_update().get(pk=self.pk)
+        if template_id in locked.completed_templates:
+            return False
+
+        locked.completed_templates.append(template_id)
+        locked.templates_done = len(locked.completed_templates)
+        locked.submissions_created += submissions_created
+        locked.rows_copied += rows_copied
+        locked.last_progress_at = timezone.now()
+        locked.save(update_fields=[
+            'completed_templates', 'templates_done', 'submissions_created',
+            'rows_copied', 'last_progress_at'
+        ])
+
+        for field in ('completed_templates', 'templates_done', 'submissions_created',
+                      'rows_copied', 'last_progress_at'):
+            setattr(self, field, getattr(locked, field))
+        return True
         
 class Board(models.Model):
     name = models.CharField(max_length=100)
@@ -135,9 +184,31 @@ class Template(models.Model):
     on_delete=models.PROTECT,
     related_name='templates',
     )
+    # Denormalized from criteria.board so board filters don't need joins
+    board = models.ForeignKey(
+        'Board',
+        on_delete=models.PROTECT,
+        related_name='templates',
+        null=True,
+        blank=True,
+        editable=False
+    )
     metadata = models.JSONField(
         help_text="Template structure including sections, headers, and columns"
     )
+    # Extracted from the metadata sections on save, so transitions can select
+    # templates with an index instead of scanning JSON
+    continuous = models.BooleanField(default=False, db_index=True, editable=False)
+    carry_forward = models.BooleanField(default=False, db_index=True, editable=False)
+    # Version matching the metadata, maintained on save (core/layouts.py)
+    current_version = models.ForeignKey(
+        'TemplateVersion',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -147,16 +218,40 @@ class Template(models.Model):
         indexes = [
             models.Index(fields=['code']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['board', 'code']),
         ]
         unique_together = ['criteria', 'code']
-        
-    @property
-    def board(self):
-        return self.criteria.board if self.criteria else None
-    
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        if self.criteria_id:
+            self.board_id = self.criteria.board_id
+        self.continuous = self.metadata_flag('continuous')
+        self.carry_forward = self.metadata_flag('carry_forward')
+        super().save(*args, **kwargs)
+        DataSubmission.objects.filter(template=self).exclude(board_id=self.board_id).update(board_id=self.board_id)
+        from .layouts import sync_versions
+        sync_versions([self])
+
+    def get_current_version(self):
+        """The version matching the metadata; created for templates written in bulk"""
+        if self.current_version_id is None:
+            from .layouts import sync_versions
+            sync_versions([self])
+        return self.current_version
+
+    @property
+    def layout(self):
+        """Precompiled layout of the current metadata (see core/layouts.py)"""
+        return self.get_current_version().layout
+
+    def metadata_flag(self, flag):
+        """True if any section (or a legacy dict metadata) sets the flag"""
+        sections = self.metadata if isinstance(self.metadata, list) else [self.metadata]
+        return any(isinstance(section, dict) and bool(section.get(flag)) for section in sections)
+
     def clean(self):
         """Validate the template structure"""
         if not isinstance(self.metadata, list):
@@ -165,6 +260,13 @@ class Template(models.Model):
         for section in self.metadata:
             self._validate_section(section)
 
+        # Imported here so loading the models doesn't pull in pandas
+        from .utils.carry_forward import compile_section_rules
+        try:
+            compile_section_rules(self.metadata)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
     def _validate_section(self, section):
         """Validate a single section structure"""
         if not isinstance(section, dict):
@@ -262,15 +364,14 @@ class Template(models.Model):
 
     def validate_data(self, data, section_index):
         """Validate submitted data against template structure"""
-        if section_index >= len(self.metadata):
+        layout = self.layout
+        if section_index >= len(layout):
             raise ValidationError("Invalid section index")
 
-        section = self.metadata[section_index]
-        flat_columns = self._flatten_column_names(section['columns'])
-        
         # Validate required fields and data types
-        for column_name, column_def in flat_columns.items():
-            if column_def.get('required', False) and column_name not in data:
+        for column_def in layout[section_index]['columns']:
+            column_name = column_def['name']
+            if column_def['required'] and column_name not in data:
                 raise ValidationError(f"Required field missing: {column_name}")
             
             if column_name in data:
@@ -365,6 +466,36 @@ class Template(models.Model):
             if not re.match(validation['pattern'], value):
                 raise ValidationError("Value does not match required pattern")
 
+class TemplateVersion(models.Model):
+    """
+    Immutable snapshot of a template's metadata, with the layout compiled
+    from it. Submissions pin the version they were entered against, so they
+    are validated and exported with that structure after the template
+    changes. Created by Template.save() (core/layouts.py).
+    """
+    template = models.ForeignKey(Template, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField()
+    metadata = models.JSONField()
+    layout = models.JSONField()
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['template', '-number']
+        unique_together = ['template', 'number']
+        indexes = [
+            models.Index(fields=['template', 'checksum']),
+        ]
+
+    def __str__(self):
+        return f"{self.template.code} v{self.number}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError("Template versions are immutable")
+        super().save(*args, **kwargs)
+
+
 class DataSubmission(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -374,6 +505,23 @@ class DataSubmission(models.Model):
     )
 
     template = models.ForeignKey('Template', on_delete=models.PROTECT)
+    # Structure the data was entered against, pinned on creation
+    template_version = models.ForeignKey(
+        TemplateVersion,
+        on_delete=models.PROTECT,
+        related_name='submissions',
+        null=True,
+        blank=True
+    )
+    # Denormalized from template.board so board filters don't need joins
+    board = models.ForeignKey(
+        'Board',
+        on_delete=models.PROTECT,
+        related_name='submissions',
+        null=True,
+        blank=True,
+        editable=False
+    )
     department = models.ForeignKey('Department', on_delete=models.PROTECT)
     academic_year = models.ForeignKey('AcademicYear', on_delete=models.PROTECT)
     submitted_by = models.ForeignKey(User, on_delete=models.PROTECT, related_name='submissions')
@@ -397,13 +545,23 @@ class DataSubmission(models.Model):
         unique_together = ['template', 'department', 'academic_year']
         ordering = ['-academic_year__start_date', '-updated_at']
 
-    @property
-    def board(self):
-        return self.template.criteria.board
-
     def __str__(self):
         return f"{self.template.code} - {self.department.name} ({self.academic_year})"
 
+    def save(self, *args, **kwargs):
+        if self.template_id:
+            self.board_id = self.template.board_id
+            if self.template_version_id is None:
+                self.template_version = self.template.get_current_version()
+        super().save(*args, **kwargs)
+
+    @property
+    def layout(self):
+        """Layout of the pinned template version"""
+        if self.template_version_id is None:
+            return self.template.layout
+        return self.template_version.layout
+
     def clean(self):
         # Ensure only IQAC directors can verify submissions
         if self.verified_by and self.verified_by.role != 'iqac_director':
@@ -435,6 +593,9 @@ class DataSubmission(models.Model):
     class Meta:
         ordering = ['-academic_year__start_date', '-updated_at']
         unique_together = ['template', 'department', 'academic_year']
+        indexes = [
+            models.Index(fields=['board', 'academic_year', 'status']),
+        ]
         permissions = [
             ("can_verify_submission", "Can verify submission"),
             ("can_view_all_submissions", "Can view all submissions"),
@@ -455,21 +616,30 @@ class SubmissionData(models.Model):
 
     def __str__(self):
         return f"Data for {self.submission} (Section {self.section_index}, Row {self.row_number})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets a save know the row's previous data without reading it again;
+        # callers replace .data rather than mutating it in place
+        if 'data' in instance.__dict__:
+            instance._loaded_data = instance.data
+        return instance
+
     class Meta:
         ordering = ['section_index', 'row_number']
         unique_together = ['submission', 'section_index', 'row_number']
 
     def clean(self):
-        if self.section_index >= len(self.submission.template.metadata):
+        if self.section_index >= len(self.submission.layout):
             raise ValidationError("Invalid section index")
         
         # Validate data against template structure
         self.validate_data_against_template()
 
     def validate_data_against_template(self):
-        """Validate the data against the template structure"""
-        section = self.submission.template.metadata[self.section_index]
-        template_columns = self._flatten_columns(section['columns'])
+        """Validate the data against the structure the submission was entered with"""
+        template_columns = self.submission.layout[self.section_index]['columns']
         
         # Check required fields
         for column in template_columns:
@@ -513,10 +683,106 @@ class SubmissionHistory(models.Model):
     submission = models.ForeignKey('DataSubmission', on_delete=models.CASCADE, related_name='history')
     action = models.CharField(max_length=50)
     performed_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True)
-    performed_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add: entries written from AuditEvents keep the edit time
+    performed_at = models.DateTimeField(default=timezone.now)
     details = models.JSONField(null=True, blank=True)
-    previous_data = models.JSONField(null=True, blank=True)  # Store previous state
-    new_data = models.JSONField(null=True, blank=True)      # Store new state
+    previous_data = models.JSONField(null=True, blank=True)  # Legacy: full previous state
+    new_data = models.JSONField(null=True, blank=True)      # Legacy: full new state
+    # Row-level change (see core/history.py); rows can be deleted, so no FK
+    row_id = models.BigIntegerField(null=True, blank=True)
+    delta = models.JSONField(null=True, blank=True)
+    # Full data state after this entry, written every HISTORY_SNAPSHOT_INTERVAL deltas
+    snapshot = models.JSONField(null=True, blank=True)
 
     class Meta:
-        ordering = ['-performed_at']
\ No newline at end of file
+        ordering = ['-performed_at']
+        indexes = [
+            models.Index(fields=['submission', 'performed_at']),
+        ]
+
+class SearchDocument(models.Model):
+    """
+    Flattened text of a submission or one of its data rows.
+
+    The full-text index itself lives outside the ORM: an FTS5 table kept in
+    sync by triggers on SQLite, a generated tsvector column with a GIN index
+    on PostgreSQL (see migration 0010 and core/search.py).
+    """
+    KIND_CHOICES = (
+        ('submission', 'Submission'),
+        ('row', 'Row'),
+    )
+
+    key = models.CharField(max_length=40, unique=True)  # "<kind>:<pk>"
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    submission = models.ForeignKey(
+        DataSubmission,
+        on_delete=models.CASCADE,
+        related_name='search_documents'
+    )
+    row = models.ForeignKey(
+        SubmissionData,
+        on_delete=models.CASCADE,
+        related_name='search_documents',
+        null=True,
+        blank=True
+    )
+    title = models.CharField(max_length=600)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'submission']),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class AutocompleteTerm(models.Model):
+    """
+    Distinct value seen in submission rows for one kind of column (person
+    names, titles, ...), with how many rows currently contain it. Kept up to
+    date incrementally by core/autocomplete.py.
+    """
+    kind = models.CharField(max_length=20)
+    value = models.CharField(max_length=255)
+    normalized = models.CharField(max_length=255)
+    frequency = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # The unique index doubles as the prefix index: lookups are range
+        # scans over (kind, normalized). PostgreSQL gets an extra
+        # varchar_pattern_ops index for LIKE 'prefix%' (migration 0011).
+        unique_together = ['kind', 'normalized']
+
+    def __str__(self):
+        return f"{self.kind}: {self.value} ({self.frequency})"
+
+
+class AuditEvent(models.Model):
+    """
+    Outbox of row changes waiting to be written to SubmissionHistory.
+
+    Events are inserted in the editing request's transaction and removed in
+    the same transaction that writes their history entries, so a crashed
+    worker leaves them in place to be picked up again (core/history.py).
+    """
+    submission = models.ForeignKey(
+        DataSubmission,
+        on_delete=models.CASCADE,
+        related_name='audit_events'
+    )
+    action = models.CharField(max_length=50)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    performed_at = models.DateTimeField(default=timezone.now)
+    row_id = models.BigIntegerField(null=True, blank=True)
+    delta = models.JSONField()
+    details = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.action} on {self.submission_id} at {self.performed_at}"
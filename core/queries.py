@@ -0,0 +1,140 @@
+# core/queries.py
+"""
+Query pattern detection for development and tests.
+
+QueryPatternDetector groups the SQL run inside it by structure (literals
+and parameter lists folded away), so a loop issuing the same query per
+object shows up as one pattern with a high count: the N+1 signature.
+
+Views declare how many queries they are allowed next to their code::
+
+    @query_budget(6)
+    @action(detail=True, methods=['get'])
+    def data(self, request, code=None):
+        ...
+
+or for a whole ViewSet with ``query_budgets = {'list': 4}``. The
+QueryPatternMiddleware checks requests against these budgets
+(core/middleware.py).
+"""
+import re
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\$\d+)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """Structure of a statement: literals and IN (...) lists replaced by placeholders"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def _caller():
+    """
+    Innermost stack frame in project code, as 'path:line in function'; for
+    queries issued by library code alone (e.g. nested serializers) the
+    innermost frame outside Django's ORM
+    """
+    base = str(settings.BASE_DIR)
+    stack = list(reversed(traceback.extract_stack()))
+    for frame in stack:
+        filename = frame.filename
+        if filename.startswith(base) and 'site-packages' not in filename and '/tests/' not in filename \
+                and not filename.endswith(('core/queries.py', 'core/middleware.py')):
+            return f'{filename[len(base) + 1:]}:{frame.lineno} in {frame.name}'
+    for frame in stack:
+        if '/django/db/' not in frame.filename and not frame.filename.endswith('core/queries.py'):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class QueryPatternDetector:
+    """Context manager recording every query run on ``connection`` while active"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        self.patterns = Counter()
+        self.locations = {}
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        pattern = normalize_sql(sql)
+        self.patterns[pattern] += 1
+        if pattern not in self.locations:
+            self.locations[pattern] = _caller()
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+        self._wrapper = None
+
+    @property
+    def count(self):
+        return sum(self.patterns.values())
+
+    def repeated(self, threshold=None):
+        """[(pattern, count, location)] for patterns run at least ``threshold`` times"""
+        threshold = threshold or self.threshold
+        return [
+            (pattern, count, self.locations.get(pattern))
+            for pattern, count in self.patterns.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, threshold=None):
+        return '\n'.join(
+            f'{count}x {pattern[:200]}' + (f'\n    at {location}' if location else '')
+            for pattern, count, location in self.repeated(threshold)
+        )
+
+    def assert_no_repeats(self, threshold=None):
+        repeated = self.repeated(threshold)
+        if repeated:
+            raise AssertionError(f'Repeated query patterns (likely N+1):\n{self.report(threshold)}')
+
+    def assert_at_most(self, budget):
+        if self.count > budget:
+            raise QueryBudgetExceeded(
+                f'{self.count} queries run, budget is {budget}\n{self.report(2)}'
+            )
+
+
+def query_budget(limit):
+    """Declare the maximum number of queries a view function or action may run"""
+    def decorator(func):
+        func.query_budget = limit
+        return func
+    return decorator
+
+
+def budget_for(view, action):
+    """
+    The budget declared for ``action`` of ``view`` (a class, or a plain view
+    function with ``action`` None), or None
+    """
+    if view is None:
+        return None
+    if action is None:
+        return getattr(view, 'query_budget', None)
+    budget = getattr(getattr(view, action, None), 'query_budget', None)
+    if budget is None:
+        budget = getattr(view, 'query_budgets', {}).get(action)
+    return budget
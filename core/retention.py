@@ -0,0 +1,234 @@
+# core/retention.py
+"""
+Retention for submission history.
+
+* expire: entries older than their action's HISTORY_RETENTION_DAYS are
+  removed. Deltas can only go as a prefix of a submission's chain, which is
+  folded into one snapshot entry so later states still replay.
+* compact: consecutive updates of one row by one user within
+  HISTORY_COMPACT_WINDOW_MINUTES become a single entry.
+* archive: history of closed academic years is written to gzipped JSONL
+  files under HISTORY_ARCHIVE_DIR and replaced by one 'archived' snapshot.
+
+Every step works on small batches of submissions in their own transaction
+and is safe to run again after an interruption.
+"""
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils import timezone
+
+from . import history
+from .models import AcademicYear, SubmissionHistory
+
+# Entry types that replay starts from; they are only removed by folding
+BASE_ACTIONS = ('snapshot', 'archived')
+
+
+def _chain_condition():
+    # Entries replay depends on: deltas, snapshots and legacy full states
+    return (
+        Q(delta__isnull=False) | Q(snapshot__isnull=False)
+        | Q(delta__isnull=True, new_data__isnull=False)
+    )
+
+
+def submission_batches(queryset=None, batch_size=100, start_after=0):
+    """Lists of ids of submissions that have history, in id order"""
+    entries = SubmissionHistory.objects.all() if queryset is None else queryset
+    last_id = start_after
+    while True:
+        ids = list(
+            entries.filter(submission_id__gt=last_id)
+            .order_by('submission_id')
+            .values_list('submission_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _expired(action, performed_at, now):
+    days = getattr(settings, 'HISTORY_RETENTION_DAYS', {}).get(action)
+    return days is not None and performed_at < now - timedelta(days=days)
+
+
+def expire_history(submission_id, now=None):
+    """Apply the retention policies to one submission; returns entries removed"""
+    now = now or timezone.now()
+    entries = (
+        SubmissionHistory.objects.filter(submission_id=submission_id)
+        .annotate(in_chain=ExpressionWrapper(_chain_condition(), output_field=BooleanField()))
+        .order_by('id')
+        .values_list('id', 'action', 'performed_at', 'in_chain')
+    )
+
+    standalone = []
+    expired_prefix = []
+    prefix_open = True
+    for entry_id, action, performed_at, in_chain in entries:
+        if not in_chain:
+            if _expired(action, performed_at, now):
+                standalone.append(entry_id)
+        elif prefix_open and (action in BASE_ACTIONS or _expired(action, performed_at, now)):
+            # Older snapshots are only bases for the entries being folded away
+            expired_prefix.append(entry_id)
+        else:
+            prefix_open = False
+
+    with transaction.atomic():
+        removed = SubmissionHistory.objects.filter(id__in=standalone).delete()[0]
+        if len(expired_prefix) > 1:
+            # The newest expired entry becomes the snapshot later entries replay from
+            fold_id = expired_prefix[-1]
+            state, _ = history.state_at(submission_id, upto_id=fold_id)
+            SubmissionHistory.objects.filter(id=fold_id).update(
+                action='snapshot', row_id=None, delta=None, snapshot=state,
+                previous_data=None, new_data=None, details=None
+            )
+            removed += SubmissionHistory.objects.filter(id__in=expired_prefix[:-1]).delete()[0]
+    return removed
+
+
+def _compactable(entry, previous, window):
+    return (
+        previous is not None
+        and entry.action == previous.action == 'row_updated'
+        and entry.row_id == previous.row_id
+        and entry.performed_by_id == previous.performed_by_id
+        and entry.performed_at - previous.performed_at <= window
+        and not previous.has_snapshot
+    )
+
+
+def compact_history(submission_id, window=None):
+    """Merge runs of quick successive edits of one row; returns entries removed"""
+    if window is None:
+        window = timedelta(minutes=getattr(settings, 'HISTORY_COMPACT_WINDOW_MINUTES', 30))
+    entries = (
+        SubmissionHistory.objects.filter(submission_id=submission_id)
+        .annotate(has_snapshot=ExpressionWrapper(Q(snapshot__isnull=False), output_field=BooleanField()))
+        .defer('snapshot', 'previous_data', 'new_data')
+        .order_by('id')
+    )
+
+    runs = []
+    run = []
+    for entry in entries:
+        if run and _compactable(entry, run[-1], window):
+            run.append(entry)
+            continue
+        if len(run) > 1:
+            runs.append(run)
+        run = [entry]
+    if len(run) > 1:
+        runs.append(run)
+
+    removed = 0
+    with transaction.atomic():
+        for run in runs:
+            kept = run[-1]
+            delta = history.compose_updates([entry.delta for entry in run])
+            merged = sum((entry.details or {}).get('compacted', 1) for entry in run)
+            SubmissionHistory.objects.filter(id=kept.id).update(
+                delta=delta,
+                details={
+                    'changes': history.describe_changes(kept.row_id, delta),
+                    'additional_info': (kept.details or {}).get('additional_info'),
+                    'compacted': merged
+                }
+            )
+            removed += SubmissionHistory.objects.filter(id__in=[entry.id for entry in run[:-1]]).delete()[0]
+    return removed
+
+
+def closed_years(today=None):
+    """Academic years that have ended and are not current"""
+    today = today or timezone.localdate()
+    return AcademicYear.objects.filter(is_current=False, end_date__lt=today)
+
+
+def archive_directory():
+    return Path(getattr(settings, 'HISTORY_ARCHIVE_DIR', settings.BASE_DIR / 'history_archive'))
+
+
+def _archive_record(entry):
+    return {
+        'id': entry.id,
+        'submission_id': entry.submission_id,
+        'action': entry.action,
+        'performed_by_id': entry.performed_by_id,
+        'performed_at': entry.performed_at,
+        'row_id': entry.row_id,
+        'delta': entry.delta,
+        'snapshot': entry.snapshot,
+        'previous_data': entry.previous_data,
+        'new_data': entry.new_data,
+        'details': entry.details,
+    }
+
+
+def archive_submissions(year, submission_ids, directory=None):
+    """
+    Move the history of ``submission_ids`` (all in ``year``) to one gzipped
+    JSONL file and leave an 'archived' snapshot per submission. The file is
+    named after the entry id range, so a rerun after a crash rewrites the
+    same file. Returns ``(path, entries archived)``.
+    """
+    history.flush_events(submission_ids=submission_ids)
+    entries = SubmissionHistory.objects.filter(submission_id__in=submission_ids).order_by('id')
+    bounds = list(entries.values_list('id', flat=True)[:1]) + list(
+        entries.reverse().values_list('id', flat=True)[:1]
+    )
+    if not bounds:
+        return None, 0
+    first_id, last_id = bounds
+
+    directory = Path(directory or archive_directory()) / year.name
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'history-{first_id}-{last_id}.jsonl.gz'
+    partial = path.with_suffix('.gz.partial')
+
+    archived = 0
+    with gzip.open(partial, 'wt', encoding='utf-8') as archive:
+        for entry in entries.filter(id__lte=last_id).iterator(chunk_size=500):
+            archive.write(json.dumps(_archive_record(entry), cls=DjangoJSONEncoder))
+            archive.write('\n')
+            archived += 1
+    os.replace(partial, path)
+
+    with transaction.atomic():
+        final_states = {
+            submission_id: history.state_at(submission_id, upto_id=last_id)[0]
+            for submission_id in submission_ids
+        }
+        entries.filter(id__lte=last_id).delete()
+        SubmissionHistory.objects.bulk_create([
+            SubmissionHistory(
+                submission_id=submission_id,
+                action='archived',
+                snapshot=state,
+                details={'archive': str(path)}
+            )
+            for submission_id, state in final_states.items()
+        ])
+    return path, archived
+
+
+def archive_year(year, directory=None, batch_size=100, start_after=0):
+    """Archive a closed year's history in batches; yields (last submission id, path, count)"""
+    entries = SubmissionHistory.objects.filter(
+        submission__academic_year=year
+    ).exclude(action='archived')
+    for submission_ids in submission_batches(entries, batch_size=batch_size, start_after=start_after):
+        path, archived = archive_submissions(year, submission_ids, directory=directory)
+        yield submission_ids[-1], path, archived
@@ -0,0 +1,203 @@
+# core/search.py
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import DataSubmission, SearchDocument, SubmissionData
+
+FTS_TABLE = 'core_searchdocument_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_backend():
+    """'fts5', 'postgres' or 'basic' (icontains, no ranking) for other databases"""
+    return {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(connection.vendor, 'basic')
+
+
+def _tokens(query):
+    return TOKEN_RE.findall(query or '')[:16]
+
+
+def _flatten(value):
+    """All scalar values of a row's JSON data, in order"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    elif value not in (None, ''):
+        yield str(value)
+
+
+def _submission_text(submission):
+    template = submission.template
+    submitter = submission.submitted_by
+    title = f"{template.code} {template.name}"
+    body = ' '.join(filter(None, [
+        submission.department.name,
+        submission.department.code,
+        submission.academic_year.name,
+        submitter.username if submitter else '',
+        submitter.get_full_name() if submitter else '',
+    ]))
+    return title[:600], body
+
+
+def _document_for_submission(submission):
+    title, body = _submission_text(submission)
+    return SearchDocument(
+        key=f'submission:{submission.pk}',
+        kind='submission',
+        submission_id=submission.pk,
+        title=title,
+        body=body
+    )
+
+
+def _document_for_row(row, submission):
+    title, _ = _submission_text(submission)
+    return SearchDocument(
+        key=f'row:{row.pk}',
+        kind='row',
+        submission_id=submission.pk,
+        row_id=row.pk,
+        title=title,
+        body=' '.join(_flatten(row.data))
+    )
+
+
+def _upsert(document):
+    SearchDocument.objects.update_or_create(
+        key=document.key,
+        defaults={
+            'kind': document.kind,
+            'submission_id': document.submission_id,
+            'row_id': document.row_id,
+            'title': document.title,
+            'body': document.body,
+        }
+    )
+
+
+def index_submission(submission):
+    """Re-index the submission's own document (not its rows)"""
+    _upsert(_document_for_submission(submission))
+
+
+def index_row(row, submission=None):
+    if submission is None:
+        submission = DataSubmission.objects.select_related(
+            'template', 'department', 'academic_year', 'submitted_by'
+        ).get(pk=row.submission_id)
+    _upsert(_document_for_row(row, submission))
+
+
+def index_submissions(queryset, batch_size=500):
+    """
+    Rebuild the documents of many submissions and all their rows, replacing
+    whatever was indexed before. Used after bulk writes that skip signals.
+    Returns the number of documents written.
+    """
+    written = 0
+    submissions = queryset.select_related(
+        'template', 'department', 'academic_year', 'submitted_by'
+    ).order_by('pk')
+
+    batch = []
+    for submission in submissions.iterator(chunk_size=batch_size):
+        batch.append(submission)
+        if len(batch) >= batch_size:
+            written += _reindex_batch(batch, batch_size)
+            batch = []
+    if batch:
+        written += _reindex_batch(batch, batch_size)
+    return written
+
+
+def _reindex_batch(submissions, batch_size):
+    by_id = {submission.pk: submission for submission in submissions}
+    documents = [_document_for_submission(submission) for submission in submissions]
+    rows = SubmissionData.objects.filter(submission_id__in=by_id).only('id', 'submission_id', 'data')
+    documents.extend(
+        _document_for_row(row, by_id[row.submission_id])
+        for row in rows.iterator(chunk_size=batch_size)
+    )
+
+    with transaction.atomic():
+        SearchDocument.objects.filter(submission_id__in=by_id).delete()
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    return len(documents)
+
+
+def rebuild_index(batch_size=500):
+    """Re-index everything and, on SQLite, rebuild the FTS5 shadow tables"""
+    written = index_submissions(DataSubmission.objects.all(), batch_size=batch_size)
+    SearchDocument.objects.exclude(submission__in=DataSubmission.objects.all()).delete()
+    if search_backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return written
+
+
+def search_documents(query, queryset=None, ranked=True):
+    """
+    SearchDocuments matching every word of ``query`` (as a prefix). When
+    ``ranked``, they are annotated with ``rank`` (higher is better) and
+    ordered by it; unranked results can be used as a subquery.
+    """
+    queryset = SearchDocument.objects.all() if queryset is None else queryset
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset.none()
+
+    backend = search_backend()
+    if backend == 'fts5':
+        match = ' AND '.join(f'"{token}"*' for token in tokens)
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+        if not ranked:
+            return queryset
+        # bm25() is lower-is-better; negate so every backend sorts rank desc.
+        # Title matches weigh more than body matches. The correlated subquery
+        # names the outer table, so ranked querysets can't be nested.
+        table = SearchDocument._meta.db_table
+        return queryset.annotate(rank=RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+            [match],
+            output_field=FloatField()
+        )).order_by('-rank', 'id')
+
+    if backend == 'postgres':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        queryset = queryset.filter(RawSQL(
+            "search_vector @@ to_tsquery('simple', %s)",
+            [tsquery],
+            output_field=BooleanField()
+        ))
+        if not ranked:
+            return queryset
+        return queryset.annotate(rank=RawSQL(
+            "ts_rank_cd(search_vector, to_tsquery('simple', %s))",
+            [tsquery],
+            output_field=FloatField()
+        )).order_by('-rank', 'id')
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(title__icontains=token) | Q(body__icontains=token)
+    queryset = queryset.filter(condition)
+    if not ranked:
+        return queryset
+    return queryset.annotate(
+        rank=Value(0.0, output_field=FloatField())
+    ).order_by('-updated_at', 'id')
+
+
+def matching_submission_ids(query):
+    """Subquery of submission ids whose own text or any row matches ``query``"""
+    return search_documents(query, ranked=False).values('submission_id')
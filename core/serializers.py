@@ -36,14 +36,14 @@ class TemplateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Template
-        fields = ['id', 'code', 'name', 'metadata', 'board', 'criteria']
+        fields = ['id', 'code', 'name', 'metadata', 'board', 'criteria', 'current_version']
 
     def get_board(self, obj):
-        if obj.criteria and obj.criteria.board:
+        if obj.board:
             return {
-                'id': obj.criteria.board.id,
-                'name': obj.criteria.board.name,
-                'code': obj.criteria.board.code
+                'id': obj.board.id,
+                'name': obj.board.name,
+                'code': obj.board.code
             }
         return None
 
@@ -89,7 +89,7 @@ class SubmissionHistorySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = SubmissionHistory
-        fields = ['id', 'action', 'performed_by_name', 'performed_at', 'details']
+        fields = ['id', 'action', 'performed_by_name', 'performed_at', 'row_id', 'details']
 
 
 class DataSubmissionSerializer(serializers.ModelSerializer):
@@ -107,9 +107,9 @@ class DataSubmissionSerializer(serializers.ModelSerializer):
             'id', 'template', 'department', 'academic_year', 'academic_year_name',
             'status', 'submitted_at', 'verified_by', 'verified_at', 
             'rejection_reason', 'data_rows', 'department_name', 
-            'template_name', 'template_code','submitted_by_name', 'history'
+            'template_name', 'template_code','submitted_by_name', 'history', 'template_version'
         ]
-        read_only_fields = ['submitted_by', 'verified_by', 'verified_at']
+        read_only_fields = ['submitted_by', 'verified_by', 'verified_at', 'template_version']
 
     def validate(self, data):
         # Ensure user can only submit for their department
@@ -1,14 +1,35 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from .models import AcademicYearTransition, Template, DataSubmission, SubmissionData  # Add this import
+from . import autocomplete
+from .search import index_submissions
+from .utils.carry_forward import compile_section_rules
+from .models import AcademicYearTransition, Criteria, Template, DataSubmission, SubmissionData, Department  # Add this import
 
 class AcademicYearTransitionService:
-    def __init__(self, from_year, to_year, user):
+    # Backends where rows can be copied with a single INSERT ... SELECT
+    INSERT_SELECT_VENDORS = {'postgresql', 'sqlite'}
+
+    def __init__(self, from_year, to_year, user, batch_size=None):
         self.from_year = from_year
         self.to_year = to_year
         self.user = user
         self.transition = None
+        self.batch_size = batch_size or getattr(settings, 'TRANSITION_BATCH_SIZE', 2000)
+
+    @classmethod
+    def for_transition(cls, transition, **kwargs):
+        """Build a service for an existing transition record (e.g. inside a task)"""
+        service = cls(
+            from_year=transition.from_year,
+            to_year=transition.to_year,
+            user=transition.processed_by,
+            **kwargs
+        )
+        service.transition = transition
+        return service
 
     @transaction.atomic
     def start_transition(self):
@@ -34,108 +55,469 @@ class AcademicYearTransitionService:
 
         return self.transition
 
+    @transaction.atomic
+    def resume_transition(self):
+        """Reopen a failed or stalled transition; finished templates are kept"""
+        if self.transition is None or self.transition.status == 'completed':
+            raise ValidationError("Only an unfinished transition can be resumed")
+
+        self.transition.status = 'in_progress'
+        self.transition.error_log = None
+        self.transition.save(update_fields=['status', 'error_log'])
+
+        self.to_year.transition_status = 'in_progress'
+        self.to_year.save()
+
+        return self.transition
+
     def process_transition(self):
         """Process the actual transition"""
         try:
-            # 1. Create new submissions for continuous templates
-            self._create_continuous_submissions()
-            
-            # 2. Carry forward relevant data
-            self._carry_forward_data()
-            
-            # 3. Mark transition as completed
+            # 1. Roll over every pending continuous / carry forward template,
+            #    checkpointing each one as it commits
+            for template in self.get_pending_templates():
+                self.process_template(template)
+
+            # 2. Mark transition as completed
             self._complete_transition()
 
         except Exception as e:
             self._handle_transition_error(str(e))
             raise
 
-    def _create_continuous_submissions(self):
-        """Create new submissions for templates that need yearly continuation"""
-        continuous_templates = Template.objects.filter(
-            metadata__contains={'continuous': True}
+    def get_transition_templates(self):
+        """Templates touched by the transition, in processing order"""
+        return Template.objects.filter(
+            Q(continuous=True) | Q(carry_forward=True)
+        ).order_by('id')
+
+    def get_pending_templates(self):
+        """Transition templates not yet checkpointed; also records the total"""
+        templates = self.get_transition_templates()
+        if self.transition is None:
+            return templates
+
+        total = templates.count()
+        if self.transition.templates_total != total:
+            self.transition.templates_total = total
+            self.transition.save(update_fields=['templates_total'])
+        return templates.exclude(id__in=self.transition.completed_templates)
+
+    def process_template(self, template):
+        """
+        Roll a single template over to the new year in its own transaction.
+
+        The checkpoint is written in the same transaction, so a crash either
+        keeps the whole template or none of it. Safe to re-run: existing
+        submissions and already-copied rows are left alone.
+        Returns (submissions_created, rows_copied).
+        """
+        if self.transition is not None and template.id in self.transition.completed_templates:
+            return 0, 0
+
+        with transaction.atomic():
+            created = self._create_submissions(template)
+            copied = 0
+            if self._is_carry_forward(template):
+                copied = self._copy_rows(template)
+            if created or copied:
+                # Bulk inserts skip the signals that maintain the search and
+                # autocomplete indexes
+                new_submissions = DataSubmission.objects.filter(
+                    template=template, academic_year=self.to_year
+                )
+                index_submissions(new_submissions, batch_size=self.batch_size)
+            if copied:
+                autocomplete.add_rows(
+                    SubmissionData.objects.filter(submission__in=new_submissions),
+                    batch_size=self.batch_size
+                )
+            if self.transition is not None:
+                self.transition.record_template_done(template.id, created, copied)
+        return created, copied
+
+    def plan(self):
+        """
+        Dry run: what the transition would create, per department, using
+        aggregate queries only. Nothing is written. Row counts are an upper
+        bound for sections whose carry forward rules drop rows.
+        """
+        templates = list(self.get_transition_templates())
+        carry_forward_ids = [t.id for t in templates if self._is_carry_forward(t)]
+
+        already_created = DataSubmission.objects.filter(
+            template_id=OuterRef('template_id'),
+            department_id=OuterRef('department_id'),
+            academic_year=self.to_year
+        )
+        already_copied = SubmissionData.objects.filter(
+            submission__template_id=OuterRef('submission__template_id'),
+            submission__department_id=OuterRef('submission__department_id'),
+            submission__academic_year=self.to_year
+        )
+        source = {'academic_year': self.from_year, 'status': 'approved'}
+
+        submissions = dict(
+            DataSubmission.objects.filter(template__in=templates, **source)
+            .exclude(Exists(already_created))
+            .values_list('department_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        rows = dict(
+            SubmissionData.objects.filter(
+                submission__template_id__in=carry_forward_ids,
+                **{f'submission__{key}': value for key, value in source.items()}
+            )
+            .exclude(Exists(already_copied))
+            .values_list('submission__department_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+
+        departments = Department.objects.filter(
+            id__in=set(submissions) | set(rows)
+        ).order_by('name').values_list('id', 'name')
+        per_department = [
+            {
+                'department_id': department_id,
+                'department': name,
+                'submissions': submissions.get(department_id, 0),
+                'rows': rows.get(department_id, 0)
+            }
+            for department_id, name in departments
+        ]
+
+        total_submissions = sum(submissions.values())
+        total_rows = sum(rows.values())
+        rate, rate_source = self._measured_insert_rate()
+
+        return {
+            'from_year': self.from_year.name,
+            'to_year': self.to_year.name,
+            'templates': {
+                'total': len(templates),
+                'continuous': sum(1 for t in templates if t.continuous),
+                'carry_forward': len(carry_forward_ids)
+            },
+            'departments': per_department,
+            'totals': {
+                'submissions': total_submissions,
+                'rows': total_rows
+            },
+            'estimate': {
+                'rows_per_second': rate,
+                'rate_source': rate_source,
+                'seconds': round((total_submissions + total_rows) / rate, 1)
+            }
+        }
+
+    def _measured_insert_rate(self):
+        """Rows/s of the latest completed transition, else the configured default"""
+        last = AcademicYearTransition.objects.filter(
+            status='completed',
+            rows_copied__gt=0,
+            last_progress_at__isnull=False
+        ).order_by('-completed_at').first()
+        if last and last.rows_per_second:
+            return last.rows_per_second, 'measured'
+        return float(getattr(settings, 'TRANSITION_DEFAULT_ROWS_PER_SECOND', 5000)), 'default'
+
+    def _is_carry_forward(self, template):
+        return template.carry_forward
+
+    def _previous_submissions(self, template):
+        return DataSubmission.objects.filter(
+            template=template,
+            academic_year=self.from_year,
+            status='approved'
         )
 
-        for template in continuous_templates:
-            # Get all departments that had submissions in previous year
-            previous_submissions = DataSubmission.objects.filter(
+    def _create_submissions(self, template):
+        """Create draft submissions in the new year for every department approved last year"""
+        existing = set(
+            DataSubmission.objects.filter(
                 template=template,
-                academic_year=self.from_year,
-                status='approved'
+                academic_year=self.to_year
+            ).values_list('department_id', flat=True)
+        )
+
+        template_version = template.get_current_version()
+        new_submissions = [
+            # bulk_create skips save(), so the denormalized board and the
+            # pinned version are set here
+            DataSubmission(
+                template=template,
+                template_version=template_version,
+                board_id=template.board_id,
+                department_id=department_id,
+                academic_year=self.to_year,
+                submitted_by=self.user,
+                status='draft'
             )
+            for department_id in self._previous_submissions(template)
+                .values_list('department_id', flat=True)
+                .iterator(chunk_size=self.batch_size)
+            if department_id not in existing
+        ]
+
+        DataSubmission.objects.bulk_create(
+            new_submissions,
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+        return len(new_submissions)
 
-            for prev_submission in previous_submissions:
-                # Create new submission for the new academic year
-                DataSubmission.objects.create(
-                    template=template,
-                    department=prev_submission.department,
-                    academic_year=self.to_year,
-                    submitted_by=self.user,
-                    status='draft'
+    def _copy_rows(self, template):
+        """Copy eligible rows from last year's approved submissions"""
+        if self._requires_row_processing(template) or connection.vendor not in self.INSERT_SELECT_VENDORS:
+            return self._copy_rows_in_batches(template)
+        return self._copy_rows_insert_select(template)
+
+    def _copy_rows_insert_select(self, template):
+        """Copy every row in one set-based statement, skipping submissions that already have rows"""
+        qn = connection.ops.quote_name
+        rows = qn(SubmissionData._meta.db_table)
+        submissions = qn(DataSubmission._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        sql = f"""
+            INSERT INTO {rows} (submission_id, section_index, row_number, data, created_at, updated_at)
+            SELECT new_sub.id, old_row.section_index, old_row.row_number, old_row.data, %s, %s
+            FROM {rows} old_row
+            INNER JOIN {submissions} old_sub ON old_sub.id = old_row.submission_id
+            INNER JOIN {submissions} new_sub
+                ON new_sub.template_id = old_sub.template_id
+                AND new_sub.department_id = old_sub.department_id
+                AND new_sub.academic_year_id = %s
+            WHERE old_sub.template_id = %s
+                AND old_sub.academic_year_id = %s
+                AND old_sub.status = %s
+                AND NOT EXISTS (
+                    SELECT 1 FROM {rows} existing WHERE existing.submission_id = new_sub.id
                 )
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [now, now, self.to_year.id, template.id, self.from_year.id, 'approved'])
+            return cursor.rowcount
 
-    def _carry_forward_data(self):
-        """Carry forward data that needs to be preserved"""
-        carry_forward_templates = Template.objects.filter(
-            metadata__contains={'carry_forward': True}
+    def _copy_rows_in_batches(self, template):
+        """Copy rows through Python when they need filtering or transformation"""
+        target_ids = dict(
+            DataSubmission.objects.filter(
+                template=template,
+                academic_year=self.to_year
+            ).exclude(
+                data_rows__isnull=False
+            ).values_list('department_id', 'id')
         )
+        if not target_ids:
+            return 0
 
-        for template in carry_forward_templates:
-            previous_submissions = DataSubmission.objects.filter(
-                template=template,
-                academic_year=self.from_year,
-                status='approved'
-            ).prefetch_related('data_rows')
-
-            for prev_submission in previous_submissions:
-                new_submission = DataSubmission.objects.create(
-                    template=template,
-                    department=prev_submission.department,
-                    academic_year=self.to_year,
-                    submitted_by=self.user,
-                    status='draft'
+        source_rows = SubmissionData.objects.filter(
+            submission__in=self._previous_submissions(template),
+            submission__department_id__in=target_ids.keys()
+        ).values_list(
+            'submission__department_id', 'section_index', 'row_number', 'data'
+        ).order_by('submission_id', 'section_index', 'row_number')
+
+        rules = self._carry_forward_rules(template)
+        copied = 0
+        chunk = []
+        for row in source_rows.iterator(chunk_size=self.batch_size):
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                copied += self._insert_carried_rows(chunk, target_ids, rules)
+                chunk = []
+
+        if chunk:
+            copied += self._insert_carried_rows(chunk, target_ids, rules)
+        return copied
+
+    def _insert_carried_rows(self, chunk, target_ids, rules):
+        """Apply the section rules to a chunk of rows at once and insert the survivors"""
+        by_section = {}
+        for row in chunk:
+            by_section.setdefault(row[1], []).append(row)
+
+        new_rows = []
+        for section_index, section_rows in by_section.items():
+            section_rules = rules.get(section_index)
+            if section_rules is None:
+                kept = [(row, dict(row[3])) for row in section_rows]
+            else:
+                positions, carried = section_rules.apply([row[3] for row in section_rows])
+                kept = [(section_rows[position], carried[i]) for i, position in enumerate(positions)]
+
+            new_rows.extend(
+                SubmissionData(
+                    submission_id=target_ids[department_id],
+                    section_index=section_index,
+                    row_number=row_number,
+                    data=data
                 )
+                for (department_id, section_index, row_number, _), data in kept
+            )
 
-                # Copy eligible data rows
-                for data_row in prev_submission.data_rows.all():
-                    if self._should_carry_forward(data_row, template):
-                        SubmissionData.objects.create(
-                            submission=new_submission,
-                            section_index=data_row.section_index,
-                            row_number=data_row.row_number,
-                            data=self._process_carried_data(data_row.data, template)
-                        )
+        SubmissionData.objects.bulk_create(new_rows, batch_size=self.batch_size)
+        return len(new_rows)
 
-    def _should_carry_forward(self, data_row, template):
-        """Determine if a data row should be carried forward"""
-        # Implementation depends on your specific rules
-        carry_forward_rules = template.metadata.get('carry_forward_rules', {})
-        return True  # Implement your specific logic
+    def _carry_forward_rules(self, template):
+        """Compiled carry forward rules per section index"""
+        return compile_section_rules(template.metadata)
 
-    def _process_carried_data(self, data, template):
-        """Process data being carried forward"""
-        # Implementation depends on your specific rules
-        processed_data = data.copy()
-        # Add any necessary transformations
-        return processed_data
+    def _requires_row_processing(self, template):
+        return bool(self._carry_forward_rules(template))
 
     @transaction.atomic
     def _complete_transition(self):
         """Mark the transition as completed"""
         self.transition.status = 'completed'
         self.transition.completed_at = timezone.now()
-        self.transition.save()
+        # update_fields keeps counters written by other workers intact
+        self.transition.save(update_fields=['status', 'completed_at'])
 
         self.to_year.transition_status = 'completed'
         self.to_year.is_current = True
         self.to_year.save()
 
+    def complete_if_finished(self):
+        """
+        Complete a fanned-out transition once every template is checkpointed.
+        Called by each template task; the row lock lets only the last one
+        through. Returns whether the transition was completed.
+        """
+        with transaction.atomic():
+            locked = AcademicYearTransition.objects.select_for_update().get(pk=self.transition.pk)
+            if locked.status != 'in_progress' or locked.templates_done < locked.templates_total:
+                return False
+            self.transition = locked
+            self._complete_transition()
+        return True
+
     def _handle_transition_error(self, error_message):
         """Handle any errors during transition"""
         if self.transition:
             self.transition.status = 'failed'
             self.transition.error_log = error_message
-            self.transition.save()
+            self.transition.save(update_fields=['status', 'error_log'])
 
         self.to_year.transition_status = 'pending'
-        self.to_year.save()
\ No newline at end of file
+        self.to_year.save()
+
+
+class TemplateImportService:
+    """Create or update a board's templates from sections parsed out of Excel"""
+
+    def __init__(self, board, academic_year):
+        self.board = board
+        self.academic_year = academic_year
+        # Filled by import_batch so each template doesn't need its own lookups
+        self._templates = None
+        self._locked = None
+        self._criteria = None
+
+    def _prefetch(self, codes):
+        self._templates = {
+            template.code: template
+            for template in Template.objects.filter(board=self.board, code__in=codes)
+        }
+        self._locked = set(
+            DataSubmission.objects.filter(
+                template__in=self._templates.values(),
+                academic_year=self.academic_year
+            ).values_list('template_id', flat=True)
+        )
+        self._criteria = {criteria.number: criteria for criteria in Criteria.objects.filter(board=self.board)}
+
+    def _existing(self, code):
+        if self._templates is not None:
+            template = self._templates.get(code)
+            return template, template is not None and template.pk in self._locked
+        template = Template.objects.filter(code=code, board=self.board).first()
+        return template, template is not None and DataSubmission.objects.filter(
+            template=template,
+            academic_year=self.academic_year
+        ).exists()
+
+    def _criteria_for(self, number):
+        if self._criteria and number in self._criteria:
+            return self._criteria[number]
+        # Not cached: a savepoint rollback could undo the creation
+        criteria, _ = Criteria.objects.get_or_create(
+            board=self.board,
+            number=number,
+            defaults={'name': f'Default Criteria for {self.board.name}'}
+        )
+        return criteria
+
+    def import_template(self, code, sections):
+        """Save one template; raises ValidationError when it can't be imported"""
+        if not sections:
+            raise ValidationError("No template sections found")
+
+        # The criterion is the leading number of the template code
+        criterion_number = (code or '').split('.')[0]
+        if not criterion_number.isdigit():
+            raise ValidationError(f"Template code {code} does not start with a criterion number")
+
+        template, locked = self._existing(code)
+        if locked:
+            raise ValidationError("Cannot update template with existing submissions")
+
+        template = template or Template(code=code)
+        template.criteria = self._criteria_for(int(criterion_number))
+        template.name = sections[0]['headers'][0]
+        template.metadata = sections
+        template.clean()
+        # Records a new template version if the structure changed
+        template.save()
+        return template
+
+    def import_batch(self, parsed_files, dry_run=False):
+        """
+        Save the templates of every ParsedFile in one transaction. A file
+        whose sheets don't all import is rolled back to its savepoint and
+        reported; the others are kept. Returns one result dict per file.
+        """
+        codes = [sheet.code for parsed in parsed_files for sheet in parsed.sheets if sheet.code]
+        seen = {}
+        results = []
+        with transaction.atomic():
+            self._prefetch(codes)
+            try:
+                for parsed in parsed_files:
+                    result = {'file': parsed.name, 'templates': []}
+                    results.append(result)
+                    try:
+                        if parsed.error:
+                            raise ValidationError(parsed.error)
+                        with transaction.atomic():
+                            for sheet in parsed.sheets:
+                                if sheet.error:
+                                    raise ValidationError(f'{sheet.title}: {sheet.error}')
+                                # A template rolled back with an earlier file can't be reused either
+                                if sheet.code in seen:
+                                    raise ValidationError(f'Template {sheet.code} is also in {seen[sheet.code]}')
+                                seen[sheet.code] = parsed.name
+                                try:
+                                    template = self.import_template(sheet.code, sheet.sections)
+                                except ValidationError as e:
+                                    raise ValidationError(f"{sheet.title}: {'; '.join(e.messages)}")
+                                result['templates'].append({
+                                    'sheet': sheet.title,
+                                    'code': template.code,
+                                    'version': template.current_version.number
+                                })
+                    except ValidationError as e:
+                        result.update(status='error', message='; '.join(e.messages), templates=[])
+                    else:
+                        result.update(
+                            status='success',
+                            message=f"Imported {len(result['templates'])} templates"
+                        )
+            finally:
+                self._templates = self._locked = self._criteria = None
+            if dry_run:
+                transaction.set_rollback(True)
+        return results
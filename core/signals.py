@@ -0,0 +1,68 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import DataSubmission, Department, SubmissionData, User
+from .search import index_submission
+from . import indexing
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_department_users_cache(sender, instance, **kwargs):
+    for user_id in User.objects.filter(department_id=instance.pk).values_list('id', flat=True):
+        invalidate_cached_user(user_id)
+
+
+# Deleted documents need no handler: SearchDocument rows cascade with their submission/row
+@receiver(post_save, sender=DataSubmission)
+def index_submission_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_submission(instance)
+
+
+@receiver(pre_save, sender=SubmissionData)
+def remember_previous_row_data(sender, instance, raw=False, **kwargs):
+    # The autocomplete index needs the old values to decrement them; rows the
+    # caller loaded (e.g. the editing view) already carry them
+    if raw or instance.pk is None:
+        instance._previous_data = None
+        return
+    if '_loaded_data' in instance.__dict__:
+        instance._previous_data = instance._loaded_data
+        return
+    instance._previous_data = (
+        SubmissionData.objects.filter(pk=instance.pk).values_list('data', flat=True).first()
+    )
+
+
+def _template_id(row):
+    # Only when the submission is already loaded; otherwise resolved later
+    return row.submission.template_id if SubmissionData.submission.is_cached(row) else None
+
+
+@receiver(post_save, sender=SubmissionData)
+def queue_row_indexing(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_data', None)
+    instance._loaded_data = instance.data
+    # Saves that don't touch the data (e.g. renumbering rows) change nothing indexed
+    if not created and previous == instance.data:
+        return
+    indexing.row_changed(instance.submission_id, _template_id(instance), instance.pk, previous, instance.data)
+
+
+@receiver(post_delete, sender=SubmissionData)
+def queue_row_removal(sender, instance, **kwargs):
+    # The submission may be deleted along with its rows, so the template
+    # can't be looked up after commit
+    template_id = _template_id(instance) or (
+        DataSubmission.objects.filter(pk=instance.submission_id).values_list('template_id', flat=True).first()
+    )
+    indexing.row_changed(instance.submission_id, template_id, instance.pk, instance.data, None)
@@ -1,5 +1,11 @@
+from django.conf import settings
+
 from .services import AcademicYearTransitionService
-from .models import AcademicYearTransition
+from .models import AcademicYearTransition, Template
+from .authentication import prune_expired_tokens
+from .history import flush_events
+from .indexing import apply_row_change
+from . import retention
 from celery import shared_task
 
 import logging
@@ -10,16 +16,94 @@ logger = logging.getLogger(__name__)
 def process_academic_year_transition(transition_id):
     """Process academic year transition asynchronously"""
     transition = AcademicYearTransition.objects.get(id=transition_id)
-    
-    service = AcademicYearTransitionService(
-        from_year=transition.from_year,
-        to_year=transition.to_year,
-        user=transition.processed_by
-    )
+    service = AcademicYearTransitionService.for_transition(transition)
+
+    if not settings.TRANSITION_FAN_OUT:
+        try:
+            service.process_transition()
+        except Exception as e:
+            # Log error and send notification
+            logger.error("Academic year transition failed: %s", e)
+            # Notify relevant personnel
+        return
+
+    # One subtask per template not yet checkpointed, so a re-run resumes; the
+    # task finishing the last template completes the transition. No chord, as
+    # that needs a result backend.
+    try:
+        template_ids = list(service.get_pending_templates().values_list('id', flat=True))
+        if not template_ids:
+            service._complete_transition()
+            return
+
+        for template_id in template_ids:
+            process_transition_template.delay(transition_id, template_id)
+    except Exception as e:
+        logger.error("Academic year transition %s could not be dispatched: %s", transition_id, e)
+        service._handle_transition_error(str(e))
+        raise
+
+
+@shared_task
+def process_transition_template(transition_id, template_id):
+    """Roll one template over to the new academic year"""
+    transition = AcademicYearTransition.objects.get(id=transition_id)
+    service = AcademicYearTransitionService.for_transition(transition)
 
     try:
-        service.process_transition()
+        created, copied = service.process_template(Template.objects.get(id=template_id))
     except Exception as e:
-        # Log error and send notification
-        logger.error(f"Academic year transition failed: {str(e)}")
-        # Notify relevant personnel
\ No newline at end of file
+        logger.error("Academic year transition failed on template %s: %s", template_id, e)
+        service._handle_transition_error(str(e))
+        raise
+
+    logger.info("Transition %s: template %s created %s submissions, copied %s rows",
+                transition_id, template_id, created, copied)
+    if service.complete_if_finished():
+        logger.info("Transition %s completed", transition_id)
+    return {'template_id': template_id, 'created': created, 'copied': copied}
+
+
+@shared_task
+def complete_academic_year_transition(transition_id):
+    """Mark a fanned-out transition as completed (kept for chords queued by older releases)"""
+    transition = AcademicYearTransition.objects.get(id=transition_id)
+    AcademicYearTransitionService.for_transition(transition)._complete_transition()
+
+
+@shared_task
+def prune_expired_tokens_task(batch_size=1000):
+    """Remove expired outstanding/blacklisted refresh tokens"""
+    removed = prune_expired_tokens(batch_size=batch_size)
+    logger.info("Pruned %s expired tokens", removed)
+    return removed
+
+
+@shared_task
+def flush_audit_events_task(batch_size=500):
+    """Write queued AuditEvents to submission history; also runs as a periodic sweep"""
+    flushed = flush_events(batch_size=batch_size)
+    if flushed:
+        logger.info("Flushed %s audit events", flushed)
+    return flushed
+
+
+@shared_task
+def index_row_change_task(submission_id, template_id, row_id, old_data, new_data):
+    """Apply one row edit to the search and autocomplete indexes"""
+    apply_row_change(submission_id, template_id, row_id, old_data, new_data)
+
+
+@shared_task
+def history_retention_task(batch_size=100):
+    """Expire and compact submission history (archival is run by hand)"""
+    # Expiry is opt-in: only actions listed in HISTORY_RETENTION_DAYS expire
+    expire = bool(getattr(settings, 'HISTORY_RETENTION_DAYS', {}))
+    expired = compacted = 0
+    for submission_ids in retention.submission_batches(batch_size=batch_size):
+        for submission_id in submission_ids:
+            if expire:
+                expired += retention.expire_history(submission_id)
+            compacted += retention.compact_history(submission_id)
+    logger.info("History retention expired %s and compacted %s entries", expired, compacted)
+    return {'expired': expired, 'compacted': compacted}
@@ -0,0 +1,18 @@
+# core/tests/benchmarks/conftest.py
+import os
+
+import pytest
+
+from .harness import BenchmarkRecorder
+
+
+@pytest.fixture(scope='session')
+def benchmark_recorder():
+    recorder = BenchmarkRecorder()
+    yield recorder
+    recorder.save(os.getenv('BENCHMARK_OUTPUT', 'bench_output.json'))
+
+
+@pytest.fixture
+def bench(benchmark_recorder):
+    return benchmark_recorder.run
@@ -0,0 +1,76 @@
+# core/tests/benchmarks/harness.py
+"""
+Minimal timing harness for the benchmark suite.
+
+Benchmarks are skipped unless RUN_BENCHMARKS=1 and write their results to
+BENCHMARK_OUTPUT (default: bench_output.json) when the session ends.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import pytest
+
+requires_benchmarks = pytest.mark.skipif(
+    os.getenv('RUN_BENCHMARKS') != '1',
+    reason="Set RUN_BENCHMARKS=1 to run benchmarks"
+)
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkRecorder:
+    def __init__(self):
+        self.results = []
+
+    def run(self, name, func, rounds=5, warmup=1, setup=None, **extra):
+        """Time ``func`` ``rounds`` times (after ``warmup`` untimed calls)"""
+        for _ in range(warmup):
+            if setup:
+                setup()
+            func()
+
+        timings = []
+        for _ in range(rounds):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+
+        result = {
+            'name': name,
+            'rounds': rounds,
+            'min': min(timings),
+            'max': max(timings),
+            'mean': statistics.mean(timings),
+            'median': statistics.median(timings),
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            **extra,
+        }
+        self.results.append(result)
+        return result
+
+    def save(self, path):
+        if not self.results:
+            return
+        payload = {
+            'commit': current_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'benchmarks': self.results,
+        }
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2, default=str)
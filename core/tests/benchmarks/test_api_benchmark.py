@@ -0,0 +1,136 @@
+# core/tests/benchmarks/test_api_benchmark.py
+"""
+Exports, dashboards, row writes, template import and the academic year
+transition on synthetic data. BENCH_SCALES picks the scales (comma
+separated names from core.utils.synthetic.SCALES; default: small).
+"""
+import io
+import os
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from core.models import AcademicYear, DataSubmission, User
+from core.services import AcademicYearTransitionService
+from core.utils.synthetic import COLUMN_POOL, SCALES, SyntheticDataGenerator
+from .harness import requires_benchmarks
+
+pytestmark = [requires_benchmarks, pytest.mark.django_db]
+
+BENCH_SCALES = [name for name in os.getenv('BENCH_SCALES', 'small').split(',') if name]
+
+
+@pytest.fixture(params=BENCH_SCALES)
+def dataset(request, settings):
+    # Budgets guard request shapes in the functional tests, not here
+    settings.QUERY_BUDGET_STRICT = False
+    scale = SCALES[request.param]
+    director = User.objects.create_user(username='bench-director', password='bench', role='iqac_director')
+    generator = SyntheticDataGenerator(seed=1)
+    data = generator.generate(submitted_by=director, verified_by=director, **scale)
+    faculty = User.objects.create_user(username='bench-faculty', password='bench', role='faculty',
+                                       department=data.departments[0])
+    data.extra.update(scale=request.param, generator=generator, director=director, faculty=faculty,
+                      **scale)
+    return data
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def labels(data):
+    return {key: data.extra[key] for key in ('scale', 'departments', 'templates', 'rows_per_section')}
+
+
+def test_exports_and_dashboards(bench, dataset):
+    client = client_for(dataset.extra['director'])
+    params = {'academic_year': dataset.academic_year.id, 'board': dataset.board.id}
+    template = DataSubmission.objects.filter(
+        academic_year=dataset.academic_year, status='approved'
+    ).select_related('template').first().template
+    rounds = 1 if dataset.extra['scale'] == 'large' else 3
+
+    exports = {
+        'template': {'type': 'template', 'template_code': template.code},
+        'criterion': {'type': 'criterion', 'criterion': template.code.split('.')[0]},
+        'all': {'type': 'all'},
+    }
+    for export_type, extra_params in exports.items():
+        def export():
+            response = client.get('/api/templates/export/', {**params, **extra_params})
+            assert response.status_code == 200, response.content[:200]
+        bench(f'export[{export_type}]', export, rounds=rounds, warmup=0, **labels(dataset))
+
+    for name, url in [('stats', '/api/submissions/stats/'),
+                      ('department_breakdown', '/api/submissions/department-breakdown/')]:
+        def dashboard():
+            response = client.get(url, {'academic_year': dataset.academic_year.id})
+            assert response.status_code == 200
+        bench(name, dashboard, rounds=5, **labels(dataset))
+
+
+def test_row_writes_and_import(bench, dataset):
+    client = client_for(dataset.extra['faculty'])
+    generator = dataset.extra['generator']
+    template = dataset.templates[0]
+    columns = generator.section_columns(template)[0]
+    url = f'/api/templates/{template.code}/sections/0/data/'
+    params = f'?academic_year={dataset.academic_year.id}&board={dataset.board.id}'
+    # Rows can only be edited while the submission is a draft
+    DataSubmission.objects.filter(
+        template=template, department=dataset.departments[0], academic_year=dataset.academic_year
+    ).update(status='draft')
+    created = []
+
+    def add_row():
+        response = client.post(url + params, generator.row_data(columns, dataset.academic_year), format='json')
+        assert response.status_code == 200, response.data
+        created.append(response.data['data']['id'])
+    bench('section_row[POST]', add_row, rounds=20, warmup=2, **labels(dataset))
+
+    def delete_row():
+        response = client.delete(f'{url}{created.pop()}/{params}')
+        assert response.status_code == 200, response.data
+    bench('section_row[DELETE]', delete_row, rounds=20, warmup=2, **labels(dataset))
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['9.99 Synthetic imported template'])
+    sheet.append([display_name for _, display_name, _, _ in COLUMN_POOL])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    director = client_for(dataset.extra['director'])
+
+    def import_template():
+        upload = io.BytesIO(buffer.getvalue())
+        upload.name = '9.99.xlsx'
+        response = director.post(
+            f'/api/templates/import-excel/?board={dataset.board.id}&academic_year={dataset.academic_year.id}',
+            {'file': upload}, format='multipart'
+        )
+        assert response.status_code == 200, response.data
+    bench('import_from_excel', import_template, rounds=5, **labels(dataset))
+
+
+def test_academic_year_transition(bench, dataset):
+    from_year = dataset.academic_year
+    from_year.transition_status = 'completed'
+    from_year.save()
+    to_year = AcademicYear.objects.create(name='2024-2025', start_date=date(2024, 6, 1),
+                                          end_date=date(2025, 5, 31))
+    service = AcademicYearTransitionService(from_year, to_year, dataset.extra['director'])
+
+    def transition():
+        service.start_transition()
+        service.process_transition()
+
+    result = bench('academic_year_transition', transition, rounds=1, warmup=0, **labels(dataset))
+    service.transition.refresh_from_db()
+    assert service.transition.status == 'completed'
+    result['rows_copied'] = service.transition.rows_copied
+    result['submissions_created'] = service.transition.submissions_created
@@ -0,0 +1,39 @@
+# core/tests/benchmarks/test_autocomplete_benchmark.py
+import os
+import random
+import string
+
+import pytest
+
+from core import autocomplete
+from core.models import AutocompleteTerm
+from .harness import requires_benchmarks
+
+pytestmark = [requires_benchmarks, pytest.mark.django_db]
+
+TERMS = int(os.getenv('AUTOCOMPLETE_BENCH_TERMS', 1_000_000))
+PREFIXES = ['a', 'an', 'ani', 'ra', 'sha', 'kum', 'zz']
+
+
+def test_prefix_lookup_latency(bench):
+    """Cold (uncached) top-10 lookups over TERMS distinct person names"""
+    rng = random.Random(42)
+    batch = []
+    for n in range(TERMS):
+        value = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) + f' {n}'
+        batch.append(AutocompleteTerm(kind='person', value=value, normalized=value,
+                                      frequency=rng.randint(1, 500)))
+        if len(batch) == 10000:
+            AutocompleteTerm.objects.bulk_create(batch)
+            batch = []
+    AutocompleteTerm.objects.bulk_create(batch)
+
+    for prefix in PREFIXES[1:]:
+        result = bench(
+            f'autocomplete[{prefix}]',
+            lambda: autocomplete.suggest(prefix),
+            rounds=20,
+            setup=autocomplete._prefix_cache.clear,
+            terms=TERMS
+        )
+        assert result['median'] < 0.02, f"{prefix!r} took {result['median'] * 1000:.1f}ms"
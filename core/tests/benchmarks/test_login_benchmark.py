@@ -0,0 +1,51 @@
+# core/tests/benchmarks/test_login_benchmark.py
+import importlib.util
+
+import pytest
+from django.contrib.auth import authenticate
+
+from core.models import User
+from core.throttling import LoginRateThrottle, LoginUsernameRateThrottle
+from .harness import requires_benchmarks
+
+pytestmark = [requires_benchmarks, pytest.mark.django_db]
+
+LOGINS_PER_ROUND = 10
+
+HASHER_PROFILES = [
+    ('pbkdf2-default', 'pbkdf2', {}),
+    ('pbkdf2-260k', 'pbkdf2', {'PASSWORD_PBKDF2_ITERATIONS': 260000}),
+    ('bcrypt-12', 'bcrypt', {'PASSWORD_BCRYPT_ROUNDS': 12}),
+    ('argon2-default', 'argon2', {}),
+]
+
+HASHER_MODULES = {'bcrypt': 'bcrypt', 'argon2': 'argon2'}
+HASHER_PATHS = {
+    'pbkdf2': 'core.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+}
+
+
+@pytest.mark.parametrize('profile,hasher,overrides', HASHER_PROFILES, ids=[p[0] for p in HASHER_PROFILES])
+def test_login_throughput(bench, settings, monkeypatch, profile, hasher, overrides):
+    """Sequential logins in one process, i.e. logins per second on one core"""
+    module = HASHER_MODULES.get(hasher)
+    if module and importlib.util.find_spec(module) is None:
+        pytest.skip(f"{module} is not installed")
+
+    settings.PASSWORD_HASHERS = [HASHER_PATHS[hasher]]
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    # Measure hashing, not the flood protection
+    monkeypatch.setattr(LoginRateThrottle, 'allow_request', lambda *args: True)
+    monkeypatch.setattr(LoginUsernameRateThrottle, 'allow_request', lambda *args: True)
+
+    User.objects.create_user(username='faculty', password='test123', role='faculty')
+
+    def logins():
+        for _ in range(LOGINS_PER_ROUND):
+            assert authenticate(username='faculty', password='test123') is not None
+
+    result = bench(f'login[{profile}]', logins, rounds=3, logins_per_round=LOGINS_PER_ROUND)
+    result['logins_per_second_per_core'] = LOGINS_PER_ROUND / result['median']
@@ -1,6 +1,41 @@
 # core/tests/conftest.py
 import pytest
+from django.core.cache import cache
 from core.models import Template
+from core.queries import QueryPatternDetector
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached users/prefixes must not leak between tests that reuse primary keys
+    from core import autocomplete
+    cache.clear()
+    autocomplete._prefix_cache.clear()
+    yield
+    cache.clear()
+    autocomplete._prefix_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    # Requests to views with a declared query_budget fail the test when over it
+    settings.QUERY_DETECTOR_ENABLED = True
+    settings.QUERY_BUDGET_STRICT = True
+
+
+@pytest.fixture
+def index_on_save(monkeypatch):
+    """Apply row indexing as each row is saved, as if every save had committed"""
+    from core import indexing
+    monkeypatch.setattr(indexing, 'row_changed', indexing.apply_row_change)
+
+
+@pytest.fixture
+def query_detector():
+    """Records every query run in the test body, for N+1 and budget assertions"""
+    with QueryPatternDetector() as detector:
+        yield detector
+
 
 @pytest.fixture
 def template_1_1():
@@ -53,4 +88,65 @@ def template_1_1_3():
                 "type": "url"
             }
         ]
-    )
\ No newline at end of file
+    )
+
+@pytest.fixture
+def board():
+    from core.models import Board
+    return Board.objects.create(name="NAAC", code="naac")
+
+
+@pytest.fixture
+def criteria(board):
+    from core.models import Criteria
+    return Criteria.objects.create(board=board, number=1, name="Curricular Aspects", order=1)
+
+
+@pytest.fixture
+def department():
+    from core.models import Department
+    return Department.objects.create(name="Computer Science", code="CS")
+
+
+@pytest.fixture
+def academic_year():
+    from datetime import date
+    from core.models import AcademicYear
+    return AcademicYear.objects.create(
+        name="2023-2024",
+        start_date=date(2023, 6, 1),
+        end_date=date(2024, 5, 31),
+        is_current=True
+    )
+
+
+@pytest.fixture
+def iqac_director():
+    from core.models import User
+    return User.objects.create_user(username="director", password="test123", role="iqac_director")
+
+
+@pytest.fixture
+def faculty(department):
+    from core.models import User
+    return User.objects.create_user(
+        username="faculty", password="test123", role="faculty", department=department
+    )
+
+
+@pytest.fixture
+def programme_template(criteria):
+    return Template.objects.create(
+        code="1.1",
+        name="Number of programmes offered during the year",
+        criteria=criteria,
+        metadata=[{
+            "headers": ["1.1. Number of programmes offered during the year"],
+            "columns": [
+                {"name": "programme_code", "display_name": "Programme Code",
+                 "type": "single", "data_type": "string", "required": True},
+                {"name": "programme_name", "display_name": "Programme Name",
+                 "type": "single", "data_type": "string", "required": True},
+            ]
+        }]
+    )
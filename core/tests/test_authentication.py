@@ -0,0 +1,148 @@
+# core/tests/test_authentication.py
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def login(client, username, password='test123'):
+    response = client.post('/api/auth/login/', {'username': username, 'password': password}, format='json')
+    assert response.status_code == 200
+    return response.json()['data']['tokens']
+
+
+@pytest.mark.django_db
+class TestJWTFastPath:
+    def test_access_token_carries_role_and_department(self, faculty):
+        tokens = login(APIClient(), 'faculty')
+        token = AccessToken(tokens['access'])
+
+        assert token['role'] == 'faculty'
+        assert token['department_id'] == faculty.department_id
+
+    def test_refreshed_access_token_keeps_claims(self, faculty):
+        client = APIClient()
+        tokens = login(client, 'faculty')
+
+        response = client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        token = AccessToken(response.json()['data']['access'])
+
+        assert token['role'] == 'faculty'
+
+    def test_cached_user_skips_database(self, faculty, django_assert_num_queries):
+        client = APIClient()
+        tokens = login(client, 'faculty')
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        client.get('/api/auth/me/')  # warm the cache
+
+        with django_assert_num_queries(0):
+            response = client.get('/api/auth/me/')
+
+        assert response.status_code == 200
+        assert response.json()['data']['department']['code'] == 'CS'
+
+    def test_role_change_invalidates_token(self, faculty):
+        client = APIClient()
+        tokens = login(client, 'faculty')
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        assert client.get('/api/auth/me/').status_code == 200
+
+        faculty.role = 'admin'
+        faculty.save()
+
+        assert client.get('/api/auth/me/').status_code == 401
+
+    def test_department_change_refreshes_cache(self, faculty, department):
+        client = APIClient()
+        tokens = login(client, 'faculty')
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        client.get('/api/auth/me/')
+
+        department.name = 'Computer Science and Engineering'
+        department.save()
+
+        response = client.get('/api/auth/me/')
+        assert response.json()['data']['department']['name'] == 'Computer Science and Engineering'
+
+
+@pytest.mark.django_db
+class TestTokenBlacklist:
+    @pytest.fixture(autouse=True)
+    def _clear_lru(self):
+        from core.authentication import recently_blacklisted
+        recently_blacklisted.clear()
+        yield
+        recently_blacklisted.clear()
+
+    def test_logged_out_refresh_rejected_without_query(self, faculty, django_assert_num_queries):
+        client = APIClient()
+        tokens = login(client, 'faculty')
+        assert client.post('/api/auth/logout/', {'refresh': tokens['refresh']}, format='json').status_code == 200
+
+        with django_assert_num_queries(0):
+            response = client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+
+        assert response.status_code == 401
+
+    def test_prune_expired_tokens(self, faculty):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(
+                user=faculty, jti=f'expired-{i}', token='x', expires_at=now - timedelta(days=1)
+            )
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=faculty, jti='live', token='x', expires_at=now + timedelta(days=1))
+
+        call_command('prune_token_blacklist', '--batch-size', '2')
+
+        assert list(OutstandingToken.objects.values_list('jti', flat=True)) == ['live']
+        assert BlacklistedToken.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestLoginThroughput:
+    def test_login_upgrades_hash_to_configured_cost(self, settings, department):
+        from core.models import User
+
+        settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+        user = User.objects.create_user(username='faculty', password='test123', role='faculty')
+        assert user.password.startswith('pbkdf2_sha256$1000$')
+
+        settings.PASSWORD_PBKDF2_ITERATIONS = 2000
+        login(APIClient(), 'faculty')
+
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$2000$')
+
+    def test_username_flood_rejected_before_hashing(self, monkeypatch, faculty):
+        from core import views
+        from core.throttling import LoginUsernameRateThrottle
+
+        monkeypatch.setattr(LoginUsernameRateThrottle, 'THROTTLE_RATES', {'login_username': '2/min'})
+        calls = []
+        real_authenticate = views.authenticate
+        monkeypatch.setattr(views, 'authenticate', lambda **kw: calls.append(kw) or real_authenticate(**kw))
+
+        client = APIClient()
+        statuses = [
+            client.post('/api/auth/login/', {'username': 'Faculty', 'password': 'wrong'}, format='json').status_code
+            for _ in range(3)
+        ]
+
+        assert statuses == [401, 401, 429]
+        assert len(calls) == 2
+
+    def test_shared_address_is_not_throttled_at_username_rate(self, settings, faculty):
+        settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+        client = APIClient()
+        statuses = {
+            client.post('/api/auth/login/', {'username': f'user{number}', 'password': 'wrong'},
+                        format='json').status_code
+            for number in range(40)
+        }
+
+        assert statuses == {401}
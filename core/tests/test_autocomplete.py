@@ -0,0 +1,145 @@
+# core/tests/test_autocomplete.py
+from collections import Counter
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from core import autocomplete
+from core.models import AutocompleteTerm, DataSubmission, SubmissionData, Template
+
+
+pytestmark = pytest.mark.usefixtures('index_on_save')
+
+
+@pytest.fixture
+def awards_template(criteria):
+    return Template.objects.create(
+        code="3.4",
+        name="Awards",
+        criteria=criteria,
+        metadata=[{
+            "headers": ["3.4 Awards"],
+            "columns": [
+                {"name": "name_of_the_awardee", "type": "single", "data_type": "string"},
+                {"name": "title_of_the_innovation", "type": "single", "data_type": "string"},
+                {"name": "awarding_agency", "type": "single", "data_type": "string",
+                 "autocomplete": "agency"},
+                {"name": "year", "type": "single", "data_type": "number"},
+            ]
+        }]
+    )
+
+
+@pytest.fixture
+def submission(awards_template, department, academic_year, faculty):
+    return DataSubmission.objects.create(
+        template=awards_template,
+        department=department,
+        academic_year=academic_year,
+        submitted_by=faculty
+    )
+
+
+def add_row(submission, row_number, **data):
+    return SubmissionData.objects.create(
+        submission=submission, section_index=0, row_number=row_number, data=data
+    )
+
+
+class TestColumnKinds:
+    @pytest.mark.parametrize('name,expected', [
+        ('name_of_the_faculty', 'person'),
+        ('student_name', 'person'),
+        ('title_of_the_project', 'title'),
+        ('course_name', 'title'),
+        ('department', None),
+    ])
+    def test_heuristics(self, name, expected):
+        assert autocomplete.column_kind({'name': name, 'data_type': 'string'}) == expected
+
+    def test_declared_kind_wins(self):
+        assert autocomplete.column_kind({'name': 'student_name', 'autocomplete': False}) is None
+        assert autocomplete.column_kind({'name': 'agency', 'autocomplete': 'agency'}) == 'agency'
+
+    def test_normalize(self):
+        assert autocomplete.normalize('  Dr. José   KUMAR ') == 'dr. jose kumar'
+
+
+@pytest.mark.django_db
+class TestAutocompleteIndex:
+    def test_rows_are_indexed_on_save(self, submission):
+        add_row(submission, 1, name_of_the_awardee='Anita Rao', title_of_the_innovation='Solar dryer')
+        add_row(submission, 2, name_of_the_awardee='Anita Rao', awarding_agency='DST')
+        add_row(submission, 3, name_of_the_awardee='Anil Kumar', year='2023')
+
+        assert autocomplete.suggest('an') == ['Anita Rao', 'Anil Kumar']
+        assert autocomplete.suggest('sol', kind='title') == ['Solar dryer']
+        assert autocomplete.suggest('ds', kind='agency') == ['DST']
+        assert not AutocompleteTerm.objects.filter(normalized='2023').exists()
+
+    def test_edits_and_deletes_update_frequencies(self, submission):
+        first = add_row(submission, 1, name_of_the_awardee='Anita Rao')
+        add_row(submission, 2, name_of_the_awardee='Anil Kumar')
+        add_row(submission, 3, name_of_the_awardee='Anil Kumar')
+
+        first.data = {'name_of_the_awardee': 'Anand Iyer'}
+        first.save()
+        assert not AutocompleteTerm.objects.filter(normalized='anita rao').exists()
+
+        first.delete()
+        assert not AutocompleteTerm.objects.filter(normalized='anand iyer').exists()
+        assert AutocompleteTerm.objects.get(normalized='anil kumar').frequency == 2
+
+    def test_only_decremented_terms_are_pruned(self, submission):
+        add_row(submission, 1, name_of_the_awardee='Anita Rao')
+        # Left at zero by something else; pruning doesn't scan for these
+        AutocompleteTerm.objects.create(kind='person', normalized='unused', value='Unused')
+
+        autocomplete.apply_changes(Counter(), Counter({('person', 'anita rao'): 1}), {})
+
+        assert list(AutocompleteTerm.objects.values_list('normalized', flat=True)) == ['unused']
+
+    def test_short_prefix_and_limit(self, submission):
+        for n in range(5):
+            add_row(submission, n + 1, name_of_the_awardee=f'Priya {n}')
+
+        assert autocomplete.suggest('p') == []
+        assert len(autocomplete.suggest('pri', limit=3)) == 3
+
+    def test_hot_prefixes_are_cached(self, submission, django_assert_num_queries):
+        add_row(submission, 1, name_of_the_awardee='Anita Rao')
+        autocomplete.suggest('an')
+
+        with django_assert_num_queries(0):
+            assert autocomplete.suggest('AN') == ['Anita Rao']
+
+    def test_rebuild_command(self, submission):
+        add_row(submission, 1, name_of_the_awardee='Anita Rao')
+        add_row(submission, 2, name_of_the_awardee='anita  rao')
+        AutocompleteTerm.objects.all().delete()
+
+        call_command('rebuild_autocomplete', stdout=open('/dev/null', 'w'))
+
+        assert AutocompleteTerm.objects.get(normalized='anita rao').frequency == 2
+
+
+@pytest.mark.django_db
+def test_autocomplete_view(faculty, submission):
+    add_row(submission, 1, name_of_the_awardee='Anita Rao', title_of_the_innovation='Anita sensor')
+    client = APIClient()
+    client.force_authenticate(faculty)
+
+    assert client.get('/api/autocomplete/', {'q': 'ani'}).data == ['Anita Rao']
+    response = client.get('/api/autocomplete/', {
+        'q': 'ani', 'template': '3.4', 'board': submission.template.board_id,
+        'column': 'title_of_the_innovation'
+    })
+    assert response.data == ['Anita sensor']
+    # Without the board the template is ambiguous and isn't looked up
+    response = client.get('/api/autocomplete/', {
+        'q': 'ani', 'template': '3.4', 'column': 'title_of_the_innovation'
+    })
+    assert response.data == ['Anita Rao']
+    response = client.get('/api/autocomplete/', {'q': 'ani', 'limit': -1})
+    assert response.status_code == 200 and response.data == ['Anita Rao']
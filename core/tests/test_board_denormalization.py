@@ -0,0 +1,67 @@
+# core/tests/test_board_denormalization.py
+import pytest
+
+from core.models import Board, Criteria, DataSubmission, Template
+
+
+@pytest.mark.django_db
+class TestDenormalizedBoard:
+    def test_template_board_follows_criteria(self, programme_template, board):
+        assert programme_template.board_id == board.id
+
+    def test_submission_board_follows_template(self, programme_template, department,
+                                                academic_year, faculty, board):
+        submission = DataSubmission.objects.create(
+            template=programme_template,
+            department=department,
+            academic_year=academic_year,
+            submitted_by=faculty
+        )
+
+        assert submission.board_id == board.id
+
+    def test_moving_criteria_updates_templates_and_submissions(self, programme_template, criteria,
+                                                               department, academic_year, faculty):
+        submission = DataSubmission.objects.create(
+            template=programme_template,
+            department=department,
+            academic_year=academic_year,
+            submitted_by=faculty
+        )
+        nba = Board.objects.create(name="NBA", code="nba")
+
+        criteria.board = nba
+        criteria.save()
+
+        programme_template.refresh_from_db()
+        submission.refresh_from_db()
+        assert programme_template.board_id == nba.id
+        assert submission.board_id == nba.id
+
+    def test_board_filter_is_join_free(self, programme_template, board):
+        sql = str(Template.objects.filter(board=board).query)
+
+        assert 'core_criteria' not in sql
+
+    def test_board_scoped_submission_filter(self, programme_template, department,
+                                            academic_year, faculty, board):
+        DataSubmission.objects.create(
+            template=programme_template,
+            department=department,
+            academic_year=academic_year,
+            submitted_by=faculty
+        )
+        other_board = Board.objects.create(name="NIRF", code="nirf")
+        other_criteria = Criteria.objects.create(board=other_board, number=1, name="Teaching")
+        other_template = Template.objects.create(
+            code="1.1", name="Other", criteria=other_criteria, metadata=[]
+        )
+        DataSubmission.objects.create(
+            template=other_template,
+            department=department,
+            academic_year=academic_year,
+            submitted_by=faculty
+        )
+
+        assert DataSubmission.objects.filter(board__code='naac').count() == 1
+        assert DataSubmission.objects.filter(board=other_board).count() == 1
@@ -0,0 +1,89 @@
+# core/tests/test_carry_forward.py
+import pytest
+from django.core.exceptions import ValidationError
+
+from core.utils.carry_forward import CarryForwardRules, compile_section_rules
+
+ROWS = [
+    {'title': 'Project A', 'status': 'ongoing', 'amount': '1200', 'end_date': ''},
+    {'title': 'Project B', 'status': 'completed', 'amount': '300', 'end_date': '2024-03-01'},
+    {'title': 'Project C', 'status': 'ongoing', 'amount': 'n/a', 'end_date': None},
+    {'title': 'Project D', 'status': 'Ongoing', 'amount': '50'},
+]
+
+
+class TestCarryForwardRules:
+    def test_include_and_exclude(self):
+        rules = CarryForwardRules(
+            include=[{'column': 'status', 'op': 'in', 'value': ['ongoing', 'Ongoing']}],
+            exclude=[{'column': 'end_date', 'op': 'not_empty'}]
+        )
+
+        positions, rows = rules.apply(ROWS)
+
+        assert positions == [0, 2, 3]
+        assert [row['title'] for row in rows] == ['Project A', 'Project C', 'Project D']
+
+    def test_numeric_comparison_ignores_non_numbers(self):
+        rules = CarryForwardRules(include=[{'column': 'amount', 'op': 'gte', 'value': 100}])
+
+        positions, _ = rules.apply(ROWS)
+
+        assert positions == [0, 1]
+
+    def test_match_does_not_depend_on_other_rows(self):
+        rules = CarryForwardRules(include=[{'column': 'year', 'op': 'eq', 'value': 2020}])
+
+        assert rules.apply([{'year': 2020}, {'name': 'x'}])[0] == [0]
+        assert rules.apply([{'year': 2020}, {'year': 2021}])[0] == [0]
+
+    def test_missing_column_is_empty(self):
+        rules = CarryForwardRules(include=[{'column': 'sanction_no', 'op': 'empty'}])
+
+        assert rules.apply(ROWS)[0] == [0, 1, 2, 3]
+
+    def test_reset_and_set_do_not_touch_source_rows(self):
+        rules = CarryForwardRules(reset=['amount'], set={'status': 'carried'})
+
+        _, rows = rules.apply(ROWS)
+
+        assert rows[0] == {'title': 'Project A', 'status': 'carried', 'amount': '', 'end_date': ''}
+        assert ROWS[0]['amount'] == '1200'
+
+    def test_empty_input(self):
+        assert CarryForwardRules(include=[{'column': 'x'}]).apply([]) == ([], [])
+
+    @pytest.mark.parametrize('rules', [
+        {'include': [{'column': 'status', 'op': 'like'}]},
+        {'include': [{'op': 'eq'}]},
+        {'include': [{'column': 'status', 'op': 'in', 'value': 'ongoing'}]},
+        {'include': [{'column': 'amount', 'op': 'gt', 'value': 'abc'}]},
+        {'exclude': [{'column': 'amount', 'op': 'lte'}]},
+        {'keep': True},
+    ])
+    def test_invalid_rules_are_rejected(self, rules):
+        with pytest.raises(ValueError):
+            compile_section_rules([{'headers': [], 'columns': [], 'carry_forward_rules': rules}])
+
+    def test_compile_only_sections_with_rules(self):
+        compiled = compile_section_rules([
+            {'headers': [], 'columns': []},
+            {'headers': [], 'columns': [], 'carry_forward_rules': {'reset': ['amount']}},
+        ])
+
+        assert list(compiled) == [1]
+
+
+@pytest.mark.django_db
+def test_template_clean_validates_rules(programme_template):
+    programme_template.metadata[0]['carry_forward_rules'] = {'include': [{'column': 'x', 'op': 'like'}]}
+
+    with pytest.raises(ValidationError):
+        programme_template.clean()
+
+
+@pytest.mark.django_db
+def test_template_clean_accepts_valid_rules(programme_template):
+    programme_template.metadata[0]['carry_forward_rules'] = {'reset': ['programme_name']}
+
+    programme_template.clean()
@@ -0,0 +1,131 @@
+import copy
+import io
+
+import pytest
+from django.core.cache import cache
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from core.models import Template
+from core.utils.entry_workbook import build_entry_workbook, cache_key
+
+RESEARCH = [{
+    'headers': ['3.1 Research projects'],
+    'columns': [
+        {'name': 'title', 'display_name': 'Title', 'type': 'single', 'data_type': 'string',
+         'required': True, 'validation': {'max_length': 200}},
+        {'name': 'funding', 'display_name': 'Funding', 'type': 'group', 'columns': [
+            {'name': 'amount', 'display_name': 'Amount', 'type': 'single', 'data_type': 'number',
+             'validation': {'min': 0}},
+            {'name': 'sanctioned', 'display_name': 'Date sanctioned', 'type': 'single', 'data_type': 'date',
+             'validation': {'min': '2020-01-01', 'max': '2030-12-31'}},
+        ]},
+        {'name': 'status', 'type': 'single', 'data_type': 'option', 'options': ['Active', 'Closed']},
+        {'name': 'agency', 'type': 'single', 'data_type': 'option',
+         'options': [f'Funding agency number {number}' for number in range(20)]},
+    ]
+}]
+
+
+@pytest.fixture
+def research_template(board):
+    from core.models import Criteria
+    criteria = Criteria.objects.create(board=board, number=3, name='Research', order=3)
+    return Template.objects.create(code='3.1', name='Research projects', criteria=criteria,
+                                   metadata=copy.deepcopy(RESEARCH))
+
+
+def open_workbook(content):
+    return load_workbook(io.BytesIO(content))
+
+
+def validations(sheet):
+    return {str(rule.sqref): rule for rule in sheet.data_validations.dataValidation}
+
+
+@pytest.mark.django_db
+class TestEntryWorkbook:
+    def test_layout_matches_the_export(self, research_template):
+        sheet = open_workbook(build_entry_workbook([research_template], rows=10))['3.1']
+        values = [[cell for cell in row if cell] for row in sheet.iter_rows(values_only=True)]
+
+        assert values[2] == ['Version: 1']
+        assert values[4] == ['3.1 Research projects']
+        assert values[5] == ['Title', 'Funding', 'status', 'agency']
+        assert values[6] == ['Amount', 'Date sanctioned']
+        assert 'B6:C6' in [str(merged) for merged in sheet.merged_cells.ranges]
+        # Nothing is written below the headers
+        assert sheet.max_row == 7
+
+    def test_validations_come_from_the_layout(self, research_template):
+        workbook = open_workbook(build_entry_workbook([research_template], rows=10))
+        rules = validations(workbook['3.1'])
+
+        assert rules['A8:A17'].type == 'textLength' and rules['A8:A17'].formula1 == '200'
+        assert rules['A8:A17'].allow_blank is False
+        assert rules['B8:B17'].type == 'decimal' and rules['B8:B17'].operator == 'greaterThanOrEqual'
+        assert rules['C8:C17'].formula1 == 'DATE(2020,1,1)' and rules['C8:C17'].formula2 == 'DATE(2030,12,31)'
+        assert rules['D8:D17'].formula1 == '"Active,Closed"'
+        # Too long to inline, so listed on the hidden sheet
+        assert rules['E8:E17'].formula1 == "'Lists'!$A$1:$A$20"
+        assert workbook['Lists'].sheet_state == 'hidden'
+        assert workbook.sheetnames == ['3.1', 'Lists']
+
+    def test_cached_per_version(self, research_template):
+        first = build_entry_workbook([research_template], rows=10)
+        assert cache.get(cache_key([research_template], 10)) == first
+
+        research_template.metadata[0]['columns'].pop()
+        research_template.save()
+        changed = build_entry_workbook([research_template], rows=10)
+
+        assert changed != first
+        assert 'E8:E17' not in validations(open_workbook(changed)['3.1'])
+
+    def test_templates_without_a_version_get_their_own_key(self, research_template):
+        papers, patents = Template.objects.bulk_create([
+            Template(code=code, name=code, criteria=research_template.criteria,
+                     board=research_template.board, metadata=copy.deepcopy(RESEARCH))
+            for code in ('3.2', '3.3')
+        ])
+        assert papers.current_version_id is None and patents.current_version_id is None
+
+        assert open_workbook(build_entry_workbook([papers], rows=10)).sheetnames[0] == '3.2'
+        assert open_workbook(build_entry_workbook([patents], rows=10)).sheetnames[0] == '3.3'
+
+    def test_bounds_that_are_not_dates_are_skipped(self, research_template):
+        sanctioned = research_template.metadata[0]['columns'][1]['columns'][1]
+        sanctioned['validation'] = {'min': '01/01/2020', 'max': '2030-12-31'}
+        research_template.save()
+
+        rule = validations(open_workbook(build_entry_workbook([research_template], rows=10))['3.1'])['C8:C17']
+
+        assert rule.operator == 'lessThanOrEqual' and rule.formula1 == 'DATE(2030,12,31)'
+
+
+@pytest.mark.django_db
+class TestEntryWorkbookView:
+    def get(self, user, query):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(f'/api/templates/entry-workbook/{query}')
+
+    def test_criterion_workbook(self, programme_template, research_template, faculty):
+        Template.objects.create(code='1.2', name='Courses', criteria=programme_template.criteria,
+                                metadata=programme_template.metadata)
+
+        response = self.get(faculty, f'?board={programme_template.board_id}&criterion=1')
+
+        assert response.status_code == 200
+        assert 'criterion_1_entry.xlsx' in response['Content-Disposition']
+        assert open_workbook(response.content).sheetnames == ['1.1', '1.2']
+
+    def test_template_workbook(self, research_template, faculty):
+        response = self.get(faculty, f'?board={research_template.board_id}&template_code=3.1')
+
+        assert response.status_code == 200
+        assert open_workbook(response.content).sheetnames == ['3.1', 'Lists']
+
+    def test_requires_template_or_criterion(self, board, faculty):
+        assert self.get(faculty, f'?board={board.id}').status_code == 400
+        assert self.get(faculty, f'?board={board.id}&template_code=9.9').status_code == 404
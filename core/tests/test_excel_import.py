@@ -0,0 +1,306 @@
+import io
+import zipfile
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from core.models import Template
+from core.utils.excel_import import (
+    ArchiveTooLargeError, WorkbookFormatError, classify, parse_batch, parse_rows, parse_workbook,
+    workbook_sources
+)
+
+
+def workbook_file(sheets, name='upload.xlsx'):
+    """An .xlsx upload with one sheet per (title, rows) pair"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    upload = io.BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    upload.name = name
+    return upload
+
+
+def zip_file(files, name='templates.zip'):
+    """A .zip upload of {file name: bytes}"""
+    upload = io.BytesIO()
+    with zipfile.ZipFile(upload, 'w') as archive:
+        for file_name, data in files.items():
+            archive.writestr(file_name, data)
+    upload.seek(0)
+    upload.name = name
+    return upload
+
+
+COURSES = [
+    ['1.2.1 Courses introduced during the year'],
+    ['Name of the Course', 'Date of Introduction', 'Link to the document', 'Is it elective (Yes/No)'],
+]
+
+
+class TestParseRows:
+    def test_sections_and_data_types(self):
+        sections = parse_rows([
+            *COURSES,
+            [None, None],
+            ['1.2.2 Students enrolled'],
+            ['Programme Code', 'Number of students', 'Contact email'],
+        ])
+
+        assert [section['headers'] for section in sections] == [
+            ['1.2.1 Courses introduced during the year'], ['1.2.2 Students enrolled']
+        ]
+        columns = sections[0]['columns']
+        assert [column['data_type'] for column in columns] == ['string', 'date', 'url', 'option']
+        assert columns[3]['options'] == ['Yes', 'No']
+        assert columns[0] == {'name': 'Name of the Course', 'type': 'single',
+                              'data_type': 'string', 'required': True}
+        assert [column['data_type'] for column in sections[1]['columns']] == ['string', 'number', 'email']
+
+    def test_group_row_nests_the_columns_below(self):
+        sections = parse_rows([
+            ['3.1.1 Research grants'],
+            ['Name of the Project', 'Funding', None],
+            ['Name of the Project', 'Agency', 'Amount sanctioned'],
+        ])
+
+        project, funding = sections[0]['columns']
+        assert project['name'] == 'name_of_the_project' and project['type'] == 'single'
+        assert funding['type'] == 'group' and funding['display_name'] == 'Funding'
+        assert [column['name'] for column in funding['columns']] == ['agency', 'amount_sanctioned']
+        assert funding['columns'][1]['data_type'] == 'number'
+
+    def test_column_row_without_type_hints_is_not_a_group_row(self):
+        sections = parse_rows([
+            ['5.1.1 Scholarships'],
+            ['Name of the Scheme', 'Name of the Student'],
+            ['5.1.2 Capacity building'],
+        ])
+
+        assert [column['name'] for column in sections[0]['columns']] == [
+            'Name of the Scheme', 'Name of the Student'
+        ]
+        assert sections[1]['columns'] == []
+
+    def test_columns_before_a_header_are_rejected(self):
+        with pytest.raises(WorkbookFormatError):
+            parse_rows([['Name', 'Date of Award']])
+
+    def test_classification_is_cached(self):
+        classify.cache_clear()
+        classify('Date of Award')
+        classify('Date of Award')
+
+        assert classify.cache_info().hits == 1
+
+
+class TestParseWorkbook:
+    def test_active_sheet_only_by_default(self):
+        upload = workbook_file([('Courses', COURSES), ('Other', COURSES)])
+
+        sheets = parse_workbook(upload)
+
+        assert [sheet.title for sheet in sheets] == ['Courses']
+        assert sheets[0].code == '1.2.1'
+
+    def test_all_sheets(self):
+        upload = workbook_file([
+            ('1.2.1', COURSES),
+            ('Enrolment', [['2.1.1 Enrolment'], ['Programme Code', 'Number of seats']]),
+            ('Broken', [['Name', 'Date of Award']]),
+        ])
+
+        sheets = parse_workbook(upload, all_sheets=True)
+
+        assert [(sheet.title, sheet.code) for sheet in sheets] == [
+            ('1.2.1', '1.2.1'), ('Enrolment', '2.1.1'), ('Broken', None)
+        ]
+        assert sheets[2].error and not sheets[2].sections
+
+
+@pytest.mark.django_db
+class TestImportFromExcel:
+    def post(self, user, board, academic_year, upload, sheets=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/templates/import-excel/?board={board.id}&academic_year={academic_year.id}'
+        if sheets:
+            url += f'&sheets={sheets}'
+        return client.post(url, {'file': upload}, format='multipart')
+
+    def test_single_sheet_uses_file_name_as_code(self, board, criteria, academic_year, iqac_director):
+        response = self.post(iqac_director, board, academic_year,
+                             workbook_file([('Sheet', COURSES)], name='1.9.xlsx'))
+
+        assert response.status_code == 200, response.data
+        assert response.data['data']['code'] == '1.9'
+        assert Template.objects.get(code='1.9').name == COURSES[0][0]
+
+    def test_multi_sheet_reports_per_sheet(self, board, criteria, academic_year, iqac_director):
+        upload = workbook_file([
+            ('1.2.1', COURSES),
+            ('Enrolment', [['2.1.1 Enrolment'], ['Programme Code', 'Number of seats']]),
+            ('Broken', [['Name', 'Date of Award']]),
+        ])
+
+        response = self.post(iqac_director, board, academic_year, upload, sheets='all')
+
+        assert response.status_code == 200
+        assert response.data['status'] == 'error'
+        assert [result['status'] for result in response.data['results']] == ['success', 'success', 'error']
+        assert set(Template.objects.values_list('code', flat=True)) == {'1.2.1', '2.1.1'}
+        assert Template.objects.get(code='2.1.1').criteria.number == 2
+
+    def test_invalid_file(self, board, academic_year, iqac_director):
+        upload = io.BytesIO(b'not a workbook')
+        upload.name = '1.1.xlsx'
+
+        response = self.post(iqac_director, board, academic_year, upload)
+
+        assert response.status_code == 400
+        assert response.data['status'] == 'error'
+
+
+ENROLMENT = [['2.1.1 Enrolment'], ['Programme Code', 'Number of seats']]
+
+
+class TestParseBatch:
+    def test_workbook_sources_skip_other_files(self, tmp_path):
+        (tmp_path / 'criterion1').mkdir()
+        (tmp_path / 'criterion1' / '1.1.xlsx').write_bytes(workbook_file([('Sheet', COURSES)]).read())
+        (tmp_path / '~$1.1.xlsx').write_bytes(b'lock')
+        (tmp_path / 'notes.txt').write_text('notes')
+
+        assert [name for name, _ in workbook_sources(tmp_path)] == ['criterion1/1.1.xlsx']
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_files_are_coded_by_name(self, workers):
+        archive = zip_file({
+            'criterion1/1.1.xlsx': workbook_file([('Sheet', COURSES)]).read(),
+            '2.1.xlsx': workbook_file([('Sheet', ENROLMENT)]).read(),
+            'broken.xlsx': b'not a workbook',
+            'other.xlsx': zip_file({'notes.txt': b'not an Excel package'}).read(),
+            '__MACOSX/._2.1.xlsx': b'metadata',
+        })
+
+        parsed = parse_batch(workbook_sources(archive), workers=workers)
+
+        assert [file.name for file in parsed] == [
+            '2.1.xlsx', 'broken.xlsx', 'criterion1/1.1.xlsx', 'other.xlsx'
+        ]
+        assert [sheet.code for sheet in parsed[0].sheets] == ['2.1']
+        assert parsed[1].error and not parsed[1].sheets
+        assert parsed[2].sheets[0].code == '1.1'
+        assert parsed[2].sheets[0].sections[0]['columns'][1]['data_type'] == 'date'
+        assert parsed[3].error and not parsed[3].sheets
+
+    def test_archive_limits_are_checked_before_extracting(self):
+        archive = zip_file({f'1.{number}.xlsx': b'x' * 100 for number in range(3)})
+
+        with pytest.raises(ArchiveTooLargeError):
+            next(workbook_sources(archive, max_files=2))
+        with pytest.raises(ArchiveTooLargeError):
+            next(workbook_sources(archive, max_file_size=50))
+        with pytest.raises(ArchiveTooLargeError):
+            next(workbook_sources(archive, max_total_size=250))
+        assert len(list(workbook_sources(archive, max_files=3, max_total_size=300))) == 3
+
+
+@pytest.mark.django_db
+class TestImportBatch:
+    def post(self, user, board, academic_year, upload, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(
+            f'/api/templates/import-batch/?board={board.id}&academic_year={academic_year.id}{query}',
+            {'file': upload}, format='multipart'
+        )
+
+    def test_zip_upload_reports_per_file(self, board, criteria, academic_year, iqac_director, settings):
+        settings.TEMPLATE_IMPORT_WORKERS = 1
+        archive = zip_file({
+            '1.1.xlsx': workbook_file([('Sheet', COURSES)]).read(),
+            '2.1.xlsx': workbook_file([('Sheet', ENROLMENT)]).read(),
+            'x.xlsx': workbook_file([('Sheet', COURSES)]).read(),
+            'y.xlsx': zip_file({'notes.txt': b'not an Excel package'}).read(),
+        })
+
+        response = self.post(iqac_director, board, academic_year, archive)
+
+        assert response.status_code == 200
+        assert [result['status'] for result in response.data['results']] == [
+            'success', 'success', 'error', 'error'
+        ]
+        assert response.data['results'][0]['templates'] == [{'sheet': 'Sheet', 'code': '1.1', 'version': 1}]
+        assert set(Template.objects.values_list('code', flat=True)) == {'1.1', '2.1'}
+
+    def test_templates_with_submissions_are_not_replaced(self, programme_template, academic_year,
+                                                         department, faculty, iqac_director, settings):
+        settings.TEMPLATE_IMPORT_WORKERS = 1
+        programme_template.datasubmission_set.create(
+            department=department, academic_year=academic_year, submitted_by=faculty
+        )
+        archive = zip_file({'1.1.xlsx': workbook_file([('Sheet', COURSES)]).read()})
+
+        response = self.post(iqac_director, programme_template.board, academic_year, archive)
+
+        assert response.status_code == 400
+        assert 'existing submissions' in response.data['results'][0]['message']
+
+    def test_directors_only(self, board, criteria, academic_year, faculty):
+        archive = zip_file({'1.1.xlsx': workbook_file([('Sheet', COURSES)]).read()})
+
+        response = self.post(faculty, board, academic_year, archive)
+
+        assert response.status_code == 403
+        assert not Template.objects.exists()
+
+    def test_oversized_archive(self, board, academic_year, iqac_director, settings):
+        settings.TEMPLATE_IMPORT_MAX_FILE_SIZE = 1024
+        archive = zip_file({'1.1.xlsx': b'\0' * 4096})
+
+        response = self.post(iqac_director, board, academic_year, archive)
+
+        assert response.status_code == 400
+        assert 'limit' in response.data['message']
+
+    def test_not_a_zip(self, board, academic_year, iqac_director):
+        response = self.post(iqac_director, board, academic_year, workbook_file([('Sheet', COURSES)]))
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestImportTemplatesCommand:
+    def write(self, directory, sheets):
+        directory.mkdir(exist_ok=True)
+        (directory / 'all.xlsx').write_bytes(workbook_file(sheets).read())
+
+    def test_directory_with_all_sheets(self, tmp_path, board, academic_year):
+        self.write(tmp_path, [('1.2.1', COURSES), ('Enrolment', ENROLMENT)])
+        out = StringIO()
+
+        call_command('import_templates', str(tmp_path), board=board.code,
+                     academic_year=academic_year.name, all_sheets=True, workers=1, stdout=out)
+
+        assert 'all.xlsx: 1.2.1 (v1), 2.1.1 (v1)' in out.getvalue()
+        assert 'Imported 1 of 1 files' in out.getvalue()
+        assert Template.objects.get(code='2.1.1').criteria.number == 2
+
+    def test_dry_run_writes_nothing(self, tmp_path, board, academic_year):
+        self.write(tmp_path, [('1.2.1', COURSES)])
+        out = StringIO()
+
+        call_command('import_templates', str(tmp_path), board=board.code, academic_year=academic_year.name,
+                     all_sheets=True, workers=1, dry_run=True, stdout=out)
+
+        assert 'Would import 1 of 1 files' in out.getvalue()
+        assert not Template.objects.exists()
@@ -0,0 +1,83 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.frameworks import FrameworkLoader
+from core.models import Board, Criteria, Template
+
+CRITERIA = [
+    {'number': 1, 'name': 'Curricular Aspects', 'description': 'Curriculum', 'order': 1},
+    {'number': 2, 'name': 'Teaching-learning and Evaluation', 'description': 'Teaching', 'order': 2},
+]
+TEMPLATES = [
+    {'code': '1.1', 'name': 'Programmes offered', 'criterion': 1,
+     'metadata': [{'headers': ['1.1'], 'columns': [], 'carry_forward': True}]},
+    {'code': '2.1', 'name': 'Student enrolment', 'criterion': 2,
+     'metadata': [{'headers': ['2.1'], 'columns': []}]},
+]
+
+
+@pytest.mark.django_db
+class TestFrameworkLoader:
+    def test_first_load_creates_everything(self):
+        report = FrameworkLoader('test', 'TEST', CRITERIA, TEMPLATES).load()
+
+        assert report.board_created
+        assert report.criteria.created == [1, 2]
+        assert report.templates.created == ['1.1', '2.1']
+        template = Template.objects.get(code='1.1')
+        assert template.board == report.board
+        assert template.carry_forward is True
+        assert template.criteria.number == 1
+
+    def test_reload_is_a_few_queries_and_no_writes(self):
+        FrameworkLoader('test', 'TEST', CRITERIA, TEMPLATES).load()
+
+        with CaptureQueriesContext(connection) as queries:
+            report = FrameworkLoader('test', 'TEST', CRITERIA, TEMPLATES).load()
+
+        assert not report.changed
+        assert report.criteria.unchanged == 2 and report.templates.unchanged == 2
+        statements = [query['sql'] for query in queries.captured_queries]
+        assert not [sql for sql in statements if sql.startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        assert len(queries) <= 6  # board, criteria, templates, savepoint handling
+
+    def test_changes_are_updated(self):
+        FrameworkLoader('test', 'TEST', CRITERIA, TEMPLATES).load()
+        criteria = [{**CRITERIA[0], 'name': 'Curriculum'}, CRITERIA[1],
+                    {'number': 3, 'name': 'Research', 'description': '', 'order': 3}]
+        templates = [{**TEMPLATES[0], 'metadata': [{'headers': ['1.1'], 'columns': []}]}]
+
+        report = FrameworkLoader('test', 'TEST', criteria, templates).load()
+
+        assert report.criteria.updated == [1]
+        assert report.criteria.created == [3]
+        assert report.templates.updated == ['1.1']
+        assert Criteria.objects.get(number=1).name == 'Curriculum'
+        assert Template.objects.get(code='1.1').carry_forward is False
+
+    def test_dry_run_writes_nothing(self):
+        report = FrameworkLoader('test', 'TEST', CRITERIA, TEMPLATES).load(dry_run=True)
+
+        assert report.criteria.created == [1, 2]
+        assert not Board.objects.filter(code='test').exists()
+        assert not Criteria.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('command,code,count', [
+    ('populate_naac_criteria', 'naac', 7),
+    ('populate_nba_criteria', 'nba', 7),
+    ('populate_nirf_criteria', 'nirf', 5),
+])
+def test_populate_commands_are_idempotent(command, code, count):
+    call_command(command, stdout=StringIO())
+    out = StringIO()
+    call_command(command, stdout=out)
+
+    assert Criteria.objects.filter(board__code=code).count() == count
+    assert '- Created: 0' in out.getvalue()
+    assert f'- Unchanged: {count}' in out.getvalue()
@@ -0,0 +1,233 @@
+# core/tests/test_history.py
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import history
+from core import tasks
+from core.models import AuditEvent, DataSubmission, SubmissionData, SubmissionHistory
+
+
+@pytest.fixture
+def submission(programme_template, department, academic_year, faculty):
+    return DataSubmission.objects.create(
+        template=programme_template,
+        department=department,
+        academic_year=academic_year,
+        submitted_by=faculty
+    )
+
+
+@pytest.fixture
+def client(faculty):
+    client = APIClient()
+    client.force_authenticate(faculty)
+    return client
+
+
+def add(client, submission, code, name='B.Sc'):
+    response = client.post(f'/api/submissions/{submission.id}/add_row/', {
+        'section_index': 0,
+        'data': {'programme_code': code, 'programme_name': name}
+    }, format='json')
+    assert response.status_code == 200
+    return SubmissionData.objects.get(submission=submission, data__programme_code=code)
+
+
+def update(client, submission, row, **data):
+    response = client.put(f'/api/submissions/{submission.id}/update_row/', {
+        'row_id': row.id, 'data': {**row.data, **data}
+    }, format='json')
+    assert response.status_code == 200
+
+
+def current_rows(submission):
+    return history.state_rows(history.submission_state(submission))
+
+
+class TestDeltas:
+    def test_row_delta_only_has_changed_fields(self):
+        delta = history.row_delta(
+            {'a': 1, 'b': 2, 'c': 3},
+            {'a': 1, 'b': 20, 'd': 4}
+        )
+
+        assert delta == {'set': {'b': 20, 'd': 4}, 'unset': ['c'], 'old': {'b': 2, 'c': 3}}
+
+    def test_delete_renumbers_following_rows_in_section(self):
+        state = {
+            '1': {'section_index': 0, 'row_number': 1, 'data': {}},
+            '2': {'section_index': 0, 'row_number': 2, 'data': {}},
+            '3': {'section_index': 1, 'row_number': 2, 'data': {}},
+        }
+
+        history.apply_delta(state, 1, {'op': 'delete', 'section_index': 0, 'row_number': 1})
+
+        assert state == {
+            '2': {'section_index': 0, 'row_number': 1, 'data': {}},
+            '3': {'section_index': 1, 'row_number': 2, 'data': {}},
+        }
+
+
+@pytest.mark.django_db
+class TestSubmissionHistory:
+    @pytest.fixture(autouse=True)
+    def inline_audit(self, settings):
+        settings.AUDIT_ASYNC = False
+
+    def test_update_stores_single_row_delta(self, client, submission):
+        row = add(client, submission, 'BSC')
+        add(client, submission, 'MSC')
+
+        update(client, submission, row, programme_name='B.Sc Honours')
+
+        entry = SubmissionHistory.objects.filter(action='row_updated').get()
+        assert entry.row_id == row.id
+        assert entry.delta['set'] == {'programme_name': 'B.Sc Honours'}
+        assert entry.previous_data is None and entry.new_data is None
+        assert entry.details['changes'][0]['old_value'] == 'B.Sc'
+
+    def test_replay_reconstructs_every_point(self, client, submission):
+        states = []
+        first = add(client, submission, 'BSC')
+        states.append(current_rows(submission))
+        second = add(client, submission, 'MSC')
+        states.append(current_rows(submission))
+        update(client, submission, first, programme_name='B.Sc Honours')
+        states.append(current_rows(submission))
+        response = client.delete(f'/api/submissions/{submission.id}/delete_row/?row_id={first.id}')
+        assert response.status_code == 200
+        states.append(current_rows(submission))
+        assert states[-1][0]['id'] == second.id and states[-1][0]['row_number'] == 1
+
+        deltas = SubmissionHistory.objects.filter(submission=submission, delta__isnull=False).order_by('id')
+        for entry, expected in zip(deltas, states):
+            state, _ = history.state_at(submission, upto_id=entry.id)
+            assert history.state_rows(state) == expected
+
+    def test_snapshots_bound_replay(self, client, submission, settings):
+        settings.HISTORY_SNAPSHOT_INTERVAL = 3
+        row = add(client, submission, 'BSC')
+        for n in range(7):
+            update(client, submission, row, programme_name=f'Name {n}')
+            row.refresh_from_db()
+
+        state, replayed = history.state_at(submission)
+
+        assert replayed < 3
+        assert history.state_rows(state) == current_rows(submission)
+        assert SubmissionHistory.objects.filter(snapshot__isnull=False).count() == 3
+
+    def test_rows_written_before_tracking_are_in_baseline(self, client, submission):
+        legacy = SubmissionData.objects.create(
+            submission=submission, section_index=0, row_number=1,
+            data={'programme_code': 'OLD', 'programme_name': 'Imported'}
+        )
+
+        update(client, submission, legacy, programme_name='Edited')
+
+        baseline = SubmissionHistory.objects.get(action='snapshot')
+        assert baseline.snapshot[str(legacy.id)]['data']['programme_name'] == 'Imported'
+        state, _ = history.state_at(submission, upto_id=baseline.id)
+        assert state[str(legacy.id)]['data']['programme_name'] == 'Imported'
+
+    def test_legacy_full_state_entries_act_as_snapshots(self, submission, faculty):
+        SubmissionHistory.objects.create(
+            submission=submission, action='updated', performed_by=faculty,
+            previous_data={}, new_data={'7': {'section_index': 0, 'row_number': 1, 'data': {'x': 1}}}
+        )
+
+        state, replayed = history.state_at(submission)
+
+        assert state == {'7': {'section_index': 0, 'row_number': 1, 'data': {'x': 1}}}
+        assert replayed == 0
+
+    def test_history_state_endpoint(self, client, submission):
+        add(client, submission, 'BSC')
+        before_second = timezone.now()
+        add(client, submission, 'MSC')
+
+        response = client.get(f'/api/submissions/{submission.id}/history_state/',
+                              {'at': before_second.isoformat()})
+
+        assert response.status_code == 200
+        codes = [row['data']['programme_code'] for row in response.data['data']['rows']]
+        assert codes == ['BSC']
+
+        assert client.get(f'/api/submissions/{submission.id}/history_state/',
+                          {'at': 'yesterday'}).status_code == 400
+
+
+@pytest.mark.django_db
+class TestAuditOutbox:
+    @pytest.fixture(autouse=True)
+    def async_audit(self, settings, monkeypatch):
+        settings.AUDIT_ASYNC = True
+        self.enqueued = []
+        monkeypatch.setattr(tasks.flush_audit_events_task, 'delay', lambda: self.enqueued.append(True))
+
+    def test_edits_only_queue_events(self, client, submission, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            row = add(client, submission, 'BSC')
+            update(client, submission, row, programme_name='B.Sc Honours')
+
+        assert not SubmissionHistory.objects.exists()
+        assert list(AuditEvent.objects.values_list('action', flat=True)) == ['row_added', 'row_updated']
+        assert len(self.enqueued) == 2
+
+        assert tasks.flush_audit_events_task() == 2
+
+        assert not AuditEvent.objects.exists()
+        actions = SubmissionHistory.objects.order_by('id').values_list('action', flat=True)
+        assert list(actions) == ['snapshot', 'row_added', 'row_updated']
+
+    def test_baseline_and_replay_from_queued_events(self, client, submission, settings):
+        settings.HISTORY_SNAPSHOT_INTERVAL = 2
+        legacy = SubmissionData.objects.create(
+            submission=submission, section_index=0, row_number=1,
+            data={'programme_code': 'OLD', 'programme_name': 'Imported'}
+        )
+        states = []
+        first = add(client, submission, 'BSC')
+        states.append(current_rows(submission))
+        update(client, submission, legacy, programme_name='Edited')
+        states.append(current_rows(submission))
+        response = client.delete(f'/api/submissions/{submission.id}/delete_row/?row_id={legacy.id}')
+        assert response.status_code == 200
+        states.append(current_rows(submission))
+        update(client, submission, SubmissionData.objects.get(pk=first.pk), programme_name='M.Sc')
+        states.append(current_rows(submission))
+
+        history.flush_events()
+
+        baseline = SubmissionHistory.objects.get(action='snapshot')
+        assert list(baseline.snapshot) == [str(legacy.id)]
+        assert baseline.snapshot[str(legacy.id)]['data']['programme_name'] == 'Imported'
+        deltas = SubmissionHistory.objects.filter(delta__isnull=False).order_by('id')
+        assert [entry.snapshot is not None for entry in deltas] == [False, True, False, True]
+        for entry, expected in zip(deltas, states):
+            state, _ = history.state_at(submission, upto_id=entry.id)
+            assert history.state_rows(state) == expected
+
+    def test_events_survive_failed_flush(self, client, submission, monkeypatch):
+        add(client, submission, 'BSC')
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('worker died')
+        monkeypatch.setattr(SubmissionHistory.objects, 'bulk_create', fail)
+        with pytest.raises(RuntimeError):
+            history.flush_events()
+        monkeypatch.undo()
+
+        assert AuditEvent.objects.count() == 1
+        assert not SubmissionHistory.objects.exists()
+        assert history.flush_events() == 1
+        assert SubmissionHistory.objects.filter(action='row_added').count() == 1
+
+    def test_history_state_includes_queued_edits(self, client, submission):
+        add(client, submission, 'BSC')
+
+        response = client.get(f'/api/submissions/{submission.id}/history_state/')
+
+        assert [row['data']['programme_code'] for row in response.data['data']['rows']] == ['BSC']
+        assert not AuditEvent.objects.exists()
@@ -0,0 +1,105 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import tasks
+from core.models import AutocompleteTerm, DataSubmission, SearchDocument, SubmissionData, Template
+from core.search import search_documents
+
+
+@pytest.fixture
+def awards_template(criteria):
+    return Template.objects.create(
+        code="3.4",
+        name="Awards",
+        criteria=criteria,
+        metadata=[{
+            "headers": ["3.4 Awards"],
+            "columns": [{"name": "name_of_the_awardee", "type": "single", "data_type": "string"}]
+        }]
+    )
+
+
+@pytest.fixture
+def submission(awards_template, department, academic_year, faculty):
+    return DataSubmission.objects.create(
+        template=awards_template, department=department, academic_year=academic_year, submitted_by=faculty
+    )
+
+
+@pytest.fixture
+def inline(settings):
+    settings.INDEX_ASYNC = False
+
+
+def add_row(submission, name, row_number=1):
+    return SubmissionData.objects.create(
+        submission=submission, section_index=0, row_number=row_number, data={'name_of_the_awardee': name}
+    )
+
+
+@pytest.mark.django_db
+class TestDeferredIndexing:
+    def test_rows_are_indexed_after_commit(self, inline, submission, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            add_row(submission, 'Anita Rao')
+
+            assert not SearchDocument.objects.filter(kind='row').exists()
+            assert not AutocompleteTerm.objects.exists()
+
+        assert len(callbacks) == 1
+        assert search_documents('anita').filter(kind='row').exists()
+        assert AutocompleteTerm.objects.get().value == 'Anita Rao'
+
+    def test_async_hands_the_change_to_a_worker(self, settings, submission, monkeypatch,
+                                                django_capture_on_commit_callbacks):
+        settings.INDEX_ASYNC = True
+        queued = []
+        monkeypatch.setattr(tasks.index_row_change_task, 'delay', lambda *change: queued.append(change))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            row = add_row(submission, 'Anita Rao')
+
+        assert queued == [
+            (submission.id, submission.template_id, row.id, None, {'name_of_the_awardee': 'Anita Rao'})
+        ]
+        assert not AutocompleteTerm.objects.exists()
+
+        tasks.index_row_change_task(*queued[0])
+        assert AutocompleteTerm.objects.get().frequency == 1
+
+    def test_loaded_rows_are_not_read_again(self, inline, submission, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            add_row(submission, 'Anita Rao')
+        row = SubmissionData.objects.get(submission=submission)
+
+        row.data = {'name_of_the_awardee': 'Ravi Kumar'}
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                row.save()
+
+        assert [query['sql'].split()[0] for query in queries.captured_queries] == ['UPDATE']
+        for callback in callbacks:
+            callback()
+        assert list(AutocompleteTerm.objects.values_list('value', flat=True)) == ['Ravi Kumar']
+
+    def test_saves_without_data_changes_queue_nothing(self, inline, submission,
+                                                      django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            row = add_row(submission, 'Anita Rao')
+
+        row.row_number = 2
+        with django_capture_on_commit_callbacks() as callbacks:
+            row.save()
+
+        assert callbacks == []
+
+    def test_rows_deleted_with_their_submission_release_terms(self, inline, submission,
+                                                              django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            add_row(submission, 'Anita Rao')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            DataSubmission.objects.get(pk=submission.pk).delete()
+
+        assert not AutocompleteTerm.objects.exists()
@@ -0,0 +1,53 @@
+# core/tests/test_logging.py
+import json
+import logging
+
+import pytest
+from rest_framework.test import APIClient
+
+from core.utils.export_logger import JsonFormatter, parse_levels
+
+
+class TestStructuredLogging:
+    def test_json_formatter(self):
+        record = logging.LogRecord('core.views', logging.INFO, __file__, 1, 'Export of %s done', ('1.1',), None)
+        record.template = '1.1'
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry['message'] == 'Export of 1.1 done'
+        assert entry['level'] == 'INFO'
+        assert entry['logger'] == 'core.views'
+        assert entry['template'] == '1.1'
+
+    def test_parse_levels(self):
+        assert parse_levels('core.views=debug, core.search=WARNING,') == {
+            'core.views': {'level': 'DEBUG'},
+            'core.search': {'level': 'WARNING'},
+        }
+        with pytest.raises(ValueError):
+            parse_levels('core.views=LOUD')
+
+
+@pytest.mark.django_db
+class TestDebugOnlyQueries:
+    def count_queries(self, query_detector, iqac_director, board):
+        client = APIClient()
+        client.force_authenticate(iqac_director)
+        response = client.get('/api/templates/', {'board': board.id})
+        assert response.status_code == 200
+        return sum(count for pattern, count in query_detector.patterns.items() if 'COUNT(' in pattern)
+
+    def test_no_count_queries_without_debug(self, caplog, query_detector, iqac_director, board, programme_template):
+        caplog.set_level(logging.INFO, logger='core.views')
+
+        assert self.count_queries(query_detector, iqac_director, board) == 0
+
+    def test_counts_logged_with_debug(self, caplog, query_detector, iqac_director, board, programme_template,
+                                      settings):
+        # The debug-only counts are over the view's query budget by design
+        settings.QUERY_BUDGET_STRICT = False
+        caplog.set_level(logging.DEBUG, logger='core.views')
+
+        assert self.count_queries(query_detector, iqac_director, board) == 2
+        assert any('Templates after board filter' in message for message in caplog.messages)
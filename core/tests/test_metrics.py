@@ -0,0 +1,105 @@
+# core/tests/test_metrics.py
+import pytest
+from rest_framework.test import APIClient
+
+from core.metrics import MetricsRegistry, registry
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.fixture
+def client(iqac_director):
+    client = APIClient()
+    client.force_authenticate(iqac_director)
+    return client
+
+
+class TestRegistry:
+    def test_render_prometheus_text(self):
+        metrics = MetricsRegistry()
+        metrics.observe('TemplateViewSet', 'data', 'GET', 200, 0.03, queries=4, db_time=0.01,
+                        response_bytes=120, render_time=0.002)
+        metrics.observe('TemplateViewSet', 'data', 'GET', 404, 2.0)
+
+        text = metrics.render()
+
+        labels = 'view="TemplateViewSet",action="data",method="GET"'
+        assert f'naac_http_requests_total{{{labels},status="200"}} 1' in text
+        assert f'naac_http_requests_total{{{labels},status="404"}} 1' in text
+        assert f'naac_http_request_duration_seconds_bucket{{{labels},le="0.05"}} 1' in text
+        assert f'naac_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f'naac_db_queries_total{{{labels}}} 4' in text
+        assert f'naac_response_bytes_total{{{labels}}} 120' in text
+        assert '# TYPE naac_http_request_duration_seconds histogram' in text
+
+
+@pytest.mark.django_db
+class TestRequestMetricsMiddleware:
+    def test_viewset_action_is_recorded(self, client, programme_template, settings):
+        settings.SERVER_TIMING_ENABLED = True
+
+        response = client.get('/api/templates/')
+
+        assert response.status_code == 200
+        assert 'db;dur=' in response['Server-Timing']
+        stats = registry.snapshot()[('TemplateViewSet', 'list', 'GET')]
+        assert stats['requests'] == 1
+        assert stats['queries'] > 0
+        assert stats['response_bytes'] == len(response.content)
+        assert stats['render_time'] > 0
+
+    def test_server_timing_disabled(self, client, settings):
+        settings.SERVER_TIMING_ENABLED = False
+
+        response = client.get('/api/templates/')
+
+        assert 'Server-Timing' not in response
+        assert registry.snapshot()[('TemplateViewSet', 'list', 'GET')]['requests'] == 1
+
+    def test_unresolved_paths_are_grouped(self, client):
+        client.get('/api/no-such-endpoint/')
+
+        assert ('unmatched', '', 'GET') in registry.snapshot()
+
+    def test_disabled(self, client, settings):
+        settings.METRICS_ENABLED = False
+
+        response = client.get('/api/templates/')
+
+        assert 'Server-Timing' not in response
+        assert registry.snapshot() == {}
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_token(self, client, programme_template, settings):
+        settings.METRICS_TOKEN = 'scrape-secret'
+        client.get('/api/templates/')
+
+        response = APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        assert 'view="TemplateViewSet",action="list"' in response.content.decode()
+        assert APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer guess').status_code == 403
+
+    def test_allowed_ip_alone_is_not_enough(self, settings):
+        settings.METRICS_TOKEN = ''
+        settings.METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+        assert APIClient().get('/api/metrics/').status_code == 403
+
+    def test_allowed_ips_limit_token_holders(self, settings):
+        settings.METRICS_TOKEN = 'scrape-secret'
+        settings.METRICS_ALLOWED_IPS = ['10.0.0.5']
+
+        response = APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        assert response.status_code == 403
+        response = APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret',
+                                   REMOTE_ADDR='10.0.0.5')
+        assert response.status_code == 200
@@ -0,0 +1,89 @@
+# core/tests/test_queries.py
+import pytest
+from rest_framework.test import APIClient
+
+from core.models import DataSubmission, Department, Template
+from core.queries import QueryBudgetExceeded, QueryPatternDetector, budget_for, normalize_sql
+from core.views import DataSubmissionViewSet, SearchView
+
+
+@pytest.fixture
+def client(iqac_director):
+    client = APIClient()
+    client.force_authenticate(iqac_director)
+    return client
+
+
+@pytest.fixture
+def submissions(criteria, academic_year, iqac_director, programme_template):
+    created = []
+    for n in range(6):
+        department = Department.objects.create(name=f'Department {n}', code=f'D{n}')
+        template = Template.objects.create(code=f'9.{n}', name=f'Template {n}', criteria=criteria,
+                                           metadata=programme_template.metadata)
+        created.append(DataSubmission.objects.create(
+            template=template, department=department, academic_year=academic_year,
+            submitted_by=iqac_director, verified_by=iqac_director, status='approved'
+        ))
+    return created
+
+
+class TestNormalize:
+    def test_literals_and_in_lists_fold(self):
+        first = normalize_sql("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a' LIMIT 21")
+        second = normalize_sql("SELECT *  FROM t WHERE id IN (%s) AND name = 'it''s'\nLIMIT 5")
+
+        assert first == second == 'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?'
+
+    def test_budget_lookup(self):
+        assert budget_for(DataSubmissionViewSet, 'list') == 5
+        assert budget_for(DataSubmissionViewSet, 'department_breakdown') == 6
+        assert budget_for(SearchView, 'get') == 4
+        assert budget_for(DataSubmissionViewSet, 'stats') is None
+
+
+@pytest.mark.django_db
+class TestDetector:
+    def test_flags_repeated_pattern(self, department):
+        with QueryPatternDetector(threshold=3) as detector:
+            for _ in range(4):
+                Department.objects.filter(code=department.code).first()
+
+        (pattern, count, location), = detector.repeated()
+        assert count == 4
+        assert 'core_department' in pattern
+        with pytest.raises(AssertionError):
+            detector.assert_no_repeats()
+
+    def test_over_budget_request_fails(self, client, submissions, monkeypatch):
+        monkeypatch.setattr(DataSubmissionViewSet, 'query_budgets', {'list': 1})
+
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/api/submissions/')
+
+    def test_lenient_outside_tests(self, client, submissions, monkeypatch, settings):
+        settings.QUERY_BUDGET_STRICT = False
+        monkeypatch.setattr(DataSubmissionViewSet, 'query_budgets', {'list': 1})
+
+        response = client.get('/api/submissions/')
+
+        assert response.status_code == 200
+        assert int(response['X-Query-Count']) > 1
+
+
+@pytest.mark.django_db
+class TestViewQueryPatterns:
+    def test_submission_list_has_no_per_row_queries(self, client, submissions, query_detector):
+        response = client.get('/api/submissions/')
+
+        assert response.status_code == 200
+        query_detector.assert_no_repeats(threshold=3)
+
+    def test_department_breakdown_is_constant(self, client, submissions, query_detector):
+        response = client.get('/api/submissions/department-breakdown/')
+
+        assert response.status_code == 200
+        departments = response.data['data']['departments']
+        assert len(departments) == 6
+        assert departments[1]['completed_submissions'] == 1
+        query_detector.assert_no_repeats(threshold=3)
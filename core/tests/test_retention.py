@@ -0,0 +1,159 @@
+# core/tests/test_retention.py
+import gzip
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core import history, retention
+from core.models import AcademicYear, DataSubmission, SubmissionData, SubmissionHistory
+from core.tasks import history_retention_task
+
+
+@pytest.fixture(autouse=True)
+def inline_audit(settings):
+    settings.AUDIT_ASYNC = False
+
+
+@pytest.fixture
+def submission(programme_template, department, academic_year, faculty):
+    return DataSubmission.objects.create(
+        template=programme_template,
+        department=department,
+        academic_year=academic_year,
+        submitted_by=faculty
+    )
+
+
+def add_row(submission, user, code, number=1):
+    row = SubmissionData.objects.create(
+        submission=submission, section_index=0, row_number=number,
+        data={'programme_code': code, 'programme_name': 'B.Sc'}
+    )
+    history.record_row_added(submission, row, user)
+    return row
+
+
+def edit(submission, row, user, **data):
+    old_data = row.data
+    row.data = {**row.data, **data}
+    row.save()
+    history.record_row_updated(submission, row, old_data, user)
+
+
+def age(days, **filters):
+    SubmissionHistory.objects.filter(**filters).update(performed_at=timezone.now() - timedelta(days=days))
+
+
+def current(submission):
+    return history.state_rows(history.submission_state(submission))
+
+
+@pytest.mark.django_db
+class TestExpiry:
+    def test_expired_prefix_folds_into_snapshot(self, submission, faculty, settings):
+        settings.HISTORY_RETENTION_DAYS = {'row_added': 10, 'row_updated': 10, 'approved': None}
+        row = add_row(submission, faculty, 'BSC')
+        edit(submission, row, faculty, programme_name='Old edit')
+        SubmissionHistory.objects.create(submission=submission, action='approved', performed_by=faculty)
+        age(30)
+        edit(submission, row, faculty, programme_name='Recent edit')
+
+        removed = retention.expire_history(submission.id)
+
+        assert removed == 2
+        actions = list(SubmissionHistory.objects.order_by('id').values_list('action', flat=True))
+        assert actions == ['snapshot', 'approved', 'row_updated']
+        state, replayed = history.state_at(submission)
+        assert replayed == 1
+        assert history.state_rows(state) == current(submission)
+
+    def test_unlisted_actions_are_kept(self, submission, faculty, settings):
+        settings.HISTORY_RETENTION_DAYS = {}
+        add_row(submission, faculty, 'BSC')
+        age(3650)
+
+        assert retention.expire_history(submission.id) == 0
+        assert SubmissionHistory.objects.count() == 2
+
+    def test_task_expires_only_when_configured(self, submission, faculty, settings):
+        settings.HISTORY_RETENTION_DAYS = {}
+        add_row(submission, faculty, 'BSC')
+        age(3650)
+
+        assert history_retention_task()['expired'] == 0
+        assert SubmissionHistory.objects.count() == 2
+
+        settings.HISTORY_RETENTION_DAYS = {'row_added': 10}
+        assert history_retention_task()['expired'] == 1
+
+
+@pytest.mark.django_db
+class TestCompaction:
+    def test_quick_edits_by_one_user_are_merged(self, submission, faculty, iqac_director):
+        row = add_row(submission, faculty, 'BSC')
+        edit(submission, row, faculty, programme_name='B.Sc (H)')
+        edit(submission, row, faculty, programme_name='B.Sc Honours', programme_code='BSCH')
+        edit(submission, row, faculty, programme_code='BSC')
+        edit(submission, row, iqac_director, programme_name='Bachelor of Science')
+
+        removed = retention.compact_history(submission.id)
+
+        assert removed == 2
+        updates = list(SubmissionHistory.objects.filter(action='row_updated').order_by('id'))
+        assert updates[0].delta['set'] == {'programme_name': 'B.Sc Honours'}
+        assert updates[0].delta['old'] == {'programme_name': 'B.Sc'}
+        assert updates[0].details['compacted'] == 3
+        assert updates[1].performed_by == iqac_director
+        state, _ = history.state_at(submission)
+        assert history.state_rows(state) == current(submission)
+
+    def test_edits_outside_window_are_kept(self, submission, faculty):
+        row = add_row(submission, faculty, 'BSC')
+        edit(submission, row, faculty, programme_name='First')
+        age(1, action='row_updated')
+        edit(submission, row, faculty, programme_name='Second')
+
+        assert retention.compact_history(submission.id, window=timedelta(minutes=30)) == 0
+
+
+@pytest.mark.django_db
+class TestArchival:
+    @pytest.fixture
+    def closed_year(self, academic_year):
+        academic_year.is_current = False
+        academic_year.save()
+        AcademicYear.objects.create(name='2024-2025', start_date=date(2024, 6, 1),
+                                    end_date=date(2025, 5, 31), is_current=True)
+        return academic_year
+
+    def test_closed_year_is_archived_and_replaced_by_snapshot(self, submission, faculty, closed_year, tmp_path):
+        row = add_row(submission, faculty, 'BSC')
+        add_row(submission, faculty, 'MSC', number=2)
+        edit(submission, row, faculty, programme_name='Edited')
+
+        call_command('history_retention', steps='archive', archive_dir=str(tmp_path))
+
+        files = list((tmp_path / closed_year.name).glob('*.jsonl.gz'))
+        assert len(files) == 1
+        with gzip.open(files[0], 'rt') as archive:
+            records = [json.loads(line) for line in archive]
+        assert [record['action'] for record in records] == ['snapshot', 'row_added', 'row_added', 'row_updated']
+
+        entry = SubmissionHistory.objects.get()
+        assert entry.action == 'archived'
+        state, _ = history.state_at(submission)
+        assert history.state_rows(state) == current(submission)
+
+        # Nothing left to do on a second run
+        call_command('history_retention', steps='archive', archive_dir=str(tmp_path))
+        assert SubmissionHistory.objects.count() == 1
+        assert len(list((tmp_path / closed_year.name).glob('*.jsonl.gz'))) == 1
+
+    def test_open_year_is_refused(self, submission, faculty, academic_year, tmp_path):
+        from django.core.management.base import CommandError
+        with pytest.raises(CommandError):
+            call_command('history_retention', steps='archive', year=[academic_year.name],
+                         archive_dir=str(tmp_path))
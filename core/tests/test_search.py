@@ -0,0 +1,134 @@
+# core/tests/test_search.py
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from core.models import DataSubmission, Department, SearchDocument, SubmissionData
+from core.search import index_submissions, search_documents
+
+
+pytestmark = pytest.mark.usefixtures('index_on_save')
+
+
+@pytest.fixture
+def submission(programme_template, department, academic_year, faculty):
+    return DataSubmission.objects.create(
+        template=programme_template,
+        department=department,
+        academic_year=academic_year,
+        submitted_by=faculty
+    )
+
+
+@pytest.fixture
+def rows(submission):
+    return [
+        SubmissionData.objects.create(
+            submission=submission, section_index=0, row_number=1,
+            data={'programme_code': 'BSC-CS', 'programme_name': 'Bachelor of Science in Computing'}
+        ),
+        SubmissionData.objects.create(
+            submission=submission, section_index=0, row_number=2,
+            data={'programme_code': 'MBA', 'programme_name': 'Master of Business Administration'}
+        ),
+    ]
+
+
+@pytest.mark.django_db
+class TestSearchIndex:
+    def test_documents_maintained_on_save(self, submission, rows):
+        assert SearchDocument.objects.filter(kind='submission', submission=submission).count() == 1
+        assert SearchDocument.objects.filter(kind='row').count() == 2
+
+        rows[1].data = {'programme_code': 'MCA', 'programme_name': 'Master of Computer Applications'}
+        rows[1].save()
+
+        assert not search_documents('business').exists()
+        assert list(search_documents('applications').values_list('row_id', flat=True)) == [rows[1].id]
+
+    def test_deleting_row_drops_document(self, rows):
+        rows[0].delete()
+
+        assert not search_documents('computing').exists()
+
+    def test_prefix_and_all_terms_match(self, rows):
+        assert search_documents('bach comp').count() == 1
+        assert not search_documents('bachelor business').exists()
+
+    def test_ranking_prefers_title_matches(self, rows, programme_template):
+        # "programmes" is in every title; "science" only in one row body
+        ranked = list(search_documents('programmes'))
+        assert all(doc.rank is not None for doc in ranked)
+        assert ranked == sorted(ranked, key=lambda doc: -doc.rank)
+
+    def test_punctuation_is_not_query_syntax(self, rows):
+        assert search_documents('"BSC-CS" (').exists()
+        assert not search_documents('  ').exists()
+
+    def test_bulk_written_rows_are_indexed(self, submission):
+        SubmissionData.objects.bulk_create([
+            SubmissionData(submission=submission, section_index=0, row_number=n,
+                           data={'programme_name': f'Diploma {n}'})
+            for n in range(1, 4)
+        ])
+        assert not search_documents('diploma').exists()
+
+        index_submissions(DataSubmission.objects.filter(pk=submission.pk))
+
+        assert search_documents('diploma').count() == 3
+
+    def test_rebuild_command(self, rows):
+        SearchDocument.objects.all().delete()
+
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+
+        assert search_documents('computing').count() == 1
+
+
+@pytest.mark.django_db
+class TestSearchEndpoints:
+    def test_search_endpoint_is_ranked_and_paginated(self, iqac_director, rows):
+        client = APIClient()
+        client.force_authenticate(iqac_director)
+
+        response = client.get('/api/search/', {'q': 'master', 'page_size': 1})
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['row_id'] == rows[1].id
+        assert response.data['results'][0]['template_code'] == '1.1'
+
+    def test_faculty_only_sees_own_department(self, programme_template, academic_year, rows,
+                                              iqac_director):
+        other = Department.objects.create(name="Mechanical", code="ME")
+        other_submission = DataSubmission.objects.create(
+            template=programme_template, department=other,
+            academic_year=academic_year, submitted_by=iqac_director
+        )
+        SubmissionData.objects.create(
+            submission=other_submission, section_index=0, row_number=1,
+            data={'programme_name': 'Master of Mechanical Engineering'}
+        )
+        faculty = rows[0].submission.submitted_by
+        client = APIClient()
+        client.force_authenticate(faculty)
+
+        response = client.get('/api/search/', {'q': 'master'})
+
+        assert response.data['count'] == 1
+
+    def test_submission_search_filter_uses_row_data(self, iqac_director, submission, rows):
+        client = APIClient()
+        client.force_authenticate(iqac_director)
+
+        response = client.get('/api/submissions/', {'search': 'computing'})
+
+        assert response.status_code == 200
+        ids = [item['id'] for item in (response.data['results'] if isinstance(response.data, dict) else response.data)]
+        assert ids == [submission.id]
+
+    def test_search_requires_query(self, iqac_director):
+        client = APIClient()
+        client.force_authenticate(iqac_director)
+
+        assert client.get('/api/search/').status_code == 400
@@ -0,0 +1,96 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from core.models import Board, DataSubmission, SearchDocument, SubmissionData, Template, User
+from core.utils.synthetic import SyntheticDataGenerator
+
+
+def generate(user, seed=3):
+    return SyntheticDataGenerator(seed=seed).generate(
+        departments=2, templates=8, rows_per_section=2, submitted_by=user
+    )
+
+
+def contents():
+    return (
+        list(DataSubmission.objects.order_by('template__code', 'department__code')
+             .values_list('template__code', 'department__code', 'status')),
+        list(SubmissionData.objects.order_by('submission__template__code', 'submission__department__code',
+                                             'section_index', 'row_number').values_list('data', flat=True)),
+    )
+
+
+@pytest.mark.django_db
+class TestSyntheticDataGenerator:
+    def test_scale(self, iqac_director):
+        dataset = generate(iqac_director)
+
+        assert len(dataset.departments) == 2
+        assert len(dataset.templates) == 8
+        assert dataset.submissions == 16
+        sections = sum(len(template.metadata) for template in dataset.templates)
+        assert dataset.rows == sections * 2 * 2
+        assert SubmissionData.objects.count() == dataset.rows
+
+    def test_same_seed_same_data(self, iqac_director):
+        generate(iqac_director)
+        first = contents()
+        DataSubmission.objects.all().delete()
+        generate(iqac_director)
+
+        assert contents() == first
+
+    def test_rerun_keeps_existing_data(self, iqac_director):
+        generate(iqac_director)
+        dataset = generate(iqac_director, seed=4)
+
+        assert dataset.submissions == 0
+        assert dataset.rows == 0
+
+    def test_templates_pass_validation(self, iqac_director):
+        dataset = generate(iqac_director)
+
+        for template in dataset.templates:
+            template.clean()
+
+    def test_rows_match_template_columns(self, iqac_director):
+        generator = SyntheticDataGenerator(seed=5)
+        dataset = generator.generate(departments=1, templates=3, rows_per_section=1, submitted_by=iqac_director)
+
+        for row in SubmissionData.objects.select_related('submission__template'):
+            columns = generator.section_columns(row.submission.template)[row.section_index]
+            assert set(row.data) == {column['name'] for column in columns}
+        assert dataset.rows
+
+
+@pytest.mark.django_db
+class TestGenerateLoadDataCommand:
+    def run(self, **options):
+        out = StringIO()
+        call_command('generate_load_data', departments=2, users_per_department=2, templates=4,
+                     rows_per_section=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_all_boards(self):
+        output = self.run(seed=1)
+
+        assert set(Board.objects.values_list('code', flat=True)) == {'naac', 'nba', 'nirf'}
+        assert Template.objects.count() == 12
+        assert DataSubmission.objects.count() == 24
+        assert User.objects.filter(role='faculty', department__isnull=False).count() == 4
+        assert SubmissionData.objects.count() > 0
+        assert 'Created 24 submissions' in output
+
+    def test_rerun_is_a_no_op(self):
+        self.run()
+        output = self.run()
+
+        assert DataSubmission.objects.count() == 24
+        assert 'Created 0 submissions and 0 rows' in output
+
+    def test_rebuild_indexes(self):
+        self.run(boards='naac', rebuild_indexes=True)
+
+        assert SearchDocument.objects.exists()
@@ -0,0 +1,207 @@
+import io
+
+import pytest
+from django.core.exceptions import ValidationError
+from openpyxl import Workbook
+from rest_framework.test import APIClient
+
+from core.layouts import compile_layout, sync_versions
+from core.models import DataSubmission, Department, SubmissionData, Template, TemplateVersion
+from core.utils.excel_export import ExcelExporter
+
+GROUPED = [{
+    'headers': ['3.1 Research projects'],
+    'title': 'Projects',
+    'required': True,
+    'columns': [
+        {'name': 'title', 'display_name': 'Title', 'type': 'single', 'data_type': 'string', 'required': True},
+        {'name': 'funding', 'display_name': 'Funding', 'type': 'group', 'columns': [
+            {'name': 'agency', 'display_name': 'Agency', 'type': 'single', 'data_type': 'string'},
+            {'name': 'amount', 'display_name': 'Amount', 'type': 'single', 'data_type': 'number',
+             'required': True, 'validation': {'min': 0}},
+        ]},
+        {'name': 'status', 'type': 'single', 'data_type': 'option', 'options': ['Active', 'Closed']},
+    ]
+}]
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestCompileLayout:
+    def test_flattens_groups_with_spans(self):
+        section = compile_layout(GROUPED)[0]
+
+        assert [column['name'] for column in section['columns']] == [
+            'title', 'funding_agency', 'funding_amount', 'status'
+        ]
+        assert section['groups'] == [{'name': 'funding', 'label': 'Funding', 'start': 1, 'span': 2}]
+        assert section['columns'][2]['display_name'] == 'Funding - Amount'
+        assert section['columns'][2]['group'] == 0 and section['columns'][0]['group'] is None
+        assert section['required_fields'] == ['title', 'funding_amount']
+        assert section['width'] == 4
+        assert section['required'] is True and section['title'] == 'Projects'
+
+    def test_validators_are_kept(self):
+        columns = compile_layout(GROUPED)[0]['columns']
+
+        assert columns[2]['validation'] == {'min': 0}
+        assert columns[3]['options'] == ['Active', 'Closed']
+        assert columns[3]['label'] == 'status'
+
+    def test_legacy_dict_metadata(self):
+        assert len(compile_layout(GROUPED[0])) == 1
+        assert compile_layout(None) == []
+
+
+@pytest.mark.django_db
+class TestTemplateVersions:
+    def test_save_creates_a_version_only_when_metadata_changes(self, programme_template):
+        first = programme_template.current_version
+        assert first.number == 1
+        assert first.layout[0]['required_fields'] == ['programme_code', 'programme_name']
+
+        programme_template.name = 'Renamed'
+        programme_template.save()
+        assert programme_template.current_version == first
+
+        programme_template.metadata[0]['columns'].append(
+            {'name': 'year', 'type': 'single', 'data_type': 'number'}
+        )
+        programme_template.save()
+
+        assert programme_template.current_version.number == 2
+        assert TemplateVersion.objects.filter(template=programme_template).count() == 2
+        # The earlier snapshot isn't affected by editing the metadata in place
+        first.refresh_from_db()
+        assert len(first.metadata[0]['columns']) == 2
+
+    def test_versions_are_immutable(self, programme_template):
+        version = programme_template.current_version
+        version.metadata = []
+
+        with pytest.raises(ValidationError):
+            version.save()
+
+    def test_bulk_created_templates(self, criteria):
+        templates = Template.objects.bulk_create([
+            Template(criteria=criteria, code=f'1.{number}', name='Bulk', metadata=GROUPED)
+            for number in range(3)
+        ])
+
+        assert sync_versions(templates) == 3
+        assert sync_versions(list(Template.objects.filter(code__startswith='1.'))) == 0
+        assert all(template.current_version_id for template in Template.objects.all())
+
+    def test_submission_pins_version(self, programme_template, department, academic_year, faculty):
+        submission = DataSubmission.objects.create(
+            template=programme_template, department=department,
+            academic_year=academic_year, submitted_by=faculty
+        )
+        pinned = programme_template.current_version
+
+        programme_template.metadata[0]['columns'].append(
+            {'name': 'year', 'type': 'single', 'data_type': 'number', 'required': True}
+        )
+        programme_template.save()
+        submission.refresh_from_db()
+
+        assert submission.template_version == pinned
+        assert submission.layout[0]['required_fields'] == ['programme_code', 'programme_name']
+        # Rows entered against the old structure still validate
+        row = SubmissionData(submission=submission, section_index=0, row_number=1,
+                             data={'programme_code': 'BSC', 'programme_name': 'Physics'})
+        row.clean()
+
+
+@pytest.mark.django_db
+class TestVersionedViews:
+    def params(self, template, academic_year):
+        return f'?board={template.board_id}&academic_year={academic_year.id}'
+
+    def test_row_validation_uses_pinned_version(self, programme_template, academic_year, faculty):
+        client = client_for(faculty)
+        url = f'/api/templates/1.1/sections/0/data/{self.params(programme_template, academic_year)}'
+        assert client.post(url, {'programme_code': 'BSC', 'programme_name': 'Physics'},
+                           format='json').status_code == 200
+
+        programme_template.metadata[0]['columns'].append(
+            {'name': 'year', 'type': 'single', 'data_type': 'number', 'required': True}
+        )
+        programme_template.save()
+
+        response = client.post(url, {'programme_code': 'MSC', 'programme_name': 'Maths'}, format='json')
+        assert response.status_code == 200, response.data
+
+    def test_export_uses_pinned_headers(self, programme_template, department, academic_year, faculty):
+        submission = DataSubmission.objects.create(
+            template=programme_template, department=department,
+            academic_year=academic_year, submitted_by=faculty, status='approved'
+        )
+        SubmissionData.objects.create(submission=submission, section_index=0, row_number=1,
+                                      data={'programme_code': 'BSC', 'programme_name': 'Physics'})
+        programme_template.metadata[0]['columns'][0]['display_name'] = 'Code of the Programme'
+        programme_template.save()
+
+        workbook = ExcelExporter(programme_template, academic_year).export(
+            DataSubmission.objects.filter(id=submission.id)
+        )
+        values = [cell for row in workbook.active.iter_rows(values_only=True) for cell in row if cell]
+
+        assert 'Programme Code' in values and 'Code of the Programme' not in values
+        assert 'BSC' in values
+
+    def test_export_writes_each_version_with_its_layout(self, programme_template, department, academic_year,
+                                                         faculty):
+        old = DataSubmission.objects.create(
+            template=programme_template, department=department,
+            academic_year=academic_year, submitted_by=faculty, status='approved'
+        )
+        SubmissionData.objects.create(submission=old, section_index=0, row_number=1,
+                                      data={'programme_code': 'BSC', 'programme_name': 'Physics'})
+        programme_template.metadata[0]['columns'].append(
+            {'name': 'year', 'display_name': 'Year', 'type': 'single', 'data_type': 'number'}
+        )
+        programme_template.save()
+        new = DataSubmission.objects.create(
+            template=programme_template, department=Department.objects.create(name='Maths', code='MA'),
+            academic_year=academic_year, submitted_by=faculty, status='approved'
+        )
+        SubmissionData.objects.create(submission=new, section_index=0, row_number=1,
+                                      data={'programme_code': 'MSC', 'programme_name': 'Maths', 'year': 2})
+
+        workbook = ExcelExporter(programme_template, academic_year).export(
+            DataSubmission.objects.filter(id__in=[new.id, old.id])
+        )
+        rows = [[cell for cell in row if cell is not None] for row in workbook.active.iter_rows(values_only=True)]
+        rows = [row for row in rows if row]
+        first, second = rows.index(['Template version 1']), rows.index(['Template version 2'])
+
+        assert first < second
+        assert ['Programme Code', 'Programme Name'] in rows[first:second]
+        assert ['BSC', 'Physics'] in rows[first:second]
+        assert ['Programme Code', 'Programme Name', 'Year'] in rows[second:]
+        assert ['MSC', 'Maths', 2] in rows[second:]
+
+    def test_import_from_excel_records_version(self, board, criteria, academic_year, iqac_director):
+        workbook = Workbook()
+        workbook.active.append(['1.5 Programmes with value added courses'])
+        workbook.active.append(['Name of the Course', 'Date of Introduction', 'Link to the document'])
+        upload = io.BytesIO()
+        workbook.save(upload)
+        upload.seek(0)
+        upload.name = '1.5.xlsx'
+
+        response = client_for(iqac_director).post(
+            f'/api/templates/import-excel/?board={board.id}&academic_year={academic_year.id}',
+            {'file': upload}, format='multipart'
+        )
+
+        assert response.status_code == 200, response.data
+        assert response.data['version'] == 1
+        template = Template.objects.get(code='1.5')
+        assert template.criteria == criteria
+        assert [column['data_type'] for column in template.layout[0]['columns']] == ['string', 'date', 'url']
@@ -0,0 +1,300 @@
+# core/tests/test_transition.py
+from datetime import date, datetime, timezone as dt_timezone
+
+import pytest
+from django.core.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import (
+    AcademicYear, AcademicYearTransition, DataSubmission, Department, SubmissionData, Template
+)
+from core.services import AcademicYearTransitionService
+from core.tasks import process_academic_year_transition, process_transition_template
+
+
+@pytest.fixture
+def next_year():
+    return AcademicYear.objects.create(
+        name="2024-2025",
+        start_date=date(2024, 6, 1),
+        end_date=date(2025, 5, 31)
+    )
+
+
+@pytest.fixture
+def carry_forward_template(programme_template):
+    programme_template.metadata[0]['carry_forward'] = True
+    programme_template.save()
+    return programme_template
+
+
+@pytest.fixture
+def approved_submissions(carry_forward_template, department, academic_year, faculty):
+    departments = [department] + [
+        Department.objects.create(name=f"Department {i}", code=f"D{i}") for i in range(3)
+    ]
+    for dept in departments:
+        submission = DataSubmission.objects.create(
+            template=carry_forward_template,
+            department=dept,
+            academic_year=academic_year,
+            submitted_by=faculty,
+            status='approved'
+        )
+        SubmissionData.objects.bulk_create([
+            SubmissionData(
+                submission=submission,
+                section_index=0,
+                row_number=row,
+                data={'programme_code': f'{dept.code}-{row}', 'programme_name': 'B.Sc'}
+            )
+            for row in range(1, 6)
+        ])
+    return departments
+
+
+@pytest.mark.django_db
+class TestBulkTransition:
+    def service(self, academic_year, next_year, faculty, **kwargs):
+        return AcademicYearTransitionService(academic_year, next_year, faculty, **kwargs)
+
+    def test_process_template_creates_submissions_and_copies_rows(
+            self, carry_forward_template, approved_submissions, academic_year, next_year, faculty):
+        service = self.service(academic_year, next_year, faculty, batch_size=2)
+
+        created, copied = service.process_template(carry_forward_template)
+
+        assert created == 4
+        assert copied == 20
+        new_submissions = DataSubmission.objects.filter(academic_year=next_year)
+        assert new_submissions.filter(status='draft', board=carry_forward_template.board).count() == 4
+        assert SubmissionData.objects.filter(submission__academic_year=next_year).count() == 20
+
+    def test_process_template_is_idempotent(
+            self, carry_forward_template, approved_submissions, academic_year, next_year, faculty):
+        service = self.service(academic_year, next_year, faculty)
+        service.process_template(carry_forward_template)
+
+        assert service.process_template(carry_forward_template) == (0, 0)
+        assert SubmissionData.objects.filter(submission__academic_year=next_year).count() == 20
+
+    def test_only_approved_submissions_roll_over(
+            self, carry_forward_template, approved_submissions, academic_year, next_year, faculty):
+        DataSubmission.objects.filter(department=approved_submissions[0]).update(status='draft')
+
+        created, copied = self.service(academic_year, next_year, faculty).process_template(carry_forward_template)
+
+        assert (created, copied) == (3, 15)
+
+    def test_rules_use_batched_copy(
+            self, carry_forward_template, approved_submissions, academic_year, next_year, faculty,
+            monkeypatch):
+        carry_forward_template.metadata[0]['carry_forward_rules'] = {
+            'exclude': [{'column': 'programme_code', 'op': 'contains', 'value': '-5'}],
+            'set': {'programme_name': 'B.Sc (carried)'}
+        }
+        carry_forward_template.save()
+        service = self.service(academic_year, next_year, faculty, batch_size=3)
+        monkeypatch.setattr(service, '_copy_rows_insert_select', lambda template: pytest.fail('set-based copy used'))
+
+        created, copied = service.process_template(carry_forward_template)
+
+        assert (created, copied) == (4, 16)
+        carried = SubmissionData.objects.filter(submission__academic_year=next_year)
+        assert not carried.filter(data__programme_code='CS-5').exists()
+        assert set(carried.values_list('data__programme_name', flat=True)) == {'B.Sc (carried)'}
+
+    def test_flags_are_extracted_on_save(self, carry_forward_template, second_template):
+        assert carry_forward_template.carry_forward and not carry_forward_template.continuous
+        assert second_template.continuous and not second_template.carry_forward
+        assert list(
+            AcademicYearTransitionService(None, None, None).get_transition_templates()
+        ) == [carry_forward_template, second_template]
+
+
+@pytest.fixture
+def transition(academic_year, next_year, iqac_director):
+    return AcademicYearTransition.objects.create(
+        from_year=academic_year,
+        to_year=next_year,
+        status='in_progress',
+        processed_by=iqac_director
+    )
+
+
+@pytest.fixture
+def second_template(criteria):
+    return Template.objects.create(
+        code="1.2",
+        name="Courses",
+        criteria=criteria,
+        metadata=[{"headers": ["1.2"], "columns": [], "continuous": True}]
+    )
+
+
+@pytest.mark.django_db
+class TestTransitionCheckpoints:
+    def test_process_template_records_checkpoint(self, transition, carry_forward_template,
+                                                 approved_submissions):
+        service = AcademicYearTransitionService.for_transition(transition)
+
+        service.process_template(carry_forward_template)
+
+        transition.refresh_from_db()
+        assert transition.completed_templates == [carry_forward_template.id]
+        assert transition.templates_done == 1
+        assert transition.submissions_created == 4
+        assert transition.rows_copied == 20
+        assert transition.last_progress_at is not None
+
+    def test_failed_run_resumes_from_checkpoint(self, transition, carry_forward_template,
+                                                second_template, approved_submissions,
+                                                monkeypatch):
+        service = AcademicYearTransitionService.for_transition(transition)
+
+        def explode(template):
+            raise RuntimeError("worker lost")
+
+        original_create = service._create_submissions
+        monkeypatch.setattr(
+            service, '_create_submissions',
+            lambda template: explode(template) if template.id == second_template.id else original_create(template)
+        )
+
+        with pytest.raises(RuntimeError):
+            service.process_transition()
+
+        transition.refresh_from_db()
+        assert transition.status == 'failed'
+        assert transition.completed_templates == [carry_forward_template.id]
+        assert transition.templates_total == 2
+
+        # Resume: only the remaining template is processed, nothing is copied twice
+        monkeypatch.setattr(service, '_create_submissions', original_create)
+        service.resume_transition()
+        assert list(service.get_pending_templates()) == [second_template]
+        service.process_transition()
+
+        transition.refresh_from_db()
+        assert transition.status == 'completed'
+        assert transition.templates_done == 2
+        assert transition.progress_percent == 100.0
+        assert SubmissionData.objects.filter(submission__academic_year=transition.to_year).count() == 20
+
+    def test_completed_transition_cannot_resume(self, transition):
+        transition.status = 'completed'
+        transition.save()
+
+        with pytest.raises(ValidationError):
+            AcademicYearTransitionService.for_transition(transition).resume_transition()
+
+    def test_transition_status_reports_progress(self, iqac_director, transition,
+                                                carry_forward_template, approved_submissions):
+        AcademicYearTransitionService.for_transition(transition).process_template(carry_forward_template)
+        client = APIClient()
+        client.force_authenticate(iqac_director)
+
+        response = client.get(
+            f'/api/academic-year-transitions/{transition.to_year_id}/transition_status/'
+        )
+
+        assert response.status_code == 200
+        assert response.data['progress']['templates_done'] == 1
+        assert response.data['progress']['rows_copied'] == 20
+
+
+@pytest.fixture
+def eager_celery(monkeypatch, settings):
+    # Template subtasks run inline, as they would one by one on a worker
+    settings.TRANSITION_FAN_OUT = True
+    monkeypatch.setattr(process_transition_template, 'delay', process_transition_template)
+
+
+@pytest.mark.django_db
+class TestTransitionTasks:
+    def test_fan_out_completes_after_the_last_template(self, eager_celery, transition,
+                                                       carry_forward_template, second_template,
+                                                       approved_submissions):
+        process_academic_year_transition(transition.id)
+
+        transition.refresh_from_db()
+        assert transition.status == 'completed'
+        assert transition.templates_done == transition.templates_total == 2
+        assert transition.to_year.transition_status == 'completed'
+        assert SubmissionData.objects.filter(submission__academic_year=transition.to_year).count() == 20
+
+    def test_failed_dispatch_marks_the_transition_failed(self, eager_celery, transition,
+                                                         carry_forward_template, monkeypatch):
+        def unavailable(*args):
+            raise ConnectionError("broker unavailable")
+
+        monkeypatch.setattr(process_transition_template, 'delay', unavailable)
+
+        with pytest.raises(ConnectionError):
+            process_academic_year_transition(transition.id)
+
+        transition.refresh_from_db()
+        assert transition.status == 'failed'
+        assert 'broker unavailable' in transition.error_log
+
+    def test_failed_template_is_not_completed(self, eager_celery, transition, carry_forward_template,
+                                              second_template, approved_submissions, monkeypatch):
+        original = AcademicYearTransitionService.process_template
+
+        def explode(service, template):
+            if template.id == second_template.id:
+                raise RuntimeError("worker lost")
+            return original(service, template)
+
+        monkeypatch.setattr(AcademicYearTransitionService, 'process_template', explode)
+
+        with pytest.raises(RuntimeError):
+            process_academic_year_transition(transition.id)
+
+        transition.refresh_from_db()
+        assert transition.status == 'failed'
+        assert transition.completed_templates == [carry_forward_template.id]
+
+
+@pytest.mark.django_db
+class TestTransitionPlan:
+    def planner(self, academic_year, next_year, faculty):
+        return AcademicYearTransitionService(academic_year, next_year, faculty)
+
+    def test_plan_counts_per_department_without_writing(
+            self, carry_forward_template, approved_submissions, academic_year, next_year,
+            faculty):
+        service = self.planner(academic_year, next_year, faculty)
+        before = DataSubmission.objects.count(), SubmissionData.objects.count()
+
+        plan = service.plan()
+
+        assert (DataSubmission.objects.count(), SubmissionData.objects.count()) == before
+        assert plan['templates'] == {'total': 1, 'continuous': 0, 'carry_forward': 1}
+        assert plan['totals'] == {'submissions': 4, 'rows': 20}
+        assert len(plan['departments']) == 4
+        assert all(d['submissions'] == 1 and d['rows'] == 5 for d in plan['departments'])
+        assert plan['estimate']['rate_source'] == 'default'
+
+    def test_plan_skips_work_already_done(
+            self, carry_forward_template, approved_submissions, academic_year, next_year,
+            faculty):
+        service = self.planner(academic_year, next_year, faculty)
+        service.process_template(carry_forward_template)
+
+        assert service.plan()['totals'] == {'submissions': 0, 'rows': 0}
+
+    def test_plan_uses_measured_rate(self, transition, carry_forward_template, approved_submissions,
+                                     faculty):
+        AcademicYearTransition.objects.filter(pk=transition.pk).update(
+            status='completed',
+            rows_copied=1000,
+            started_at=datetime(2024, 6, 1, 0, 0, tzinfo=dt_timezone.utc),
+            last_progress_at=datetime(2024, 6, 1, 0, 0, 10, tzinfo=dt_timezone.utc),
+            completed_at=datetime(2024, 6, 1, 0, 0, 10, tzinfo=dt_timezone.utc)
+        )
+        service = self.planner(transition.from_year, transition.to_year, faculty)
+
+        estimate = service.plan()['estimate']
+
+        assert estimate == {'rows_per_second': 100.0, 'rate_source': 'measured', 'seconds': 0.2}
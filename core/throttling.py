@@ -0,0 +1,27 @@
+# core/throttling.py
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Limit login attempts per client IP"""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class LoginUsernameRateThrottle(SimpleRateThrottle):
+    """Limit login attempts per username, whichever IP they come from"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': str(username).strip().lower()
+        }
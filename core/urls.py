@@ -4,7 +4,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CriteriaViewSet, DepartmentViewSet, AcademicYearViewSet, NameAutocompleteView,
     TemplateViewSet, DataSubmissionViewSet,
-    ExportTemplateView, Board
+    ExportTemplateView, EntryWorkbookView, Board, AcademicYearTransitionViewSet, SearchView, MetricsView
 )
 
 from .views import AuthViewSet, UserViewSet, TemplateViewSet, DataSubmissionViewSet, BoardViewSet
@@ -18,6 +18,7 @@ router.register(r'departments', DepartmentViewSet)
 router.register(r'academic-years', AcademicYearViewSet, basename='academic-year')
 router.register(r'submissions', DataSubmissionViewSet, basename='submission')
 router.register(r'criteria/list', CriteriaViewSet, basename='criteria')
+router.register(r'academic-year-transitions', AcademicYearTransitionViewSet, basename='academic-year-transition')
 # router.register(r'auth', TemplateViewSet, basename='template')
 
 urlpatterns = [
@@ -43,9 +44,13 @@ urlpatterns = [
     ),
     path('templates/', TemplateViewSet.as_view({'get': 'list', 'post': 'create'}), name='template-list'),
     path('templates/export/', ExportTemplateView.as_view(), name='template-export'),
+    path('templates/entry-workbook/', EntryWorkbookView.as_view(), name='template-entry-workbook'),
     path('templates/import-excel/', TemplateViewSet.as_view({
             'post': 'import_from_excel'
         }), name='template-import-excel'),
+    path('templates/import-batch/', TemplateViewSet.as_view({
+            'post': 'import_batch'
+        }), name='template-import-batch'),
         path('templates/<str:code>/', TemplateViewSet.as_view({
             'get': 'retrieve',
             'put': 'update',
@@ -121,6 +126,8 @@ urlpatterns = [
     
 
     path('autocomplete/', NameAutocompleteView.as_view(), name='name-autocomplete'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
 logger.debug("Core URL patterns: %s", urlpatterns)
\ No newline at end of file
@@ -0,0 +1,148 @@
+# core/utils/carry_forward.py
+import pandas as pd
+
+
+class CarryForwardRules:
+    """
+    Declarative rules deciding which rows of a section are carried into the
+    next academic year, and how they change on the way.
+
+    A section's ``carry_forward_rules`` look like::
+
+        {
+            "include": [{"column": "status", "op": "eq", "value": "ongoing"}],
+            "exclude": [{"column": "end_date", "op": "not_empty"}],
+            "reset": ["amount_received"],
+            "set": {"remarks": "Carried forward"}
+        }
+
+    A row is kept when it matches every ``include`` condition and no
+    ``exclude`` condition. Kept rows have the ``reset`` columns blanked and
+    the ``set`` values written. Conditions are evaluated as column-wise
+    pandas masks over a whole batch of rows rather than row by row.
+    """
+
+    COMPARISONS = {'gt', 'gte', 'lt', 'lte'}
+    OPERATORS = {'eq', 'ne', 'in', 'not_in', 'contains', 'empty', 'not_empty'} | COMPARISONS
+
+    def __init__(self, include=None, exclude=None, reset=None, set=None):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.reset = list(reset or [])
+        self.set = dict(set or {})
+
+        for condition in self.include + self.exclude:
+            self._validate_condition(condition)
+
+    @classmethod
+    def from_section(cls, section):
+        """Rules declared on a template section, or None if it has none"""
+        rules = section.get('carry_forward_rules') if isinstance(section, dict) else None
+        if not rules:
+            return None
+        if not isinstance(rules, dict):
+            raise ValueError("carry_forward_rules must be an object")
+
+        unknown = set(rules) - {'include', 'exclude', 'reset', 'set'}
+        if unknown:
+            raise ValueError(f"Unknown carry_forward_rules keys: {sorted(unknown)}")
+        return cls(**rules)
+
+    def _validate_condition(self, condition):
+        if not isinstance(condition, dict) or 'column' not in condition:
+            raise ValueError(f"Invalid carry forward condition: {condition}")
+
+        op = condition.get('op', 'eq')
+        if op not in self.OPERATORS:
+            raise ValueError(f"Unknown carry forward operator: {op}")
+        if op in ('in', 'not_in') and not isinstance(condition.get('value'), list):
+            raise ValueError(f"Operator '{op}' needs a list value")
+        if op in self.COMPARISONS:
+            try:
+                float(condition.get('value'))
+            except (TypeError, ValueError):
+                raise ValueError(f"Operator '{op}' needs a numeric value") from None
+
+    def apply(self, rows):
+        """
+        Evaluate the rules over a list of row dicts.
+
+        Returns ``(positions, rows)``: the positions of kept rows in the input
+        and their transformed data, in input order.
+        """
+        if not rows:
+            return [], []
+
+        # Object columns keep each cell as entered: with numbers inferred, a
+        # column missing from some rows turns 2020 into 2020.0 in the others
+        frame = pd.DataFrame(rows, dtype=object)
+        mask = pd.Series(True, index=frame.index)
+        for condition in self.include:
+            mask &= self._mask(frame, condition)
+        for condition in self.exclude:
+            mask &= ~self._mask(frame, condition)
+
+        positions = frame.index[mask].tolist()
+        kept = []
+        for position in positions:
+            data = dict(rows[position])
+            for column in self.reset:
+                if column in data:
+                    data[column] = ''
+            data.update(self.set)
+            kept.append(data)
+        return positions, kept
+
+    def _mask(self, frame, condition):
+        column = condition['column']
+        op = condition.get('op', 'eq')
+        value = condition.get('value')
+
+        if column not in frame.columns:
+            # A missing column is empty in every row
+            series = pd.Series([None] * len(frame), index=frame.index, dtype=object)
+        else:
+            series = frame[column]
+
+        is_empty = series.isna() | (series.astype(str).str.strip() == '')
+
+        if op == 'empty':
+            return is_empty
+        if op == 'not_empty':
+            return ~is_empty
+        if op in self.COMPARISONS:
+            numbers = pd.to_numeric(series, errors='coerce')
+            target = float(value)
+            result = {
+                'gt': numbers > target,
+                'gte': numbers >= target,
+                'lt': numbers < target,
+                'lte': numbers <= target,
+            }[op]
+            # Non-numeric cells never satisfy a comparison
+            return result & numbers.notna()
+
+        text = series.astype(str).where(~series.isna(), '')
+        if op == 'eq':
+            return text == str(value)
+        if op == 'ne':
+            return text != str(value)
+        if op == 'in':
+            return text.isin([str(v) for v in value])
+        if op == 'not_in':
+            return ~text.isin([str(v) for v in value])
+        # contains
+        return text.str.contains(str(value), case=False, regex=False)
+
+
+def compile_section_rules(metadata):
+    """Map section index -> CarryForwardRules for sections that declare rules"""
+    if not isinstance(metadata, list):
+        return {}
+
+    compiled = {}
+    for index, section in enumerate(metadata):
+        rules = CarryForwardRules.from_section(section)
+        if rules is not None:
+            compiled[index] = rules
+    return compiled
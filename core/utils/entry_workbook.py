@@ -0,0 +1,180 @@
+# core/utils/entry_workbook.py
+"""
+Blank data-entry workbooks laid out like a template's export, for
+departments filling data in offline.
+
+Each template gets a sheet with its sections' headers (written by
+ExcelExporter's header logic) followed by empty rows carrying Excel data
+validation: dropdowns for option columns and number, date and text length
+constraints from the column's ``validation``. The workbook only depends on
+the template versions it was built from, which never change, so the file
+is cached under their ids and served from the cache afterwards.
+"""
+import hashlib
+import io
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter, quote_sheetname
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from .excel_export import ExcelExporter
+
+LISTS_SHEET = 'Lists'
+# Excel's limit for a list written inline in the validation formula
+INLINE_LIST_LIMIT = 255
+# Bounds for "any number", as Excel's decimal validation needs some
+NUMBER_LIMIT = '9.99E+307'
+
+
+def _excel_date(value):
+    """Excel formula for an ISO date, or None if ``value`` isn't one"""
+    try:
+        parsed = date.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return f'DATE({parsed.year},{parsed.month},{parsed.day})'
+
+
+def _range_validation(data_type, minimum, maximum, to_formula=str):
+    """DataValidation of ``data_type`` between optional bounds; unusable bounds are skipped"""
+    minimum = None if minimum is None else to_formula(minimum)
+    maximum = None if maximum is None else to_formula(maximum)
+    if minimum is not None and maximum is not None:
+        return DataValidation(type=data_type, operator='between', formula1=minimum, formula2=maximum)
+    if minimum is not None:
+        return DataValidation(type=data_type, operator='greaterThanOrEqual', formula1=minimum)
+    if maximum is not None:
+        return DataValidation(type=data_type, operator='lessThanOrEqual', formula1=maximum)
+    return None
+
+
+class EntryWorkbookWriter(ExcelExporter):
+    """Writes one template's blank entry sheet into a shared workbook"""
+
+    def __init__(self, template, workbook, lists, rows):
+        super().__init__(template, academic_year=None)
+        self.wb = workbook
+        self.lists = lists  # option tuple -> range on the hidden lists sheet
+        self.rows = rows
+        version = template.get_current_version()
+        self.layout = version.layout
+        self.version_number = version.number
+
+    def _write_title_info(self):
+        title_info = [
+            f"Template: {self.template.name}",
+            f"Code: {self.template.code}",
+            f"Version: {self.version_number}",
+        ]
+        for info in title_info:
+            cell = self.ws.cell(row=self.current_row, column=1, value=info)
+            self._apply_styles(cell, self.title_style)
+            self.current_row += 1
+        self.current_row += 1
+
+    def _options_formula(self, options):
+        inline = ','.join(str(option) for option in options)
+        if len(inline) + 2 <= INLINE_LIST_LIMIT and '"' not in inline \
+                and not any(',' in str(option) for option in options):
+            return f'"{inline}"'
+
+        # Long lists (or options with commas) go on a hidden sheet
+        key = tuple(options)
+        if key not in self.lists:
+            if LISTS_SHEET not in self.wb.sheetnames:
+                self.wb.create_sheet(LISTS_SHEET).sheet_state = 'hidden'
+            sheet = self.wb[LISTS_SHEET]
+            column = get_column_letter(len(self.lists) + 1)
+            for row, option in enumerate(options, start=1):
+                sheet[f'{column}{row}'] = option
+            self.lists[key] = f'{quote_sheetname(LISTS_SHEET)}!${column}$1:${column}${len(options)}'
+        return self.lists[key]
+
+    def _validation_for(self, column):
+        data_type = column['data_type']
+        validation = column.get('validation') or {}
+        label = column['display_name']
+
+        if data_type == 'option' and column.get('options'):
+            rule = DataValidation(type='list', formula1=self._options_formula(column['options']))
+            rule.error = f"{label} must be one of the listed values"
+        elif data_type == 'number':
+            rule = _range_validation('decimal', validation.get('min'), validation.get('max')) or DataValidation(
+                type='decimal', operator='between', formula1=f'-{NUMBER_LIMIT}', formula2=NUMBER_LIMIT
+            )
+            rule.error = f"{label} must be a number" + ''.join(
+                f", {word} {validation[key]}" for key, word in (('min', 'at least'), ('max', 'at most'))
+                if key in validation
+            )
+        elif data_type == 'date':
+            rule = _range_validation('date', validation.get('min'), validation.get('max'), _excel_date) \
+                or DataValidation(type='date', operator='greaterThanOrEqual', formula1='DATE(1900,1,1)')
+            rule.error = f"{label} must be a date"
+        elif data_type == 'string':
+            rule = _range_validation('textLength', validation.get('min_length'), validation.get('max_length'))
+            if rule is None:
+                return None
+            rule.error = f"{label} has the wrong length"
+        else:
+            return None
+
+        rule.allow_blank = not column.get('required', False)
+        rule.showErrorMessage = True
+        rule.errorTitle = 'Invalid value'
+        return rule
+
+    def _write_blank_section(self, section):
+        self._write_section_headers(section)
+        first_row, last_row = self.current_row, self.current_row + self.rows - 1
+        for current_col, column in enumerate(section['columns'], start=1):
+            rule = self._validation_for(column)
+            if rule is None:
+                continue
+            letter = get_column_letter(current_col)
+            rule.add(f'{letter}{first_row}:{letter}{last_row}')
+            self.ws.add_data_validation(rule)
+        self.current_row = last_row + 2
+
+    def write(self, ws):
+        self.ws = ws
+        self.current_row = 1
+        self._write_title_info()
+        for section in self.layout:
+            self._write_blank_section(section)
+
+
+def cache_key(templates, rows):
+    versions = '-'.join(str(template.current_version_id) for template in templates)
+    return f'entry_workbook:{rows}:{hashlib.md5(versions.encode()).hexdigest()}'
+
+
+def build_entry_workbook(templates, rows=None):
+    """Bytes of a blank entry workbook with one sheet per template, in order"""
+    rows = rows or settings.ENTRY_WORKBOOK_ROWS
+    templates = list(templates)
+    # Templates written in bulk get their version here, so the key names it
+    for template in templates:
+        template.get_current_version()
+    key = cache_key(templates, rows)
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    lists = {}
+    for template in templates:
+        ws = workbook.create_sheet(title=template.code[:31])
+        EntryWorkbookWriter(template, workbook, lists, rows).write(ws)
+    if LISTS_SHEET in workbook.sheetnames:
+        # Keep the hidden sheet out of the way of the template sheets
+        workbook.move_sheet(LISTS_SHEET, offset=len(workbook.sheetnames))
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    content = buffer.getvalue()
+    cache.set(key, content, settings.ENTRY_WORKBOOK_CACHE_TIMEOUT)
+    return content
@@ -4,7 +4,9 @@ from openpyxl.styles import Alignment, PatternFill, Font, Border, Side
 from openpyxl.utils import get_column_letter
 from datetime import datetime
 
+from core.models import TemplateVersion
 from .excel_styles import ExcelStyles
+from .export_logger import logger
 
 class ExcelExporter:
     def __init__(self, template, academic_year):
@@ -13,6 +15,7 @@ class ExcelExporter:
         self.wb = Workbook()
         self.ws = self.wb.active
         self.current_row = 1
+        self.layout = []
         
         # Use ExcelStyles instead of defining styles directly
         self.header_style = ExcelStyles.get_header_style()
@@ -56,90 +59,75 @@ class ExcelExporter:
                     flat_columns.append(flattened_column)
         return flat_columns
 
+    def _version_groups(self, submissions):
+        """
+        (version, submissions) for each template version the submissions were
+        entered with, oldest first; unpinned ones count as the current version
+        """
+        current = self.template.get_current_version()
+        by_version = {}
+        for submission in submissions:
+            by_version.setdefault(submission.template_version_id or current.id, []).append(submission)
+        versions = TemplateVersion.objects.filter(id__in=by_version).only('id', 'number', 'layout').order_by('number')
+        return [(version, by_version[version.id]) for version in versions]
+
+    def _write_section_headers(self, section):
+        """
+        Write a section's title rows and column headers, leaving current_row
+        on the first data row. Returns the column names in sheet order.
+        """
+        if section['headers']:
+            total_columns = max(section['width'], 1)
+
+            for header in section['headers']:
+                merge_range = f'A{self.current_row}:{get_column_letter(total_columns)}{self.current_row}'
+                self.ws.merge_cells(merge_range)
+                header_cell = self.ws.cell(row=self.current_row, column=1, value=header)
+                self._apply_styles(header_cell, self.header_style)
+                self.current_row += 1
+
+        # Write column headers: grouped columns get their label in the
+        # subheader row, under a merged group header
+        group_header_row = self.current_row
+        column_mapping = []  # Store column name mapping for data rows
+
+        for current_col, column in enumerate(section['columns'], start=1):
+            column_mapping.append(column['name'])
+            if column['group'] is None:
+                cell = self.ws.cell(row=group_header_row, column=current_col, value=column['label'])
+                self._apply_styles(cell, self.header_style)
+            else:
+                cell = self.ws.cell(row=group_header_row + 1, column=current_col, value=column['label'])
+                self._apply_styles(cell, self.subheader_style)
+
+            # Set column width
+            self.ws.column_dimensions[get_column_letter(current_col)].width = max(
+                len(str(column['label'])) + 2,
+                15
+            )
+
+        for group in section['groups']:
+            first_col = group['start'] + 1
+            if group['span'] > 1:
+                last_col = first_col + group['span'] - 1
+                self.ws.merge_cells(
+                    f'{get_column_letter(first_col)}{group_header_row}:'
+                    f'{get_column_letter(last_col)}{group_header_row}'
+                )
+            cell = self.ws.cell(row=group_header_row, column=first_col, value=group['label'])
+            self._apply_styles(cell, self.header_style)
+
+        # Move to data rows
+        self.current_row = group_header_row + 2
+        return column_mapping
+
     def _write_section(self, section_index, submissions):
         try:
-            if not self.template.metadata or section_index >= len(self.template.metadata):
-                print(f"Invalid section index: {section_index}")
+            if section_index >= len(self.layout):
+                logger.warning("Invalid section index: %s", section_index)
                 return
 
-            section = self.template.metadata[section_index]
-            
-            # Write section headers if present
-            if 'headers' in section and section['headers']:
-                total_columns = sum(
-                    len(col['columns']) if col['type'] == 'group' else 1 
-                    for col in section['columns']
-                )
-                
-                for header in section['headers']:
-                    merge_range = f'A{self.current_row}:{get_column_letter(total_columns)}{self.current_row}'
-                    self.ws.merge_cells(merge_range)
-                    header_cell = self.ws.cell(row=self.current_row, column=1, value=header)
-                    self._apply_styles(header_cell, self.header_style)
-                    self.current_row += 1
-
-            # Write column group headers and subheaders
-            current_col = 1
-            column_mapping = []  # Store column name mapping for data rows
-
-            # First row: Group headers
-            group_header_row = self.current_row
-            for column in section['columns']:
-                if column['type'] == 'group':
-                    # Calculate span for group
-                    colspan = len(column['columns'])
-                    if colspan > 1:
-                        merge_range = f'{get_column_letter(current_col)}{group_header_row}:{get_column_letter(current_col + colspan - 1)}{group_header_row}'
-                        self.ws.merge_cells(merge_range)
-                    
-                    cell = self.ws.cell(
-                        row=group_header_row,
-                        column=current_col,
-                        value=column.get('display_name', column['name'])
-                    )
-                    self._apply_styles(cell, self.header_style)
-
-                    # Write subheaders in next row
-                    for idx, subcol in enumerate(column['columns']):
-                        subcol_name = f"{column['name']}_{subcol['name']}"
-                        column_mapping.append(subcol_name)
-                        
-                        cell = self.ws.cell(
-                            row=group_header_row + 1,
-                            column=current_col + idx,
-                            value=subcol.get('display_name', subcol['name'])
-                        )
-                        self._apply_styles(cell, self.subheader_style)
-                        
-                        # Set column width
-                        col_letter = get_column_letter(current_col + idx)
-                        self.ws.column_dimensions[col_letter].width = max(
-                            len(str(subcol.get('display_name', subcol['name']))) + 2,
-                            15
-                        )
-                    
-                    current_col += colspan
-                else:
-                    # Single column
-                    column_mapping.append(column['name'])
-                    cell = self.ws.cell(
-                        row=group_header_row,
-                        column=current_col,
-                        value=column.get('display_name', column['name'])
-                    )
-                    self._apply_styles(cell, self.header_style)
-                    
-                    # Set column width
-                    col_letter = get_column_letter(current_col)
-                    self.ws.column_dimensions[col_letter].width = max(
-                        len(str(column.get('display_name', column['name']))) + 2,
-                        15
-                    )
-                    
-                    current_col += 1
-
-            # Move to data rows
-            self.current_row = group_header_row + 2
+            column_mapping = self._write_section_headers(self.layout[section_index])
 
             # Write data rows
             for submission in submissions:
@@ -167,7 +155,7 @@ class ExcelExporter:
             self.current_row += 1
 
         except Exception as e:
-            print(f"Error in _write_section: {str(e)}")
+            logger.error("Error in _write_section: %s", e)
             raise
 
     def export_to_worksheet(self, ws, submissions):
@@ -182,12 +170,19 @@ class ExcelExporter:
             # Write title information
             self._write_title_info()
 
-            # Process each section
-            if self.template.metadata:
-                for section_index in range(len(self.template.metadata)):
-                    self._write_section(section_index, submissions)
-            else:
-                print(f"No metadata found for template {self.template.code}")
+            # Process each section, with the structure each submission was
+            # entered against: one block per version when they differ
+            groups = self._version_groups(submissions)
+            if not any(version.layout for version, _ in groups):
+                logger.warning("No metadata found for template %s", self.template.code)
+            for version, members in groups:
+                if len(groups) > 1:
+                    cell = self.ws.cell(row=self.current_row, column=1, value=f"Template version {version.number}")
+                    self._apply_styles(cell, self.title_style)
+                    self.current_row += 1
+                self.layout = version.layout
+                for section_index in range(len(self.layout)):
+                    self._write_section(section_index, members)
 
             # Auto-adjust row heights
             for row in self.ws.rows:
@@ -201,7 +196,7 @@ class ExcelExporter:
             return True
 
         except Exception as e:
-            print(f"Error in export_to_worksheet: {str(e)}")
+            logger.error("Error in export_to_worksheet: %s", e)
             raise
 
     def export(self, submissions):
@@ -0,0 +1,312 @@
+# core/utils/excel_import.py
+"""
+Template definitions parsed from Excel workbooks.
+
+Workbooks are opened read-only with cached values (read_only=True,
+data_only=True), so rows stream from the file as plain tuples instead of
+being loaded as cell objects, and each cell's text is classified once
+against precompiled patterns.
+
+Expected sheet layout:
+
+* a row starting with "<code> <title>" (e.g. "1.1.3 Details of courses")
+  starts a section;
+* a row with two or more filled cells lists columns, whose data types are
+  guessed from their names (date, email, link/url, amount, ...);
+* a column row without any such hints, directly followed by another column
+  row, names column groups: the columns below it are nested in the group
+  written above them (merged header cells span their columns).
+
+parse_batch parses many workbooks (a directory or a zip archive of them)
+in worker processes, since parsing is CPU bound and files are independent.
+"""
+import io
+import os
+import re
+import zipfile
+from bisect import bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import PurePosixPath
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+HEADER_RE = re.compile(r'^\d+\.\d+\.?\d*\s+[a-zA-Z]')
+CODE_RE = re.compile(r'^\d+(?:\.\d+)+$')
+DATA_INDICATOR_RE = re.compile(r'date|email|number|amount|\(yes/no\)|link|url')
+# First match wins, as in the order the types are checked
+DATA_TYPE_PATTERNS = (
+    (re.compile(r'date'), 'date'),
+    (re.compile(r'email'), 'email'),
+    (re.compile(r'link|url'), 'url'),
+    (re.compile(r'number|amount|count|total|percentage'), 'number'),
+    (re.compile(r'\(yes/no\)|choose|select'), 'option'),
+)
+OPTION_PATTERNS = (
+    (re.compile(r'\(yes/no\)'), ('Yes', 'No')),
+    (re.compile(r'priority'), ('High', 'Medium', 'Low')),
+    (re.compile(r'status'), ('Active', 'Inactive', 'Pending')),
+)
+_NAME_STRIP_RE = re.compile(r'[^\w\s-]')
+_NAME_SEPARATOR_RE = re.compile(r'[-\s]+')
+
+CellInfo = namedtuple('CellInfo', 'text data_type options has_indicator')
+
+
+class WorkbookFormatError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=4096)
+def classify(text):
+    """Data type, options and group-row hint of a column title; cached as titles repeat"""
+    lowered = text.lower()
+    data_type = next((name for pattern, name in DATA_TYPE_PATTERNS if pattern.search(lowered)), 'string')
+    options = ()
+    if data_type == 'option':
+        options = next((values for pattern, values in OPTION_PATTERNS if pattern.search(lowered)), ())
+    return CellInfo(text, data_type, options, bool(DATA_INDICATOR_RE.search(lowered)))
+
+
+def sanitize_column_name(name):
+    """Convert column name to a valid field name"""
+    return _NAME_SEPARATOR_RE.sub('_', _NAME_STRIP_RE.sub('', name.lower()))
+
+
+def _column(info, grouped=False):
+    column = {'name': info.text, 'type': 'single', 'data_type': info.data_type, 'required': True}
+    if grouped:
+        column.update(
+            name=sanitize_column_name(info.text),
+            display_name=info.text,
+            description=f'Enter {info.text.lower()}'
+        )
+    if info.data_type == 'option':
+        column['options'] = list(info.options)
+    return column
+
+
+class SheetParser:
+    """Builds template sections from the rows of one sheet, fed in order"""
+
+    def __init__(self):
+        self.sections = []
+        self.section = None
+        # Group titles by starting column index, from the last group row
+        self.group_starts = []
+        self.group_titles = []
+        self.pending = None  # (row number, cells) of a possible group row
+
+    def feed(self, row_number, values):
+        if not values or not values[0]:
+            return
+        first = values[0]
+        if isinstance(first, str) and HEADER_RE.match(first):
+            self._resolve_pending(is_group_row=False)
+            self.section = {'headers': [first.strip()], 'columns': []}
+            self.sections.append(self.section)
+            self.group_starts, self.group_titles = [], []
+            return
+
+        cells = [(index, classify(str(value).strip())) for index, value in enumerate(values) if value]
+        if len(cells) < 2:
+            return
+        # A column row right after a possible group row confirms it
+        self._resolve_pending(is_group_row=True)
+        if any(info.has_indicator for _, info in cells):
+            self._add_columns(row_number, cells)
+        else:
+            self.pending = (row_number, cells)
+
+    def finish(self):
+        self._resolve_pending(is_group_row=False)
+        return self.sections
+
+    def _resolve_pending(self, is_group_row):
+        if self.pending is None:
+            return
+        row_number, cells = self.pending
+        self.pending = None
+        if is_group_row:
+            self.group_starts = [index for index, _ in cells]
+            self.group_titles = [info.text for _, info in cells]
+        else:
+            self._add_columns(row_number, cells)
+
+    def _group_at(self, index):
+        position = bisect_right(self.group_starts, index)
+        return self.group_titles[position - 1] if position else None
+
+    def _add_columns(self, row_number, cells):
+        if self.section is None:
+            raise WorkbookFormatError(f'Row {row_number} has columns before any section header')
+        columns = self.section['columns']
+        if not self.group_starts:
+            columns.extend(_column(info) for _, info in cells)
+            return
+
+        group_column = None
+        for index, info in cells:
+            group = self._group_at(index)
+            if group is None or group == info.text:
+                columns.append(_column(info, grouped=True))
+                group_column = None
+                continue
+            if group_column is None or group_column['display_name'] != group:
+                group_column = {
+                    'name': sanitize_column_name(group),
+                    'display_name': group,
+                    'type': 'group',
+                    'columns': []
+                }
+                columns.append(group_column)
+            group_column['columns'].append(_column(info, grouped=True))
+
+
+def parse_rows(rows):
+    """Sections from an iterable of row value tuples"""
+    parser = SheetParser()
+    for row_number, values in enumerate(rows, start=1):
+        parser.feed(row_number, values)
+    return parser.finish()
+
+
+@dataclass
+class ParsedSheet:
+    title: str
+    code: str
+    sections: list
+    error: str = None
+
+
+def sheet_code(title, sections):
+    """Template code of a sheet: its title if that is a code, else the first header's"""
+    if CODE_RE.match(title.strip()):
+        return title.strip()
+    if sections:
+        return sections[0]['headers'][0].split()[0].rstrip('.')
+    return None
+
+
+def parse_workbook(file, all_sheets=False):
+    """
+    ParsedSheet for the active sheet, or for every sheet with
+    ``all_sheets``. ``file`` is a path or a binary file object.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheets = workbook.worksheets if all_sheets else [workbook.active]
+        parsed = []
+        for worksheet in worksheets:
+            try:
+                sections = parse_rows(worksheet.iter_rows(values_only=True))
+            except WorkbookFormatError as e:
+                parsed.append(ParsedSheet(worksheet.title, None, [], str(e)))
+                continue
+            parsed.append(ParsedSheet(worksheet.title, sheet_code(worksheet.title, sections), sections))
+        return parsed
+    finally:
+        # Read-only workbooks keep the file open until closed
+        workbook.close()
+
+
+@dataclass
+class ParsedFile:
+    name: str
+    sheets: list = field(default_factory=list)
+    error: str = None
+
+
+def file_code(name):
+    """Template code taken from a workbook's file name (``1.1.xlsx`` -> ``1.1``)"""
+    return PurePosixPath(name).name.rsplit('.xlsx', 1)[0]
+
+
+def _is_workbook(name):
+    base = PurePosixPath(name).name
+    # Skips Excel lock files and macOS archive metadata
+    return name.lower().endswith('.xlsx') and not base.startswith(('~$', '.')) \
+        and not name.startswith('__MACOSX/')
+
+
+class ArchiveTooLargeError(ValueError):
+    pass
+
+
+def workbook_sources(source, max_files=None, max_file_size=None, max_total_size=None):
+    """
+    Yield (name, path or bytes) for every workbook in a directory or a zip
+    archive, sorted by name. ``source`` is a directory path, a zip path or
+    a zip file object.
+
+    Zip members are extracted one at a time as they are consumed. Before
+    the first one is, the archive's member count and uncompressed sizes
+    are checked against the given limits (ArchiveTooLargeError).
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        yield from sorted(
+            (os.path.relpath(os.path.join(root, name), source).replace(os.sep, '/'), os.path.join(root, name))
+            for root, _, names in os.walk(source)
+            for name in names if _is_workbook(name)
+        )
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        members = sorted(
+            (info for info in archive.infolist() if not info.is_dir() and _is_workbook(info.filename)),
+            key=lambda info: info.filename
+        )
+        # Sizes come from the archive's directory; reads stop at the declared size
+        if max_files is not None and len(members) > max_files:
+            raise ArchiveTooLargeError(f'Archive has {len(members)} workbooks, the limit is {max_files}')
+        for info in members:
+            if max_file_size is not None and info.file_size > max_file_size:
+                raise ArchiveTooLargeError(
+                    f'{info.filename} is {info.file_size} bytes uncompressed, the limit is {max_file_size}'
+                )
+        total = sum(info.file_size for info in members)
+        if max_total_size is not None and total > max_total_size:
+            raise ArchiveTooLargeError(
+                f'Archive is {total} bytes uncompressed, the limit is {max_total_size}'
+            )
+        for info in members:
+            yield info.filename, archive.read(info)
+
+
+def _parse_source(name, data, all_sheets):
+    try:
+        sheets = parse_workbook(io.BytesIO(data) if isinstance(data, bytes) else data, all_sheets=all_sheets)
+    # A zip that isn't an OOXML package raises KeyError for its missing parts,
+    # and malformed parts raise ValueError
+    except (InvalidFileException, zipfile.BadZipFile, OSError, KeyError, ValueError) as e:
+        return ParsedFile(name, error=f'Not a valid .xlsx workbook: {e}')
+    if not all_sheets:
+        sheets[0].code = file_code(name)
+    return ParsedFile(name, sheets)
+
+
+def parse_batch(sources, all_sheets=False, workers=None):
+    """
+    ParsedFile for each (name, path or bytes) in ``sources``, in order.
+    Without ``all_sheets`` a file is one template coded by its file name,
+    as with single uploads. Files are parsed in up to ``workers`` processes
+    (default: one per CPU); ``workers=1`` parses in this process.
+    ``sources`` is consumed as files are handed to the workers, so only a
+    few are held in memory at once.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return [_parse_source(name, data, all_sheets) for name, data in sources]
+
+    parsed, pending = [], deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for name, data in sources:
+            if len(pending) >= workers * 2:
+                parsed.append(pending.popleft().result())
+            pending.append(executor.submit(_parse_source, name, data, all_sheets))
+        parsed.extend(future.result() for future in pending)
+    return parsed
@@ -1,9 +1,64 @@
+# core/utils/export_logger.py
+"""
+Logging helpers: the JSON formatter and per-module levels used by the
+LOGGING setting, and the export log file.
+
+Log calls pass their arguments separately (``logger.debug("x: %s", x)``)
+so nothing is formatted for disabled levels. Values that cost a query to
+compute must also be guarded::
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Templates found: %s", queryset.count())
+"""
+import json
 import logging
+import logging.config
 import os
+from datetime import datetime, timezone
+
 from django.conf import settings
 
 logger = logging.getLogger('excel_exports')
 
+# LogRecord attributes that are not user supplied ``extra`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra`` fields are included as keys"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec):
+    """
+    Per-module levels from a spec like "core.views=DEBUG,core.search=WARNING",
+    as LOGGING 'loggers' entries
+    """
+    loggers = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        name, level = name.strip(), level.strip().upper()
+        if not name or not level:
+            continue
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Unknown log level {level!r} for {name}")
+        loggers[name] = {'level': level}
+    return loggers
+
+
 def setup_export_logging():
     # Create logs directory if it doesn't exist
     logs_dir = os.path.join(settings.BASE_DIR, 'logs')
@@ -20,10 +75,18 @@ def setup_export_logging():
     logger.addHandler(handler)
     logger.setLevel(logging.DEBUG)
 
-def log_export(message, level='info'):
+def log_export(message, *args, level='info'):
     if level == 'error':
-        logger.error(message)
+        logger.error(message, *args)
     elif level == 'warning':
-        logger.warning(message)
+        logger.warning(message, *args)
     else:
-        logger.info(message)
\ No newline at end of file
+        logger.info(message, *args)
+
+
+def configure_logging(logging_settings):
+    """LOGGING_CONFIG hook: LOGGING plus the per-module levels in LOG_LEVELS"""
+    logging_settings = {**logging_settings, 'loggers': dict(logging_settings.get('loggers', {}))}
+    for name, config in parse_levels(getattr(settings, 'LOG_LEVELS', '')).items():
+        logging_settings['loggers'][name] = {**logging_settings['loggers'].get(name, {}), **config}
+    logging.config.dictConfig(logging_settings)
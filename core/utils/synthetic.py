@@ -0,0 +1,332 @@
+# core/utils/synthetic.py
+"""
+Deterministic synthetic institution data for benchmarks and load testing.
+
+The same seed always produces the same departments, templates, submissions
+and rows. Everything is written with bulk_create in batches, so model
+signals don't run: rebuild the search index and autocomplete terms
+afterwards if they matter for what is being measured.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.layouts import sync_versions
+from core.models import (
+    AcademicYear, Board, Criteria, DataSubmission, Department, SubmissionData, Template, User
+)
+
+# Benchmark scales: departments x templates, rows written per section
+SCALES = {
+    'small': {'departments': 5, 'templates': 50, 'rows_per_section': 10},
+    'medium': {'departments': 40, 'templates': 300, 'rows_per_section': 10},
+    'large': {'departments': 100, 'templates': 1000, 'rows_per_section': 10},
+}
+
+STATUS_WEIGHTS = {'approved': 60, 'submitted': 20, 'draft': 10, 'rejected': 10}
+
+FIRST_NAMES = [
+    'Aarav', 'Ananya', 'Arjun', 'Divya', 'Farhan', 'Gayathri', 'Harish', 'Ishita', 'Karthik',
+    'Lakshmi', 'Meera', 'Nikhil', 'Pooja', 'Rahul', 'Sanjana', 'Suresh', 'Tanvi', 'Vikram',
+]
+LAST_NAMES = [
+    'Agarwal', 'Bhat', 'Chandran', 'Das', 'Iyer', 'Joshi', 'Kumar', 'Menon', 'Nair',
+    'Patel', 'Rao', 'Reddy', 'Sharma', 'Singh', 'Subramanian', 'Varma',
+]
+WORDS = [
+    'advanced', 'analysis', 'applied', 'computing', 'data', 'design', 'development', 'energy',
+    'environmental', 'introduction', 'learning', 'machine', 'management', 'materials', 'methods',
+    'networks', 'principles', 'research', 'systems', 'sustainable', 'theory', 'workshop',
+]
+
+# (name, display name, data type, extra column keys)
+COLUMN_POOL = [
+    ('name_of_the_faculty', 'Name of the Faculty', 'string', {}),
+    ('name_of_the_student', 'Name of the Student', 'string', {}),
+    ('title_of_the_project', 'Title of the Project', 'string', {}),
+    ('programme_code', 'Programme Code', 'string', {}),
+    ('programme_name', 'Programme Name', 'string', {}),
+    ('amount_sanctioned', 'Amount Sanctioned (INR Lakhs)', 'number', {}),
+    ('number_of_participants', 'Number of Participants', 'number', {}),
+    ('date_of_award', 'Date of Award', 'date', {}),
+    ('document_link', 'Link to the relevant document', 'url', {}),
+    ('contact_email', 'Contact Email', 'email', {}),
+    ('status', 'Status', 'option', {'options': ['Active', 'Inactive', 'Pending']}),
+    ('is_funded', 'Funded (Yes/No)', 'option', {'options': ['Yes', 'No']}),
+    ('description', 'Description', 'string', {}),
+]
+GROUP_POOL = [
+    ('duration', 'Duration', [('from', 'From', 'date'), ('to', 'To', 'date')]),
+    ('funding', 'Funding', [('agency', 'Agency', 'string'), ('amount', 'Amount', 'number')]),
+]
+
+
+@dataclass
+class SyntheticDataset:
+    board: Board
+    academic_year: AcademicYear
+    departments: list
+    templates: list
+    submissions: int = 0
+    rows: int = 0
+    extra: dict = field(default_factory=dict)
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed=0, batch_size=5000):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+
+    # Reference data
+
+    def board(self, code='naac', name='NAAC', criteria=7):
+        board, _ = Board.objects.get_or_create(code=code, defaults={'name': name})
+        existing = set(Criteria.objects.filter(board=board).values_list('number', flat=True))
+        Criteria.objects.bulk_create([
+            Criteria(board=board, number=number, name=f'{name} Criterion {number}', order=number)
+            for number in range(1, criteria + 1) if number not in existing
+        ])
+        return board, list(Criteria.objects.filter(board=board).order_by('number'))
+
+    def academic_year(self, name='2023-2024', start=date(2023, 6, 1), is_current=True):
+        academic_year, _ = AcademicYear.objects.get_or_create(
+            name=name,
+            defaults={
+                'start_date': start,
+                'end_date': start.replace(year=start.year + 1) - timedelta(days=1),
+                'is_current': is_current
+            }
+        )
+        return academic_year
+
+    def departments(self, count, prefix='D'):
+        codes = [f'{prefix}{number:03d}' for number in range(1, count + 1)]
+        existing = set(Department.objects.filter(code__in=codes).values_list('code', flat=True))
+        Department.objects.bulk_create([
+            Department(code=code, name=f'Department {code}') for code in codes if code not in existing
+        ], batch_size=self.batch_size)
+        return list(Department.objects.filter(code__in=codes).order_by('code'))
+
+    def users(self, departments, per_department, password='faculty123'):
+        """
+        ``per_department`` faculty users in each department, named
+        <code>_faculty_<n>; returns {department id: [users]}
+        """
+        # Hashing is deliberately slow, so every user shares one hash
+        password_hash = make_password(password)
+        specs = [
+            (department, f'{department.code.lower()}_faculty_{number}')
+            for department in departments
+            for number in range(1, per_department + 1)
+        ]
+        usernames = [username for _, username in specs]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        batch = []
+        for department, username in specs:
+            first_name, last_name = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            if username not in existing:
+                batch.append(User(
+                    username=username,
+                    email=f'{username}@example.edu',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password_hash,
+                    role='faculty',
+                    department=department
+                ))
+        User.objects.bulk_create(batch, batch_size=self.batch_size)
+
+        by_department = {department.id: [] for department in departments}
+        for user in User.objects.filter(username__in=usernames).order_by('username'):
+            by_department[user.department_id].append(user)
+        return by_department
+
+    # Templates
+
+    def _column(self, name, display_name, data_type, extra):
+        return {'name': name, 'display_name': display_name, 'type': 'single',
+                'data_type': data_type, 'required': True, **extra}
+
+    def template_metadata(self, code, title):
+        sections = []
+        for section_number in range(self.rng.choice([1, 1, 2])):
+            columns = [
+                self._column(*spec)
+                for spec in self.rng.sample(COLUMN_POOL, self.rng.randint(4, 7))
+            ]
+            if self.rng.random() < 0.3:
+                name, display_name, children = self.rng.choice(GROUP_POOL)
+                columns.append({
+                    'name': name, 'display_name': display_name, 'type': 'group',
+                    'columns': [self._column(*child, {}) for child in children]
+                })
+            sections.append({
+                'headers': [f'{code}{"." + str(section_number + 1) if section_number else ""} {title}'],
+                'columns': columns
+            })
+        return sections
+
+    def templates(self, criteria, count, carry_forward_share=0.2):
+        """
+        ``count`` templates spread over ``criteria``, coded <criterion>.<n>;
+        about ``carry_forward_share`` of them roll over to the next year
+        """
+        specs = []
+        for number in range(count):
+            criterion = criteria[number % len(criteria)]
+            code = f'{criterion.number}.{number // len(criteria) + 1}'
+            title = ' '.join(self.rng.sample(WORDS, 3)).capitalize()
+            metadata = self.template_metadata(code, title)
+            carry_forward = self.rng.random() < carry_forward_share
+            if carry_forward:
+                metadata[0]['continuous'] = metadata[0]['carry_forward'] = True
+            specs.append((criterion, code, title, metadata, carry_forward))
+
+        board_id = criteria[0].board_id
+        existing = set(Template.objects.filter(board_id=board_id).values_list('code', flat=True))
+        Template.objects.bulk_create([
+            # bulk_create skips Template.save(), so denormalized fields are set here
+            Template(criteria=criterion, board_id=board_id, code=code, name=title, metadata=metadata,
+                     continuous=carry_forward, carry_forward=carry_forward)
+            for criterion, code, title, metadata, carry_forward in specs if code not in existing
+        ], batch_size=self.batch_size)
+        codes = [spec[1] for spec in specs]
+        templates = list(Template.objects.filter(board_id=board_id, code__in=codes).order_by('id'))
+        sync_versions(templates)
+        return templates
+
+    # Values
+
+    def person_name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def value_for(self, column, academic_year):
+        """A value of the column's data type (flattened column definitions)"""
+        rng = self.rng
+        data_type = column.get('data_type', 'string')
+        name = column['name']
+        if data_type == 'number':
+            return rng.randint(1, 500)
+        if data_type == 'date':
+            offset = rng.randint(0, (academic_year.end_date - academic_year.start_date).days)
+            return (academic_year.start_date + timedelta(days=offset)).isoformat()
+        if data_type == 'url':
+            return f'https://example.edu/documents/{rng.randint(1, 10 ** 6)}.pdf'
+        if data_type == 'email':
+            return f'{rng.choice(FIRST_NAMES).lower()}.{rng.randint(1, 999)}@example.edu'
+        if data_type == 'option':
+            return rng.choice(column.get('options') or ['Yes', 'No'])
+        if 'description' in name:
+            return ' '.join(rng.choices(WORDS, k=12)).capitalize() + '.'
+        if 'name_of' in name or (name.endswith('_name') and 'programme' not in name):
+            return self.person_name()
+        if 'code' in name:
+            return f'{rng.choice("ABCDEFGHKMPRST")}{rng.choice("ABCDEFGHKMPRST")}{rng.randint(100, 999)}'
+        return ' '.join(rng.sample(WORDS, 3)).capitalize()
+
+    def row_data(self, columns, academic_year):
+        return {column['name']: self.value_for(column, academic_year) for column in columns}
+
+    def section_columns(self, template):
+        """Flattened columns of each section of ``template``"""
+        return [section['columns'] for section in template.layout]
+
+    # Submissions and rows
+
+    def submissions(self, templates, departments, academic_year, submitted_by, verified_by=None,
+                    status_weights=None):
+        """
+        One submission per template and department (existing ones are kept);
+        ``submitted_by`` is a user or a callable taking the department.
+        Returns how many were created.
+        """
+        existing = DataSubmission.objects.filter(academic_year=academic_year, template__in=templates)
+        before = existing.count()
+        weights = status_weights or STATUS_WEIGHTS
+        statuses, status_weights = list(weights), list(weights.values())
+        now = timezone.now()
+        batch = []
+        for template in templates:
+            for department in departments:
+                status = self.rng.choices(statuses, status_weights)[0]
+                submitted_at = now - timedelta(days=self.rng.randint(1, 120)) if status != 'draft' else None
+                verified = status in ('approved', 'rejected')
+                batch.append(DataSubmission(
+                    template=template,
+                    template_version_id=template.current_version_id,
+                    board_id=template.board_id,
+                    department=department,
+                    academic_year=academic_year,
+                    submitted_by=submitted_by(department) if callable(submitted_by) else submitted_by,
+                    status=status,
+                    submitted_at=submitted_at,
+                    verified_by=verified_by if verified else None,
+                    verified_at=submitted_at + timedelta(days=self.rng.randint(1, 14)) if verified else None,
+                    rejection_reason='Supporting documents missing' if status == 'rejected' else None,
+                ))
+                if len(batch) >= self.batch_size:
+                    DataSubmission.objects.bulk_create(batch, ignore_conflicts=True)
+                    batch = []
+        if batch:
+            DataSubmission.objects.bulk_create(batch, ignore_conflicts=True)
+        return existing.count() - before
+
+    def rows(self, submissions, rows_per_section):
+        """
+        ``rows_per_section`` rows in every section of every submission in the
+        queryset that has no rows yet; returns the number of rows written
+        """
+        pending = submissions.filter(
+            ~Exists(SubmissionData.objects.filter(submission=OuterRef('pk')))
+        ).select_related('template', 'academic_year').order_by('id')
+
+        columns_by_template = {}
+        written = 0
+        batch = []
+        for submission in pending.iterator(chunk_size=1000):
+            template = submission.template
+            sections = columns_by_template.get(template.id)
+            if sections is None:
+                sections = columns_by_template[template.id] = self.section_columns(template)
+            for section_index, columns in enumerate(sections):
+                for row_number in range(1, rows_per_section + 1):
+                    batch.append(SubmissionData(
+                        submission_id=submission.id,
+                        section_index=section_index,
+                        row_number=row_number,
+                        data=self.row_data(columns, submission.academic_year)
+                    ))
+            if len(batch) >= self.batch_size:
+                SubmissionData.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            SubmissionData.objects.bulk_create(batch)
+            written += len(batch)
+        return written
+
+    def generate(self, departments, templates, rows_per_section, submitted_by, verified_by=None,
+                 board_code='naac', academic_year=None):
+        """Board, departments, templates, submissions and rows at the given scale"""
+        board, criteria = self.board(code=board_code, name=board_code.upper())
+        academic_year = academic_year or self.academic_year()
+        department_list = self.departments(departments)
+        template_list = self.templates(criteria, templates)
+        created = self.submissions(template_list, department_list, academic_year, submitted_by, verified_by)
+        rows = self.rows(
+            DataSubmission.objects.filter(academic_year=academic_year, template__in=template_list),
+            rows_per_section
+        )
+        return SyntheticDataset(
+            board=board,
+            academic_year=academic_year,
+            departments=department_list,
+            templates=template_list,
+            submissions=created,
+            rows=rows
+        )
@@ -1,4 +1,3 @@
-from tokenize import TokenError
 from wsgiref.util import FileWrapper
 from django.conf import settings
 from rest_framework import viewsets, status, permissions
@@ -13,37 +12,47 @@ from django.http import HttpResponse, JsonResponse
 
 from .utils.excel_styles import ExcelStyles
 
-from .services import AcademicYearTransitionService
+from .services import AcademicYearTransitionService, TemplateImportService
 from .tasks import process_academic_year_transition
 
 from .filters import DataSubmissionFilter
+from .search import search_documents
+from .metrics import registry as metrics_registry
+from .queries import query_budget
+from . import autocomplete, history
 from .utils.excel_export import ExcelExporter
+from .utils.entry_workbook import build_entry_workbook
+from .utils.excel_import import ArchiveTooLargeError, parse_batch, parse_workbook, workbook_sources
+from collections import Counter
 from datetime import datetime
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import hmac
 import io
-import re
+import zipfile
 from rest_framework.views import APIView
+from rest_framework.pagination import PageNumberPagination
 import json
 from django.db import models
 
 from .models import (
     AcademicYearTransition, Criteria, SubmissionHistory, User, Department, AcademicYear, Template, 
-    DataSubmission, SubmissionData, Board
+    DataSubmission, SubmissionData, Board, SearchDocument
 )
 from .serializers import (
     CriteriaSerializer, UserSerializer, DepartmentSerializer, AcademicYearSerializer,
     TemplateSerializer, DataSubmissionSerializer, SubmissionDataSerializer, BoardSerializer
 )
 
-import openpyxl
 from openpyxl import load_workbook, Workbook
+from openpyxl.utils.exceptions import InvalidFileException
 from django.core.exceptions import ValidationError
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import authenticate
 from .serializers import (
     UserSerializer, LoginSerializer, DepartmentSerializer,
@@ -51,18 +60,25 @@ from .serializers import (
 )
 from .models import User, Department, Template, DataSubmission
 from .permissions import IsFaculty, IsIQACDirector, IsAdmin
+from .authentication import ClaimsRefreshToken
+from .throttling import LoginRateThrottle, LoginUsernameRateThrottle
 
 from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 
 import logging
-from deepdiff import DeepDiff
 
 logger = logging.getLogger(__name__)
 
 class AuthViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
 
+    def get_throttles(self):
+        # Reject login floods before authenticate() spends CPU on hashing
+        if self.action == 'login':
+            return [LoginRateThrottle(), LoginUsernameRateThrottle()]
+        return super().get_throttles()
+
     @action(detail=False, methods=['post'])
     def login(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -72,7 +88,7 @@ class AuthViewSet(viewsets.ViewSet):
             user = authenticate(username=username, password=password)
             
             if user:
-                refresh = RefreshToken.for_user(user)
+                refresh = ClaimsRefreshToken.for_user(user)
                 user_serializer = UserSerializer(user)
                 
                 return Response({
@@ -109,7 +125,7 @@ class AuthViewSet(viewsets.ViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
 
             return Response({
@@ -137,7 +153,7 @@ class AuthViewSet(viewsets.ViewSet):
                     'message': 'Refresh token is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            refresh = RefreshToken(refresh_token)
+            refresh = ClaimsRefreshToken(refresh_token)
             
             return Response({
                 'status': 'success',
@@ -186,7 +202,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.role == 'faculty':
-            return Department.objects.filter(id=self.request.user.department.id)
+            return Department.objects.filter(id=self.request.user.department_id)
         return Department.objects.all()
     
     def get_permissions(self):
@@ -234,6 +250,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
     serializer_class = TemplateSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field='code'
+    query_budgets = {'list': 2}
     
     def get_permissions(self):
         """
@@ -241,6 +258,8 @@ class TemplateViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['approve_submission', 'reject_submission']:
             permission_classes = [permissions.IsAuthenticated, IsIQACDirector]
+        elif self.action == 'import_batch':
+            permission_classes = [permissions.IsAuthenticated, IsIQACDirector | IsAdmin]
         else:
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -252,22 +271,17 @@ class TemplateViewSet(viewsets.ModelViewSet):
         board_code = self.request.query_params.get('board')  # We're receiving board code
         academic_year = self.request.query_params.get('academic_year')
         
-        board = Board.objects.filter(id=board_code).first()
-        ac = AcademicYear.objects.filter(id=academic_year).first()
-        print(f"Board: {board}")
-        print(f"Academic Year: {ac}")
-
-        # Add debug logging
-        # print(f"Filtering templates - Board Code: {board_code}, Academic Year: {academic_year}")
+        logger.debug("Filtering templates - board: %s, academic year: %s", board_code, academic_year)
 
         # Filter by board if provided
         if board_code:
             try:
-                # Filter by board code instead of id
-                queryset = queryset.filter(criteria__board__name=board.name)
-                print(f"Templates after board filter: {queryset.count()}")
+                # Board is denormalized onto the template, no criteria join needed
+                queryset = queryset.filter(board_id=board_code)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Templates after board filter: %s", queryset.count())
             except Exception as e:
-                print(f"Error filtering by board: {str(e)}")
+                logger.error("Error filtering by board: %s", e)
                 raise
 
         # Filter by academic year if needed
@@ -281,17 +295,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
         #         print(f"Error filtering by academic year: {str(e)}")
         #         raise
 
-        print(f"Final query: {queryset.query}")
-        return queryset.order_by('code')
+        logger.debug("Final query: %s", queryset.query)
+        return queryset.select_related('board').order_by('code')
 
     def list(self, request, *args, **kwargs):
         try:
             queryset = self.get_queryset()
-            print(f"Total templates found: {queryset.count()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Total templates found: %s", queryset.count())
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
         except Exception as e:
-            print(f"Error in list method: {str(e)}")
+            logger.exception("Error in template list: %s", e)
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -316,10 +331,6 @@ class TemplateViewSet(viewsets.ModelViewSet):
             lookup_value = self.kwargs.get(self.lookup_field)
             # print(f"Attempting to find template with code: {lookup_value}")
             
-            # Get all templates (for debugging)
-            all_templates = list(self.queryset.values_list('code', flat=True))
-            # print(f"Available template codes: {all_templates}")
-            
             # Try to get the object
             obj = self.queryset.get(code=lookup_value)
             # print(f"Found template: {obj.code}")
@@ -329,12 +340,11 @@ class TemplateViewSet(viewsets.ModelViewSet):
             return obj
             
         except Template.DoesNotExist:
-            print(f"Template not found with code: {lookup_value}")
+            logger.debug("Template not found with code: %s", lookup_value)
             raise NotFound(detail=f"Template with code '{lookup_value}' not found")
 
     def retrieve(self, request, *args, **kwargs):
         try:
-            print("Retrieve method called")
             # instance = self.get_object()
             # print(f"Retrieved template: {instance.code}")
 
@@ -348,8 +358,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             instance = queryset.get(code=lookup_value)
 
             serializer = self.get_serializer(instance)
-            # print length
-            print(f"Length of metadata: {len(serializer.data['metadata'])}")
+            logger.debug("Length of metadata: %s", len(serializer.data['metadata']))
             return Response(serializer.data)
         except NotFound as e:
             return Response(
@@ -364,8 +373,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             if not academic_year:
@@ -377,7 +385,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -421,8 +429,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             if not academic_year:
@@ -434,7 +441,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -478,8 +485,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             if not academic_year:
@@ -491,7 +497,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -527,7 +533,6 @@ class TemplateViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post', 'get'])
     def data(self, request, code=None):
-        print("Data action called")
         try:
             template = self.get_object()
             current_year = AcademicYear.objects.filter(is_current=True).first()
@@ -561,14 +566,10 @@ class TemplateViewSet(viewsets.ModelViewSet):
                         # Get the data from request
                         data = request.data
 
-                        # Get all required fields from template metadata
-                        required_fields = []
-                        for section in template.metadata:
-                            flat_columns = template._flatten_column_names(section['columns'])
-                            required_fields.extend([
-                                name for name, col in flat_columns.items()
-                                if col.get('required', False)
-                            ])
+                        # Get all required fields from the submission's template version
+                        required_fields = [
+                            name for section in submission.layout for name in section['required_fields']
+                        ]
 
                         # Validate required fields
                         missing_fields = [
@@ -594,6 +595,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
                             row_number=row_number,
                             data=data
                         )
+                        history.record_row_added(submission, submission_data, request.user)
 
                         return Response({
                             'status': 'success',
@@ -703,8 +705,12 @@ class TemplateViewSet(viewsets.ModelViewSet):
                         }, status=status.HTTP_400_BAD_REQUEST)
 
                     # Update the data
+                    previous_data = submission_data.data
                     submission_data.data = data
                     submission_data.save()
+                    history.record_row_updated(
+                        submission_data.submission, submission_data, previous_data, request.user
+                    )
 
                     return Response({
                         'status': 'success',
@@ -739,6 +745,11 @@ class TemplateViewSet(viewsets.ModelViewSet):
                         row.row_number -= 1
                         row.save()
 
+                    history.record_row_deleted(
+                        submission_data.submission, int(row_id), submission_data.section_index,
+                        deleted_row_number, submission_data.data, request.user, renumber='submission'
+                    )
+
                     return Response({
                         'status': 'success',
                         'message': 'Data row deleted successfully'
@@ -763,21 +774,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
-
-            print(f"Board: {board}")
-            print(f"Academic Year: {academic_year}")
+            logger.debug("Board: %s, academic year: %s", board_code, academic_year)
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
                 try:
-                    queryset = queryset.filter(criteria__board__name=board)
-                    print(f"Templates after board filter: {queryset.count()}")
+                    queryset = queryset.filter(board_id=board_code)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Templates after board filter: %s", queryset.count())
                 except Exception as e:
-                    print(f"Error filtering by board: {str(e)}")
+                    logger.error("Error filtering by board: %s", e)
                     raise
 
             try:
@@ -803,7 +811,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # Validate section index
-            if section_index >= len(template.metadata):
+            if section_index >= len(template.layout):
                 return Response({
                     'status': 'error',
                     'message': 'Invalid section index'
@@ -859,20 +867,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
                             }
                         )
 
-                        # Validate incoming data against template structure
-                        section = template.metadata[section_index]
+                        # Validate incoming data against the structure the
+                        # submission was started with
+                        layout = submission.layout
+                        if section_index >= len(layout):
+                            return Response({
+                                'status': 'error',
+                                'message': 'Invalid section index'
+                            }, status=status.HTTP_400_BAD_REQUEST)
                         data = request.data
-                        
+
                         # Validate required fields
-                        required_fields = []
-                        for column in section['columns']:
-                            if column.get('required', False):
-                                if column['type'] == 'single':
-                                    required_fields.append(column['name'])
-                                elif column['type'] == 'group':
-                                    for nested_col in column['columns']:
-                                        if nested_col.get('required', False):
-                                            required_fields.append(f"{column['name']}_{nested_col['name']}")
+                        required_fields = layout[section_index]['required_fields']
 
                         missing_fields = [
                             field for field in required_fields 
@@ -898,6 +904,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
                             row_number=row_number,
                             data=data
                         )
+                        history.record_row_added(submission, submission_data, request.user)
 
                         return Response({
                             'status': 'success',
@@ -938,21 +945,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
-
-            print(f"Board: {board}")
-            print(f"Academic Year: {academic_year}")
+            logger.debug("Board: %s, academic year: %s", board_code, academic_year)
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
                 try:
-                    queryset = queryset.filter(criteria__board__name=board)
-                    print(f"Templates after board filter: {queryset.count()}")
+                    queryset = queryset.filter(board_id=board_code)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Templates after board filter: %s", queryset.count())
                 except Exception as e:
-                    print(f"Error filtering by board: {str(e)}")
+                    logger.error("Error filtering by board: %s", e)
                     raise
 
             try:
@@ -994,19 +998,10 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 try:
                     with transaction.atomic():
                         # Validate incoming data
-                        section = template.metadata[section_index]
                         data = request.data.get('data', {})
-                        
+
                         # Validate required fields (same validation as POST)
-                        required_fields = []
-                        for column in section['columns']:
-                            if column.get('required', False):
-                                if column['type'] == 'single':
-                                    required_fields.append(column['name'])
-                                elif column['type'] == 'group':
-                                    for nested_col in column['columns']:
-                                        if nested_col.get('required', False):
-                                            required_fields.append(f"{column['name']}_{nested_col['name']}")
+                        required_fields = submission_data.submission.layout[section_index]['required_fields']
 
                         missing_fields = [
                             field for field in required_fields 
@@ -1020,8 +1015,12 @@ class TemplateViewSet(viewsets.ModelViewSet):
                             }, status=status.HTTP_400_BAD_REQUEST)
 
                         # Update the data
+                        previous_data = submission_data.data
                         submission_data.data = data
                         submission_data.save()
+                        history.record_row_updated(
+                            submission_data.submission, submission_data, previous_data, request.user
+                        )
 
                         return Response({
                             'status': 'success',
@@ -1057,6 +1056,11 @@ class TemplateViewSet(viewsets.ModelViewSet):
                             row.row_number -= 1
                             row.save()
 
+                        history.record_row_deleted(
+                            submission_data.submission, int(row_id), submission_data.section_index,
+                            deleted_row_number, submission_data.data, request.user
+                        )
+
                         return Response({
                             'status': 'success',
                             'message': 'Data row deleted successfully'
@@ -1082,21 +1086,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
-
-            print(f"Board: {board}")
-            print(f"Academic Year: {academic_year}")
+            logger.debug("Board: %s, academic year: %s", board_code, academic_year)
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
                 try:
-                    queryset = queryset.filter(criteria__board__name=board)
-                    print(f"Templates after board filter: {queryset.count()}")
+                    queryset = queryset.filter(board_id=board_code)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Templates after board filter: %s", queryset.count())
                 except Exception as e:
-                    print(f"Error filtering by board: {str(e)}")
+                    logger.error("Error filtering by board: %s", e)
                     raise
 
             try:
@@ -1157,21 +1158,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
-
-            print(f"Board: {board}")
-            print(f"Academic Year: {academic_year}")
+            logger.debug("Board: %s, academic year: %s", board_code, academic_year)
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
                 try:
-                    queryset = queryset.filter(criteria__board__name=board)
-                    print(f"Templates after board filter: {queryset.count()}")
+                    queryset = queryset.filter(board_id=board_code)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Templates after board filter: %s", queryset.count())
                 except Exception as e:
-                    print(f"Error filtering by board: {str(e)}")
+                    logger.error("Error filtering by board: %s", e)
                     raise
 
             try:
@@ -1202,16 +1200,18 @@ class TemplateViewSet(viewsets.ModelViewSet):
                     }, status=status.HTTP_400_BAD_REQUEST)
 
                 # Validate that all required sections have data
-                for section_index, section in enumerate(template.metadata):
+                for section_index, section in enumerate(submission.layout):
+                    if not section['required']:
+                        continue
                     data_rows = SubmissionData.objects.filter(
                         submission=submission,
                         section_index=section_index
                     ).count()
                     
-                    if section.get('required', False) and data_rows == 0:
+                    if data_rows == 0:
                         return Response({
                             'status': 'error',
-                            'message': f'Required section "{section.get("title", f"Section {section_index + 1}")}" has no data'
+                            'message': f'Required section "{section["title"] or f"Section {section_index + 1}"}" has no data'
                         }, status=status.HTTP_400_BAD_REQUEST)
 
                 submission.status = 'submitted'
@@ -1243,14 +1243,13 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -1307,14 +1306,13 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -1380,14 +1378,13 @@ class TemplateViewSet(viewsets.ModelViewSet):
             board_code = request.query_params.get('board')
             academic_year_id = request.query_params.get('academic_year')
 
-            # Get board and academic year instances
-            board = Board.objects.filter(id=board_code).first()
+            # Get academic year instance
             academic_year = AcademicYear.objects.filter(id=academic_year_id).first()
 
             # Get template and filter by board criteria
             queryset = Template.objects.all()
             if board_code:
-                queryset = queryset.filter(criteria__board__name=board)
+                queryset = queryset.filter(board_id=board_code)
 
             template = queryset.get(code=code)
 
@@ -1479,124 +1476,53 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             file = request.FILES['file']
-            template_code = file.name.split('.xlsx')[0]
-
-            # Check if template exists for this board and has submissions
+            # ?sheets=all imports every sheet as its own template
+            all_sheets = request.query_params.get('sheets') == 'all'
             try:
-                existing_template = Template.objects.get(
-                    code=template_code,
-                    criteria__board=board
-                )
-                
-                has_submissions = DataSubmission.objects.filter(
-                    template=existing_template,
-                    academic_year=academic_year
-                ).exists()
-
-                if has_submissions:
-                    return Response({
-                        'status': 'error',
-                        'message': 'Cannot update template with existing submissions'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            except Template.DoesNotExist:
-                pass
-
-            with transaction.atomic():
-                wb = openpyxl.load_workbook(file)
-                ws = wb.active
-
-                # Process Excel structure
-                sections = []
-                current_section = None
-                current_headers = []
-                current_group = None
-                column_groups = []
-                
-                for row_index, row in enumerate(ws.rows, start=1):
-                    first_cell = row[0].value
-                    if not first_cell:
-                        continue
-
-                    # Check if this is a header row
-                    if re.match(r'^\d+\.\d+\.?\d*\s+[a-zA-Z]', str(first_cell)):
-                        if current_section:
-                            sections.append(current_section)
-                        
-                        current_headers = [first_cell.strip()]
-                        current_section = {
-                            'headers': current_headers,
-                            'columns': []
-                        }
-                    
-                    # Check if this is a column group row
-                    elif first_cell and any(cell.value for cell in row[1:]):
-                        # Check if this row contains group headers
-                        if self._is_group_row(row):
-                            column_groups = self._process_column_groups(row)
-                        else:
-                            columns = self._process_column_row(row)
-                            if column_groups:
-                                columns = self._create_columns_with_groups(row, column_groups)
-                            
-                            if self._is_group_header(columns):
-                                current_group = self._create_group_column(columns)
-                                current_section['columns'].append(current_group)
-                            else:
-                                if current_group:
-                                    current_group['columns'].extend(columns)
-                                    current_group = None
-                                else:
-                                    current_section['columns'].extend(columns)
-
-                # Add the last section
-                if current_section:
-                    sections.append(current_section)
-
-                # Get or create criteria for the board
-                criteria, _ = Criteria.objects.get_or_create(
-                    board=board,
-                    defaults={'name': f'Default Criteria for {board.name}'}
-                )
-
-                # Create template data
-                template_data = {
-                    'code': template_code,
-                    'name': sections[0]['headers'][0] if sections else '',
-                    'metadata': sections,
-                    'criteria': criteria.id
-                }
+                sheets = parse_workbook(file, all_sheets=all_sheets)
+            except (InvalidFileException, zipfile.BadZipFile):
+                return Response({
+                    'status': 'error',
+                    'message': 'File is not a valid .xlsx workbook'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if not all_sheets:
+                sheets[0].code = file.name.split('.xlsx')[0]
 
-                # Save or update template
+            importer = TemplateImportService(board, academic_year)
+            results = []
+            for sheet in sheets:
+                result = {'sheet': sheet.title, 'code': sheet.code}
                 try:
-                    template = Template.objects.get(
-                        code=template_code,
-                        criteria__board=board
-                    )
-                    serializer = self.get_serializer(template, data=template_data)
-                except Template.DoesNotExist:
-                    serializer = self.get_serializer(data=template_data)
-
-                if serializer.is_valid():
-                    template = serializer.save()
-                    
-                    # Create or update template version
-                    TemplateVersion.objects.create(
-                        template=template,
-                        academic_year=academic_year,
-                        version_data=template_data
+                    if sheet.error:
+                        raise ValidationError(sheet.error)
+                    # One savepoint per sheet, so a bad sheet doesn't undo the others
+                    with transaction.atomic():
+                        template = importer.import_template(sheet.code, sheet.sections)
+                    result.update(
+                        status='success',
+                        message=f'Successfully imported template {sheet.code} for {board.name}',
+                        data=self.get_serializer(template).data,
+                        version=template.current_version.number
                     )
+                except ValidationError as e:
+                    result.update(status='error', message='; '.join(e.messages))
+                results.append(result)
 
-                    return Response({
-                        'status': 'success',
-                        'message': f'Successfully imported template {template_code} for {board.name}',
-                        'data': serializer.data
-                    })
-                else:
+            if not all_sheets:
+                result = results[0]
+                if result['status'] == 'error':
                     return Response({
                         'status': 'error',
-                        'message': 'Invalid template data',
-                        'errors': serializer.errors
+                        'message': result['message']
                     }, status=status.HTTP_400_BAD_REQUEST)
+                return Response({key: result[key] for key in ('status', 'message', 'data', 'version')})
+
+            imported = sum(result['status'] == 'success' for result in results)
+            return Response({
+                'status': 'success' if imported == len(results) else 'error',
+                'message': f'Imported {imported} of {len(results)} sheets',
+                'results': results
+            }, status=status.HTTP_200_OK if imported else status.HTTP_400_BAD_REQUEST)
 
         except Exception as e:
             return Response({
@@ -1604,138 +1530,159 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 'message': f'Error processing template: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _process_column_row(self, row):
-        """Process a row of column definitions"""
-        columns = []
-        for cell in row:
-            if cell.value:
-                column = {
-                    'name': cell.value.strip(),
-                    'type': 'single',
-                    'data_type': self._determine_data_type(cell.value),
-                    'required': True
-                }
-                
-                if column['data_type'] == 'option':
-                    column['options'] = self._determine_options(cell.value)
-                
-                columns.append(column)
-        return columns
-
-    def _determine_data_type(self, value):
-        """Determine the data type of a column based on its name"""
-        value_lower = str(value).lower()
-        if 'date' in value_lower:
-            return 'date'
-        elif 'email' in value_lower:
-            return 'email'
-        elif 'link' in value_lower or 'url' in value_lower:
-            return 'url'
-        elif any(term in value_lower for term in ['number', 'amount', 'count', 'total', 'percentage']):
-            return 'number'
-        elif '(yes/no)' in value_lower or any(opt in value_lower for opt in ['choose', 'select']):
-            return 'option'
-        return 'string'
-
-    def _determine_options(self, value):
-        """Determine options for option-type columns"""
-        value_lower = str(value).lower()
-        if '(yes/no)' in value_lower:
-            return ['Yes', 'No']
-        elif 'priority' in value_lower:
-            return ['High', 'Medium', 'Low']
-        elif 'status' in value_lower:
-            return ['Active', 'Inactive', 'Pending']
-        return []
-
-    def _is_group_row(self, row):
-        """Determine if a row contains group headers"""
-        non_empty_cells = [cell.value for cell in row if cell.value]
-        if len(non_empty_cells) <= 1:
-            return False
-        # Check if any cell contains detailed data
-        return not any(self._has_data_indicators(str(cell)) for cell in non_empty_cells)
-
-    def _has_data_indicators(self, value):
-        """Check if a value contains indicators of detailed data"""
-        indicators = ['date', 'email', 'number', 'amount', '(yes/no)', 'link', 'url']
-        return any(indicator in value.lower() for indicator in indicators)
-
-    def _is_group_header(self, columns):
-        """Determine if a row of columns represents a group header"""
-        return len(columns) == 1 and not any(
-            keyword in columns[0]['name'].lower() 
-            for keyword in ['link', 'url', 'email', 'date']
+    @action(detail=False, methods=['POST'])
+    def import_batch(self, request):
+        """Import every template workbook in an uploaded zip archive"""
+        if 'file' not in request.FILES:
+            return Response({
+                'status': 'error',
+                'message': 'No file provided'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        board = Board.objects.filter(id=request.query_params.get('board')).first()
+        academic_year = AcademicYear.objects.filter(id=request.query_params.get('academic_year')).first()
+        if not board:
+            return Response({
+                'status': 'error',
+                'message': 'Board not found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not academic_year:
+            return Response({
+                'status': 'error',
+                'message': 'Academic year not found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        sources = workbook_sources(
+            request.FILES['file'],
+            max_files=settings.TEMPLATE_IMPORT_MAX_FILES,
+            max_file_size=settings.TEMPLATE_IMPORT_MAX_FILE_SIZE,
+            max_total_size=settings.TEMPLATE_IMPORT_MAX_TOTAL_SIZE
         )
+        try:
+            # Bounded: this runs inside the web worker
+            parsed = parse_batch(
+                sources,
+                all_sheets=request.query_params.get('sheets') == 'all',
+                workers=max(1, settings.TEMPLATE_IMPORT_WORKERS)
+            )
+        except zipfile.BadZipFile:
+            return Response({
+                'status': 'error',
+                'message': 'File is not a valid .zip archive'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ArchiveTooLargeError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not parsed:
+            return Response({
+                'status': 'error',
+                'message': 'No .xlsx workbooks found in the archive'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-    def _create_group_column(self, columns):
-        """Create a group column structure"""
-        return {
-            'name': columns[0]['name'],
-            'type': 'group',
-            'columns': []
-        }
+        dry_run = request.query_params.get('dry_run') == 'true'
+        results = TemplateImportService(board, academic_year).import_batch(parsed, dry_run=dry_run)
+
+        imported = sum(result['status'] == 'success' for result in results)
+        return Response({
+            'status': 'success' if imported == len(results) else 'error',
+            'message': f"{'Would import' if dry_run else 'Imported'} {imported} of {len(results)} files",
+            'dry_run': dry_run,
+            'results': results
+        }, status=status.HTTP_200_OK if imported else status.HTTP_400_BAD_REQUEST)
 
-    def _process_column_groups(self, row):
-        """Process row containing column group headers"""
-        column_groups = []
-        current_group = None
-        
-        for cell in row:
-            if cell.value:
-                current_group = cell.value.strip()
-            if current_group:
-                column_groups.append(current_group)
-        
-        return column_groups
-
-    def _create_columns_with_groups(self, row, column_groups):
-        """Create column definitions with their groups"""
-        columns = []
-        for idx, cell in enumerate(row):
-            if cell.value:
-                column_name = cell.value.strip()
-                group = column_groups[idx] if idx < len(column_groups) else None
-                
-                column = {
-                    'name': self._sanitize_column_name(column_name),
-                    'display_name': column_name,
-                    'type': self._determine_data_type(column_name),
-                    'required': True,
-                    'description': f'Enter {column_name.lower()}',
-                    'group': group
-                }
-                
-                if column['type'] == 'option':
-                    column['options'] = self._determine_options(column_name)
-                
-                columns.append(column)
-        
-        return columns
 
-    def _sanitize_column_name(self, name):
-        """Convert column name to a valid field name"""
-        sanitized = re.sub(r'[^\w\s-]', '', name.lower())
-        return re.sub(r'[-\s]+', '_', sanitized)
 class NameAutocompleteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         query = request.GET.get('q', '')
         if query:
-            # Fetch distinct names that contain the query string (case-insensitive)
-            # matching_names = (
-            #     Template.objects.filter(name__icontains=query)
-            #     .values_list('name', flat=True)
-            #     .distinct()[:10]  # Limit to top 10 suggestions
-            # )
-            matching_names = ['John Doe', 'Jane Doe', 'Alice Smith']
-            
+            # kind: 'person' (default) or 'title'; or let a template column decide
+            kind = request.GET.get('kind', 'person')
+            # Template codes repeat across boards, so the column needs the board too
+            template_code = request.GET.get('template')
+            board_id = request.GET.get('board')
+            column = request.GET.get('column')
+            if template_code and board_id and column:
+                template = Template.objects.filter(code=template_code, board_id=board_id).first()
+                if template:
+                    kind = autocomplete.template_columns(template).get(column, kind)
+
+            try:
+                limit = max(1, min(int(request.GET.get('limit', 10)), 50))
+            except ValueError:
+                limit = 10
+
+            matching_names = autocomplete.suggest(query, kind=kind, limit=limit)
 
             return Response(list(matching_names), status=status.HTTP_200_OK)
         
         return Response([], status=status.HTTP_200_OK)
     
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SearchView(APIView):
+    """Ranked full-text search over submissions and their row data"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @query_budget(4)
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                'status': 'error',
+                'message': 'Query parameter q is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        documents = SearchDocument.objects.select_related(
+            'submission__template',
+            'submission__department',
+            'submission__academic_year'
+        )
+
+        # Same visibility as DataSubmissionViewSet
+        if user.role == 'faculty':
+            documents = documents.filter(submission__department_id=user.department_id)
+        elif user.role != 'iqac_director':
+            documents = documents.none()
+
+        params = request.query_params
+        if params.get('kind') in ('submission', 'row'):
+            documents = documents.filter(kind=params['kind'])
+        if params.get('board'):
+            documents = documents.filter(submission__board__code=params['board'])
+        if params.get('academic_year'):
+            documents = documents.filter(submission__academic_year_id=params['academic_year'])
+        if params.get('template_code'):
+            documents = documents.filter(submission__template__code__startswith=params['template_code'])
+        if params.get('department'):
+            documents = documents.filter(submission__department_id=params['department'])
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_documents(query, documents), request, view=self)
+
+        results = [{
+            'kind': document.kind,
+            'submission_id': document.submission_id,
+            'row_id': document.row_id,
+            'template_code': document.submission.template.code,
+            'department': document.submission.department.name,
+            'academic_year': document.submission.academic_year.name,
+            'title': document.title,
+            'snippet': document.body[:200],
+            'rank': document.rank
+        } for document in page]
+
+        return paginator.get_paginated_response(results)
+
+
 class DataSubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = DataSubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1752,6 +1699,7 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
         'status'
     ]
     ordering = ['-academic_year__start_date', '-updated_at']
+    query_budgets = {'list': 5, 'retrieve': 5}
     queryset = DataSubmission.objects.all()
 
     def get_queryset(self):
@@ -1760,14 +1708,20 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
             'template',
             'department',
             'academic_year',
-            # 'board'
+            'board',
             'submitted_by',
             'verified_by'
-        ).prefetch_related('data_rows')
+        ).prefetch_related(
+            'data_rows',
+            # Serialized history needs neither the snapshots nor the deltas
+            models.Prefetch('history', queryset=SubmissionHistory.objects.select_related(
+                'performed_by'
+            ).defer('snapshot', 'delta', 'previous_data', 'new_data'))
+        )
 
         # Filter based on user role
         if user.role == 'faculty':
-            queryset = queryset.filter(department=user.department)
+            queryset = queryset.filter(department_id=user.department_id)
         elif user.role == 'iqac_director':
             # IQAC Director can see all submissions
             pass
@@ -1781,22 +1735,11 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
         
-        # board = self.request.query_params.get('board')
-        # if board:
-        #     queryset = queryset.filter(board_id=board)
         # Additional custom filtering
         if self.request.query_params.get('is_current_year'):
             queryset = queryset.filter(academic_year__is_current=True)
-            
-        search_query = self.request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                models.Q(template__name__icontains=search_query) |
-                models.Q(department__name__icontains=search_query) |
-                models.Q(submitted_by__username__icontains=search_query) |
-                models.Q(template__code__icontains=search_query)
-            )
-            
+
+        # ?search= is handled by DataSubmissionFilter.filter_search
         return queryset
 
     def perform_create(self, serializer):
@@ -1888,6 +1831,7 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                     row_number=next_row,
                     data=request.data.get('data', {})
                 )
+                history.record_row_added(submission, submission_data, request.user)
 
                 return Response({
                     'status': 'success',
@@ -1901,48 +1845,6 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
-    def _track_changes(self, submission, previous_state, new_state, action, user, additional_details=None):
-        """Track changes in submission history"""
-        diff = DeepDiff(previous_state, new_state, ignore_order=True)
-        
-        details = {
-            'changes': [],
-            'additional_info': additional_details
-        }
-
-        # Process changes
-        if 'values_changed' in diff:
-            for path, change in diff['values_changed'].items():
-                details['changes'].append({
-                    'type': 'changed',
-                    'path': path,
-                    'old_value': change['old_value'],
-                    'new_value': change['new_value']
-                })
-
-        if 'dictionary_item_added' in diff:
-            for path in diff['dictionary_item_added']:
-                details['changes'].append({
-                    'type': 'added',
-                    'path': path
-                })
-
-        if 'dictionary_item_removed' in diff:
-            for path in diff['dictionary_item_removed']:
-                details['changes'].append({
-                    'type': 'removed',
-                    'path': path
-                })
-
-        SubmissionHistory.objects.create(
-            submission=submission,
-            action=action,
-            performed_by=user,
-            details=details,
-            previous_data=previous_state,
-            new_data=new_state
-        )
-
     @action(detail=True, methods=['PUT'])
     def update_row(self, request, pk=None):
         submission = self.get_object()
@@ -1953,8 +1855,6 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                 'message': 'Cannot modify data in current status'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        previous_state = self._get_submission_data_state(submission)
-
         try:
             with transaction.atomic():
                 # Update the data
@@ -1967,19 +1867,13 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                     id=row_id
                 )
                 
+                previous_data = submission_data.data
                 submission_data.data = new_data
                 submission_data.full_clean()
                 submission_data.save()
 
-                # Get new state and track changes
-                new_state = self._get_submission_data_state(submission)
-                self._track_changes(
-                    submission=submission,
-                    previous_state=previous_state,
-                    new_state=new_state,
-                    action='updated',
-                    user=request.user
-                )
+                # Record only what changed in this row
+                history.record_row_updated(submission, submission_data, previous_data, request.user)
 
                 return Response({
                     'status': 'success',
@@ -2032,6 +1926,11 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                     row_number__gt=deleted_row_number
                 ).update(row_number=models.F('row_number') - 1)
 
+                history.record_row_deleted(
+                    submission, int(row_id), section_index, deleted_row_number,
+                    submission_data.data, request.user
+                )
+
                 return Response({
                     'status': 'success',
                     'message': 'Row deleted successfully'
@@ -2043,6 +1942,48 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'])
+    def history_state(self, request, pk=None):
+        """Reconstruct the submission's data as of ?at=<ISO datetime> or ?entry=<history id>"""
+        submission = self.get_object()
+        at = request.query_params.get('at')
+        entry = request.query_params.get('entry')
+
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response({
+                    'status': 'error',
+                    'message': 'at must be an ISO 8601 datetime'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        if entry and not entry.isdigit():
+            return Response({
+                'status': 'error',
+                'message': 'entry must be a history entry id'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Edits still queued for the worker are part of the answer
+        history.flush_events(submission_ids=[submission.id])
+        state, replayed = history.state_at(
+            submission,
+            at=at or None,
+            upto_id=int(entry) if entry else None
+        )
+
+        return Response({
+            'status': 'success',
+            'data': {
+                'submission_id': submission.id,
+                'at': at,
+                'entry': entry,
+                'replayed_deltas': replayed,
+                'rows': history.state_rows(state)
+            }
+        })
+
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
         """Submit the data for approval"""
@@ -2146,7 +2087,7 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
         base_queryset = self.get_queryset().filter(academic_year=current_year)  # Added academic year filter
         if board_code:
             base_queryset = base_queryset.filter(
-                template__criteria__board__code=board_code
+                board__code=board_code
             )
 
         # Get today's date for daily stats
@@ -2244,10 +2185,11 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
             
             # Board stats
             'by_board': list(
-                base_queryset.values(
-                    'template__criteria__board__code',
-                    'template__criteria__board__name'
-                )
+                base_queryset.values(**{
+                    # Read the denormalized board, keeping the original response keys
+                    'template__criteria__board__code': models.F('board__code'),
+                    'template__criteria__board__name': models.F('board__name')
+                })
                 .annotate(
                     total=models.Count('id'),
                     pending=models.Count('id', filter=models.Q(status='submitted')),
@@ -2257,7 +2199,7 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
                     templates_count=models.Count('template', distinct=True),
                     departments_count=models.Count('department', distinct=True)
                 )
-                .order_by('template__criteria__board__name')
+                .order_by('board__name')
             )
         }
 
@@ -2281,9 +2223,10 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
         #     'data': stats
         # })
         
+    @query_budget(6)
     @action(detail=False, methods=['GET'], url_path='department-breakdown', url_name='department-breakdown')
     def department_breakdown(self, request):
-        logger.debug(f"Department breakdown called with academic_year: {request.query_params.get('academic_year')}")
+        logger.debug("Department breakdown called with academic_year: %s", request.query_params.get('academic_year'))
         try:
             academic_year_id = request.query_params.get('academic_year')
             
@@ -2300,29 +2243,35 @@ class DataSubmissionViewSet(viewsets.ModelViewSet):
 
             # Get all departments and templates
             departments = Department.objects.all()
-            templates = Template.objects.all()
-            total_templates = templates.count()
+            templates = list(Template.objects.all())
+            total_templates = len(templates)
+
+            # One query for the year's submissions; at most one per department and template
+            submissions = {
+                (submission.department_id, submission.template_id): submission
+                for submission in DataSubmission.objects.filter(
+                    academic_year=academic_year
+                ).select_related('verified_by')
+            }
+            approved_counts = Counter(
+                department_id for (department_id, _), submission in submissions.items()
+                if submission.status == 'approved'
+            )
 
             department_data = []
             total_submissions = 0
             completed_submissions = 0
 
             for dept in departments:
-                # Get submissions for this department
-                submissions = DataSubmission.objects.filter(
-                    department=dept,
-                    academic_year=academic_year
-                ).select_related('template')
-
                 # Calculate department stats
-                dept_completed = submissions.filter(status='approved').count()
+                dept_completed = approved_counts[dept.id]
                 dept_total = total_templates
                 completion_rate = (dept_completed / dept_total * 100) if dept_total > 0 else 0
 
                 # Get template details
                 template_details = []
                 for template in templates:
-                    submission = submissions.filter(template=template).first()
+                    submission = submissions.get((dept.id, template.id))
                     template_details.append({
                         'code': template.code,
                         'name': template.name,
@@ -2408,6 +2357,30 @@ class AcademicYearTransitionViewSet(viewsets.ViewSet):
                 'message': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def plan_transition(self, request, pk=None):
+        """Dry run: estimate the work of a transition to this academic year"""
+        try:
+            from_year = AcademicYear.objects.get(is_current=True)
+            to_year = get_object_or_404(AcademicYear, pk=pk)
+
+            plan = AcademicYearTransitionService(
+                from_year=from_year,
+                to_year=to_year,
+                user=request.user
+            ).plan()
+
+            return Response({
+                'status': 'success',
+                'data': plan
+            })
+
+        except AcademicYear.DoesNotExist:
+            return Response({
+                'status': 'error',
+                'message': 'No current academic year found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['get'])
     def transition_status(self, request, pk=None):
         """Get status of academic year transition"""
@@ -2421,8 +2394,42 @@ class AcademicYearTransitionViewSet(viewsets.ViewSet):
             'started_at': transition.started_at,
             'completed_at': transition.completed_at,
             'error_log': transition.error_log,
-            'processed_by': transition.processed_by.get_full_name()
+            'processed_by': transition.processed_by.get_full_name(),
+            'progress': {
+                'templates_total': transition.templates_total,
+                'templates_done': transition.templates_done,
+                'percent': transition.progress_percent,
+                'submissions_created': transition.submissions_created,
+                'rows_copied': transition.rows_copied,
+                'rows_per_second': transition.rows_per_second,
+                'last_progress_at': transition.last_progress_at
+            }
         })
+
+    @action(detail=True, methods=['post'])
+    def resume_transition(self, request, pk=None):
+        """Resume a failed or stalled transition from its last checkpoint"""
+        transition = get_object_or_404(
+            AcademicYearTransition,
+            to_year_id=pk
+        )
+
+        try:
+            AcademicYearTransitionService.for_transition(transition).resume_transition()
+            process_academic_year_transition.delay(transition.id)
+
+            return Response({
+                'status': 'success',
+                'message': 'Academic year transition resumed',
+                'transition_id': transition.id,
+                'templates_done': transition.templates_done
+            })
+
+        except ValidationError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
 
 # from rest_framework.permissions import IsAuthenticated
@@ -2447,7 +2454,8 @@ class ExportTemplateView(APIView):
             criterion = request.query_params.get('criterion')
             board_code = request.query_params.get('board')
 
-            print(f"Export parameters: year={academic_year_id}, type={export_type}, template={template_code}, criterion={criterion}, board={board_code}")
+            logger.info("Export parameters: year=%s, type=%s, template=%s, criterion=%s, board=%s",
+                        academic_year_id, export_type, template_code, criterion, board_code)
 
             if not board_code:
                 return Response(
@@ -2460,10 +2468,9 @@ class ExportTemplateView(APIView):
                     {'error': 'Academic year is required'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            print('_________________________________________________________')
             try:
                 board = Board.objects.filter(id=board_code).first()  # Change to filter by code
-                print(f"Found board: {board.name}")
+                logger.debug("Found board: %s", board)
                 academic_year = AcademicYear.objects.get(id=academic_year_id)
             except (Board.DoesNotExist, AcademicYear.DoesNotExist) as e:
                 return Response(
@@ -2474,16 +2481,16 @@ class ExportTemplateView(APIView):
             # Get templates based on export type and board
             if export_type == 'all':
                 templates = Template.objects.filter(
-                    criteria__board=board
+                    board=board
                 ).order_by('code')
             elif export_type == 'criterion' and criterion:
                 templates = Template.objects.filter(
-                    criteria__board=board,
+                    board=board,
                     code__startswith=f"{criterion}."
                 ).order_by('code')
             elif export_type == 'template' and template_code:
                 templates = Template.objects.filter(
-                    criteria__board=board,
+                    board=board,
                     code=template_code
                 )
             else:
@@ -2498,7 +2505,8 @@ class ExportTemplateView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            print(f"Found {templates.count()} templates to export")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Found %s templates to export", templates.count())
 
             # Create workbook
             wb = Workbook()
@@ -2506,14 +2514,15 @@ class ExportTemplateView(APIView):
 
             has_data = False
             for template in templates:
-                print(f"Processing template: {template.code}")
+                logger.debug("Processing template: %s", template.code)
                 submissions = DataSubmission.objects.filter(
                     template=template,
                     academic_year=academic_year,
                     status='approved'
                 ).prefetch_related('data_rows')
 
-                print(f"Found {submissions.count()} approved submissions for {template.code}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Found %s approved submissions for %s", submissions.count(), template.code)
 
                 if submissions.exists():
                     has_data = True
@@ -2547,19 +2556,56 @@ class ExportTemplateView(APIView):
             )
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
-            print(f"Export completed successfully: {filename}")
+            logger.info("Export completed successfully: %s", filename)
             return response
 
         except Exception as e:
-            print(f"Export error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Export error: %s", e)
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
             
+class EntryWorkbookView(APIView):
+    """Blank data-entry workbook for one template or every template of a criterion"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        board = Board.objects.filter(id=request.query_params.get('board')).first()
+        if not board:
+            return Response({'error': 'Board is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        template_code = request.query_params.get('template_code')
+        criterion = request.query_params.get('criterion')
+        templates = Template.objects.filter(board=board).select_related('current_version')
+        if template_code:
+            templates = templates.filter(code=template_code)
+            filename = f"{board.code}_template_{template_code}_entry.xlsx"
+        elif criterion and criterion.isdigit():
+            templates = templates.filter(criteria__number=criterion).order_by('code')
+            filename = f"{board.code}_criterion_{criterion}_entry.xlsx"
+        else:
+            return Response(
+                {'error': 'template_code or a criterion number is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        templates = list(templates)
+        if not templates:
+            return Response(
+                {'error': 'No templates found for the given criteria'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        response = HttpResponse(
+            build_entry_workbook(templates),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class CriteriaViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Criteria.objects.all()
     serializer_class = CriteriaSerializer
@@ -2599,4 +2645,30 @@ class SettingsViewSet(viewsets.ViewSet):
         user.profile.selected_academic_year = selected_academic_year
         user.profile.save()
 
-        return Response({'status': 'success'})
\ No newline at end of file
+        return Response({'status': 'success'})
+
+
+class MetricsView(APIView):
+    """
+    Request metrics in the Prometheus text format. Scrapers authenticate with
+    METRICS_TOKEN as a bearer token and, if METRICS_ALLOWED_IPS is set, must
+    also come from one of those addresses. Without a token nothing is served.
+    """
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+        allowed = (
+            token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+            and (not allowed_ips or request.META.get('REMOTE_ADDR') in allowed_ips)
+        )
+        if not allowed:
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(
+            metrics_registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
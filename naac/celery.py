@@ -0,0 +1,12 @@
+# naac/celery.py
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "naac.settings")
+
+app = Celery("naac")
+
+# Read CELERY_* settings from Django settings
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()